@@ -0,0 +1,55 @@
+"""Wall time of `batch.summarize` over many collector logs vs number of workers.
+
+`COPIES` copies of each CSV in `assets/` are placed in a temporary directory,
+as a week of per-camera logs would be, and summarized with 1, 2, 4, ... up to
+all cores. Every run must produce the same report; the speedup over one
+worker should be close to the number of workers, up to the number of cores.
+
+python3 adhoc/bench_batch.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from batch import find_logs, summarize
+
+ASSETS = os.path.join(ROOT, 'assets')
+CROSS_SEGMENT = ((290.0, 0), (285.0, 270.0))
+COPIES = 16
+
+def worker_counts():
+  counts, workers = [], 1
+  while workers < os.cpu_count():
+    counts.append(workers)
+    workers *= 2
+  return counts + [os.cpu_count()]
+
+def main():
+  directory = tempfile.mkdtemp()
+  try:
+    for name in sorted(os.listdir(ASSETS)):
+      if name.endswith('.csv'):
+        for i in range(COPIES):
+          shutil.copy(os.path.join(ASSETS, name), os.path.join(directory, '{}-{}'.format(i, name)))
+    filenames = find_logs([directory])
+    print('{} files, {} cores'.format(len(filenames), os.cpu_count()))
+    reference, single = None, None
+    for workers in worker_counts():
+      start = time.perf_counter()
+      summary = summarize(filenames, CROSS_SEGMENT, workers=workers)
+      elapsed = time.perf_counter() - start
+      if reference is None:
+        reference, single = summary.to_dict(), elapsed
+      assert summary.to_dict() == reference
+      print('  {:3d} workers {:7.2f} s  speedup {:5.2f}x'.format(workers, elapsed, single / elapsed))
+    print('in {} out {}, {} people'.format(reference['in'], reference['out'], reference['people']))
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,108 @@
+"""Accuracy versus throughput of detecting every N frames, with tracker predictions in between.
+
+The detections of `assets/*.csv` are replayed (see gstreamer/replay.py) with
+the detector used on every frame, every N-th frame, and with the adaptive
+cadences of `DetectionCadence`. The detections the log holds for every frame
+are taken as ground truth for the boxes collected on all frames, detected or
+predicted:
+
+recall / precision: truth boxes / collected boxes matched one to one at IoU >= 0.5
+pred. recall: recall on the frames the detector skipped
+IoU: mean IoU of the matched boxes
+
+Throughput assumes `--inference_ms` per detector run (set_input, invoke and
+get_output; measure yours with detect.py --metrics_file) plus the measured
+tracking time, all on one accelerator: `max fps` is the frame rate one stream
+could reach, `streams@30` how many 30 fps streams the accelerator could serve.
+
+python3 adhoc/bench_cadence.py [--inference_ms 15]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from geometry import iou_matrix
+from replay import load_frames, replay
+from tracker import DetectionCadence, linear_assignment
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+CROSS_SEGMENTS = {
+  'people_walking_standing_1080p.csv': ((290, 0), (285, 270)),
+  'reail_store_1_720p.csv': ((600, 0), (500, 720)),
+}
+IOU_THRESHOLD = 0.5
+# (every, max_error, max_motion)
+CADENCES = [(1, None, None), (2, None, None), (3, None, None), (4, None, None), (6, None, None), (8, None, None),
+            (8, 0.1, None), (8, 0.2, None), (8, None, 0.05), (8, 0.2, 0.1)]
+
+def match_frame(truth, boxes):
+  """Returns the IoUs of the one to one matches of `boxes` to `truth` above IOU_THRESHOLD."""
+  if not len(truth) or not len(boxes):
+    return np.empty(0)
+  iou = iou_matrix(truth, boxes)
+  rows, cols = linear_assignment(-iou)
+  iou = iou[rows, cols]
+  return iou[iou >= IOU_THRESHOLD]
+
+def evaluate(frames, collector):
+  points = collector.points
+  boxes = np.column_stack((points.x, points.y, points.x + points.w, points.y + points.h))
+  # Collector frame numbers start at 1.
+  starts = np.searchsorted(points.frame, np.arange(1, len(frames) + 2))
+  truth_total = collected = 0
+  predicted_truth = predicted_matched = 0
+  ious = []
+  for i, frame in enumerate(frames):
+    start, stop = starts[i], starts[i + 1]
+    matched = match_frame(frame.boxes, boxes[start:stop])
+    ious.append(matched)
+    truth_total += len(frame.boxes)
+    collected += stop - start
+    if stop > start and points.predicted[start]:
+      predicted_truth += len(frame.boxes)
+      predicted_matched += len(matched)
+  ious = np.concatenate(ious)
+  return (len(ious) / max(truth_total, 1), len(ious) / max(collected, 1),
+          predicted_matched / predicted_truth if predicted_truth else float('nan'),
+          ious.mean() if len(ious) else 0.0)
+
+def describe(every, max_error, max_motion):
+  text = 'every {}'.format(every)
+  if max_error is not None:
+    text += ' err<{}'.format(max_error)
+  if max_motion is not None:
+    text += ' mov<{}'.format(max_motion)
+  return text
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--inference_ms', type=float, default=15.0,
+                      help='detector time per inference, in milliseconds')
+  args = parser.parse_args()
+
+  for csv_file in CSV_FILES:
+    frames, label_names, size = load_frames(os.path.join(ASSETS, csv_file))
+    print('{}: {} frames, {} detections'.format(csv_file, len(frames), sum(len(f.boxes) for f in frames)))
+    print('{:22s} {:>7s} {:>8s} {:>9s} {:>7s} {:>9s} {:>12s} {:>5s} {:>6s} {:>7s}'.format(
+      'cadence', 'detect', 'max fps', 'streams@30', 'recall', 'precision', 'pred. recall', 'IoU', 'tracks', 'in/out'))
+    for every, max_error, max_motion in CADENCES:
+      cadence = DetectionCadence(every, max_error, max_motion)
+      collector, trajectories, _, count, seconds = replay(frames, label_names, size, 'sort', (CROSS_SEGMENTS[csv_file],),
+                                                          cadence=cadence)
+      # Detector runs plus tracking and collecting, the steps detect.py runs on every frame.
+      frame_seconds = (cadence.detected_frames * args.inference_ms / 1000 + seconds['track'] + seconds['collect']) / count
+      recall, precision, predicted_recall, iou = evaluate(frames, collector)
+      print('{:22s} {:6.1f}% {:8.1f} {:9.1f} {:7.3f} {:9.3f} {:12.3f} {:5.3f} {:6d} {:>3d}/{:<3d}'.format(
+        describe(every, max_error, max_motion), 100 * cadence.detected_frames / count, 1 / frame_seconds,
+        1 / frame_seconds / 30, recall, precision, predicted_recall, iou, len(trajectories.trajectories),
+        trajectories._cross_clockwise_counter, trajectories._cross_counter_clockwise_counter))
+    print()
+
+if __name__ == '__main__':
+  main()
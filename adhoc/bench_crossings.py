@@ -0,0 +1,66 @@
+"""Scalar vs vectorized line-crossing counting.
+
+Checks that `tracking.crossings` reproduces `Trajectory.detect_cross` segment by
+segment on the assets CSVs (and on integer grid segments that hit the EPS
+edge cases), then times both on a day-sized batch.
+
+python3 adhoc/bench_crossings.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from tracking.crossings import SegmentBatch, collect_segments, count_crosses, detect_crosses
+from tracking.trajectories import ObjTrajectories
+from tracking.trajectory import Trajectory
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+CROSS_SEGMENTS = [((290.0, 0), (285.0, 270.0)), ((0, 300), (1280, 300)), ((600, 0), (600, 720))]
+DAY_SEGMENTS = 30 * 60 * 60 * 24
+
+def scalar_crosses(segments, cross_segment):
+  results = [Trajectory.detect_cross(((x0, y0), (x1, y1)), cross_segment) for x0, y0, x1, y1 in segments.tolist()]
+  return np.array(results, dtype=bool).reshape(-1, 2)
+
+def check(segments, cross_segment):
+  clockwise, counter_clockwise = detect_crosses(segments, cross_segment)
+  expected = scalar_crosses(segments, cross_segment)
+  assert np.array_equal(expected[:, 0], clockwise) and np.array_equal(expected[:, 1], counter_clockwise), cross_segment
+  return int(clockwise.sum()), int(counter_clockwise.sum())
+
+def main():
+  batches = []
+  for name in CSV_FILES:
+    trajectories = ObjTrajectories(None)
+    trajectories.load_csv(os.path.join(ASSETS, name))
+    batch = collect_segments(trajectories.trajectories.values())
+    batches.append(batch)
+    for cross_segment in CROSS_SEGMENTS:
+      print('{} {}: in/out {}'.format(name, cross_segment, check(batch.segments, cross_segment)))
+
+  grid = np.random.default_rng(0).integers(0, 8, size=(100000, 4)).astype(np.float64)
+  for cross_segment in [((2, 2), (6, 6)), ((4, 0), (4, 8)), ((0, 3), (8, 3))]:
+    print('grid {}: in/out {}'.format(cross_segment, check(grid, cross_segment)))
+
+  segments = np.concatenate([batch.segments for batch in batches])
+  repeat = DAY_SEGMENTS // len(segments) + 1
+  day = SegmentBatch(np.zeros(DAY_SEGMENTS, dtype=np.int32),
+    np.tile(segments, (repeat, 1))[:DAY_SEGMENTS], np.zeros(DAY_SEGMENTS))
+  start = time.perf_counter()
+  counts = count_crosses(day.segments, CROSS_SEGMENTS[0])
+  vectorized = time.perf_counter() - start
+  sample = day.segments[:100000]
+  start = time.perf_counter()
+  scalar_crosses(sample, CROSS_SEGMENTS[0])
+  scalar = (time.perf_counter() - start) * DAY_SEGMENTS / len(sample)
+  print('{} segments (a day at 30 fps): in/out {}'.format(DAY_SEGMENTS, counts))
+  print('  vectorized {:8.1f} ms   scalar (extrapolated) {:8.1f} ms'.format(vectorized * 1000, scalar * 1000))
+
+if __name__ == '__main__':
+  main()
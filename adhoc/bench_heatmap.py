@@ -0,0 +1,49 @@
+"""Heatmap accumulation rate and output time as the number of points grows.
+
+The people CSV is repeated back to back (as in bench_trajectory_queries.py)
+for 1, 10 and 60 minutes and accumulated into a 1920x1080 heatmap; adding
+costs about the same per point, while reading a layer and writing the PNG
+stay the same however many points went in. Two half heatmaps merged must
+equal the whole one.
+
+python3 adhoc/bench_heatmap.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from bench_trajectory_queries import build
+from tracking.heatmap import LAYERS, Heatmap
+
+SIZE = (1920, 1080)
+MINUTES = [1, 10, 60]
+
+def main():
+  filename = os.path.join(tempfile.mkdtemp(), 'heatmap.png')
+  for minutes in MINUTES:
+    trajectories, duration = build(minutes / 60)
+    heatmap = Heatmap(SIZE)
+    start = time.perf_counter()
+    heatmap.add_trajectories(trajectories)
+    add_time = time.perf_counter() - start
+    start = time.perf_counter()
+    heatmap.save_png(filename, 'footprint')
+    png_time = time.perf_counter() - start
+
+    first, second = Heatmap(SIZE), Heatmap(SIZE)
+    first.add_trajectories(trajectories, 0, duration / 2)
+    second.add_trajectories(trajectories, duration / 2)
+    first.merge(second)
+    same = all(np.array_equal(first.layer(name), heatmap.layer(name)) for name in ('occupancy', 'footprint'))
+    print('{:3d} min: {:8d} points, add {:6.3f} s ({:.2f} M points/s), png {:5.1f} ms, '
+          'halves merged equal: {}'.format(minutes, heatmap.points, add_time, heatmap.points / add_time / 1e6,
+                                           png_time * 1e3, same))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,56 @@
+"""Import time of the analytics, tracking and pipeline modules in a fresh interpreter.
+
+Every module is imported `REPEAT` times, each time in a new Python process (like a
+short batch analytics job), and the median wall time of the import is printed
+with the heavy modules (GStreamer/GTK bindings, TFLite, svgwrite) it pulled in.
+Modules that fail to import, e.g. without the TFLite runtime, are reported as such.
+
+python3 adhoc/bench_import_time.py [module ...]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+GSTREAMER = os.path.join(ROOT, 'gstreamer')
+
+REPEAT = 5
+MODULES = ['numpy', 'tracking.point_store', 'tracking.collector', 'tracking.trajectories',
+           'tracker', 'replay', 'common', 'detect', 'gstreamer']
+HEAVY = ['gi', 'tflite_runtime', 'svgwrite']
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+try:
+  __import__({module!r})
+  error = None
+except Exception as e:
+  error = '{{}}: {{}}'.format(type(e).__name__, e)
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{ 'seconds': elapsed, 'heavy': heavy, 'error': error }}))
+'''
+
+def probe(module):
+  output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)],
+                          cwd=GSTREAMER, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  return json.loads(output)
+
+def main():
+  modules = sys.argv[1:] or MODULES
+  print('median of {} fresh interpreters'.format(REPEAT))
+  for module in modules:
+    results = [probe(module) for _ in range(REPEAT)]
+    seconds = statistics.median(result['seconds'] for result in results)
+    line = '{:24s} {:8.1f} ms'.format(module, seconds * 1000)
+    if results[0]['error']:
+      line += '  failed: ' + results[0]['error']
+    else:
+      line += '  heavy: ' + (', '.join(results[0]['heavy']) or '-')
+    print(line)
+
+if __name__ == '__main__':
+  main()
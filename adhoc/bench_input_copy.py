@@ -0,0 +1,112 @@
+"""Bytes copied and time per frame on the way to the input tensor.
+
+Compares the legacy `common.set_input` with `common.CachedInterpreter.set_input`.
+Both copy the mapped frame into the tensor once; what the cached path saves is
+the per-frame `get_input_details` lookup and reshape. Whether the bindings copy
+the frame again while mapping a Gst.Buffer depends on them, not on either path:
+gst-python 1.18 and later map to a memoryview, plain PyGObject to a bytes copy.
+
+The interpreter is a stand-in that only owns an input tensor, so no model or
+accelerator is needed. Frames already in a uint8 array are always measured;
+frames in real Gst.Buffers only when GStreamer's Python bindings are available
+(run on the device). The stand-in's `get_input_details` is much cheaper than
+the TFLite interpreter's, so the time saved here is a lower bound.
+
+Bytes copied = the frame written into the tensor plus any frame-sized
+temporaries (e.g. the bytes object the bindings create when mapping), which
+tracemalloc sees as allocations.
+
+python3 adhoc/bench_input_copy.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+import common
+
+FRAMES = 300
+REPEATS = 5
+SHAPE = (1, 300, 300, 3)
+
+class SyntheticInterpreter:
+  def __init__(self, shape):
+    self.shape = shape
+    self.input = np.zeros(shape, dtype=np.uint8)
+
+  def get_input_details(self):
+    return [{ 'index': 0, 'shape': np.array(self.shape) }]
+
+  def get_output_details(self):
+    return []
+
+  def tensor(self, index):
+    return lambda: self.input
+
+def legacy_set_array(interpreter, frame):
+  """The legacy `common.set_input` after mapping: lookup, reshape and copy."""
+  np_buffer = np.reshape(frame, interpreter.get_input_details()[0]['shape'])
+  common.input_tensor(interpreter)[:, :] = np_buffer
+
+def synthetic_frames(count, shape):
+  rng = np.random.default_rng(0)
+  return [rng.integers(0, 255, size=shape, dtype=np.uint8).reshape(-1) for _ in range(count)]
+
+def measure(name, set_input, frames, frame_bytes):
+  set_input(frames[0])
+  # Best of REPEATS, timed without tracemalloc, which slows down allocations.
+  elapsed = float('inf')
+  for _ in range(REPEATS):
+    start = time.perf_counter()
+    for frame in frames:
+      set_input(frame)
+    elapsed = min(elapsed, time.perf_counter() - start)
+  tracemalloc.start()
+  allocated = 0
+  for frame in frames:
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    set_input(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    allocated += peak - before
+  tracemalloc.stop()
+  copied = allocated / len(frames) + frame_bytes
+  print('{:14s} {:10.0f} bytes copied/frame ({:.2f} frames)  {:7.1f} us/frame'.format(
+    name, copied, copied / frame_bytes, elapsed / len(frames) * 1e6))
+
+def gst_module():
+  try:
+    return common._gst()
+  except (ImportError, ValueError):
+    return None
+
+def main():
+  frame_bytes = int(np.prod(SHAPE))
+  frames = synthetic_frames(FRAMES, SHAPE)
+  legacy = SyntheticInterpreter(SHAPE)
+  cached = common.CachedInterpreter(SyntheticInterpreter(SHAPE))
+  print('{} synthetic {}x{} RGB frames, {} bytes each'.format(FRAMES, SHAPE[2], SHAPE[1], frame_bytes))
+  measure('array before', lambda frame: legacy_set_array(legacy, frame), frames, frame_bytes)
+  measure('array after', cached.set_input, frames, frame_bytes)
+  assert np.array_equal(legacy.input, cached.interpreter.input)
+
+  Gst = gst_module()
+  if Gst is None:
+    print('GStreamer bindings not available, Gst.Buffer frames not measured')
+    return
+  Gst.init(None)
+  buffers = [Gst.Buffer.new_wrapped(frame.tobytes()) for frame in frames]
+  _, mapinfo = buffers[0].map(Gst.MapFlags.READ)
+  print('Gst.Buffer.map data is a {}'.format(type(mapinfo.data).__name__))
+  buffers[0].unmap(mapinfo)
+  measure('buffer before', lambda buf: common.set_input(legacy, buf), buffers, frame_bytes)
+  measure('buffer after', cached.set_input, buffers, frame_bytes)
+  assert np.array_equal(legacy.input, cached.interpreter.input)
+
+if __name__ == '__main__':
+  main()
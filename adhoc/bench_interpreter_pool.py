@@ -0,0 +1,94 @@
+"""Throughput of InferenceScheduler with 1..4 interpreters, without accelerators.
+
+Each stream feeds synthetic frames through the same submit/invoke/track stages
+detect.py uses with a scheduler; interpreters are StubInterpreters that sleep
+for a fixed latency per invoke, like an Edge TPU that releases the GIL. Checks
+that every stream's frames reach the track stage in order and prints the
+aggregate and per-stream frame rates.
+
+python3 adhoc/bench_interpreter_pool.py
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from scheduler import InferenceScheduler
+from stages import StagedPipeline
+from stub_interpreter import StubInterpreter
+
+FRAMES = 200
+LATENCY = 0.01
+SHAPE = (1, 300, 300, 3)
+
+def infer(interpreter, frame):
+  np.copyto(interpreter.tensor(0)(), frame)
+  interpreter.invoke()
+  return interpreter.tensor(3)()[0].copy()
+
+def run_streams(scheduler, streams, frames):
+  order = { stream: [] for stream in streams }
+  done = threading.Semaphore(0)
+
+  def make_stages(stream):
+    def submit(number, frame):
+      return number, scheduler.submit(stream, infer, frame)
+    def wait(submitted):
+      number, request = submitted
+      request.wait()
+      return number
+    def track(number):
+      order[stream].append(number)
+      if number == frames - 1:
+        done.release()
+      return number
+    return [('submit', submit), ('invoke', wait), ('track', track)]
+
+  pipelines = [StagedPipeline(make_stages(stream), queue_size=2) for stream in streams]
+  frame = np.zeros(SHAPE, dtype=np.uint8)
+  for pipeline in pipelines:
+    pipeline.start()
+  start = time.perf_counter()
+  feeders = [threading.Thread(target=feed, args=(pipeline, frame, frames)) for pipeline in pipelines]
+  for feeder in feeders:
+    feeder.start()
+  for _ in streams:
+    done.acquire()
+  elapsed = time.perf_counter() - start
+  for feeder in feeders:
+    feeder.join()
+  for pipeline in pipelines:
+    pipeline.stop()
+  for stream in streams:
+    assert order[stream] == list(range(frames)), stream
+  return elapsed
+
+def feed(pipeline, frame, frames):
+  # Blocking puts instead of the leaky put so that no frame is dropped.
+  for number in range(frames):
+    pipeline.queues[0].put((number, frame))
+
+def main():
+  print('{} frames per stream, {:.0f} ms per invoke'.format(FRAMES, LATENCY * 1000))
+  for stream_count in (1, 2, 4):
+    streams = ['cam{}'.format(i) for i in range(stream_count)]
+    for device_count in (1, 2, 4):
+      interpreters = [StubInterpreter(SHAPE, latency=LATENCY, seed=i) for i in range(device_count)]
+      for interpreter in interpreters:
+        interpreter.allocate_tensors()
+      scheduler = InferenceScheduler(interpreters, ['stub:{}'.format(i) for i in range(device_count)],
+                                     stats_interval=0)
+      scheduler.start()
+      elapsed = run_streams(scheduler, streams, FRAMES)
+      scheduler.stop()
+      served = [interpreter.invocations for interpreter in interpreters]
+      print('{} streams x {} devices: {:7.1f} fps total, {:6.1f} fps/stream, invokes per device {}'.format(
+        stream_count, device_count, stream_count * FRAMES / elapsed, FRAMES / elapsed, served))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,52 @@
+"""SVG size and drawing time of long trajectory windows with and without level of detail.
+
+The people CSV is repeated back to back (as in bench_trajectory_queries.py)
+until it covers `MINUTES` minutes, and the whole window is drawn on a
+1920x1080 drawing at full resolution (`tolerance=0`), with the automatic
+level of detail, and at a few fixed tolerances. Crossing counts must be the
+same at every level, since they always come from every point.
+
+python3 adhoc/bench_lod.py
+"""
+import os
+import sys
+import time
+
+import svgwrite
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from bench_trajectory_queries import build
+
+MINUTES = 30
+SIZE = (1920, 1080)
+TOLERANCES = [0, None, 2.0, 8.0, 32.0]
+
+def draw(trajectories, tolerance):
+  drawing = svgwrite.Drawing('', size=SIZE)
+  start = time.perf_counter()
+  trajectories.get_trajectories_svg(drawing, tolerance=tolerance)
+  svg = drawing.tostring()
+  return time.perf_counter() - start, svg
+
+def main():
+  trajectories, duration = build(MINUTES / 60)
+  points = sum(len(traj.points) for traj in trajectories.trajectories.values())
+  print('{:.0f} min, {} tracks, {} points'.format(duration / 60, len(trajectories.trajectories), points))
+  # Importances are computed on the first simplified drawing and cached for the next ones.
+  start = time.perf_counter()
+  for traj in trajectories.trajectories.values():
+    trajectories.level_of_detail.importance(traj)
+  print('precomputed levels of detail in {:.2f} s'.format(time.perf_counter() - start))
+  counts = None
+  for tolerance in TOLERANCES:
+    elapsed, svg = draw(trajectories, tolerance)
+    count = svg[svg.rindex('In:'):svg.rindex('</text>')]
+    assert counts in (None, count), (counts, count)
+    counts = count
+    print('  tolerance {:>4}: {:7d} elements, {:6.1f} MB, {:6.2f} s  ({})'.format(
+      'auto' if tolerance is None else tolerance, svg.count('<'), len(svg) / 1e6, elapsed, count))
+
+if __name__ == '__main__':
+  main()
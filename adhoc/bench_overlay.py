@@ -0,0 +1,85 @@
+"""Frames per second of the overlay renderers on recorded scenes.
+
+The detections in `assets/*.csv` are replayed through the tracker and
+`detect.generate_svg` (as in detect.py, with the status text lines) and the
+overlay content of every frame is recorded. Each renderer then renders all
+frames; the svgwrite and template outputs must be identical. The last column
+shows how many frames a renderer with `skip_unchanged` does not render again.
+Scenes are also replayed with their boxes copied side by side to see how
+rendering scales with the number of boxes.
+
+python3 adhoc/bench_overlay.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+import overlay
+from detect import generate_svg
+from replay import load_frames
+from tracker import VectorizedSort
+from tracking.collector import Collector
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+COPIES = [1, 8]
+INFERENCE_SIZE = (300, 300)
+TEXT_LINES = ['Inference: 12.34 ms', 'FPS: 30 fps']
+
+class RecordingRenderer(overlay.Renderer):
+  def __init__(self):
+    super().__init__()
+    self.frames = []
+
+  def render_svg(self, size, text_lines, boxes, lines=()):
+    self.frames.append((size, text_lines, boxes, lines))
+
+def record(frames, label_names, size, copies):
+  """Returns the overlay content of every frame, with `copies` side by side copies of each box."""
+  tracker = VectorizedSort()
+  recorder = RecordingRenderer()
+  collector = Collector()
+  collector.start()
+  labels = dict(enumerate(label_names))
+  scale = np.array([size[0] * copies, size[1], size[0] * copies, size[1]], dtype=float)
+  src_size = (int(size[0]) * copies, int(size[1]))
+  for frame in frames:
+    boxes = np.concatenate([frame.boxes + [i * size[0], 0, i * size[0], 0] for i in range(copies)])
+    detections = np.column_stack((boxes / scale, np.tile(frame.scores, copies))).astype(np.float32)
+    trdata = tracker.update(detections)
+    generate_svg(src_size, INFERENCE_SIZE, (0, 0) + INFERENCE_SIZE, detections, np.tile(frame.labels, copies),
+                 labels, TEXT_LINES, trdata, True, collector, tracker.detection_indices, recorder)
+  return recorder.frames
+
+def measure(renderer, frames):
+  outputs = []
+  start = time.perf_counter()
+  for content in frames:
+    outputs.append(renderer.render(*content))
+  return time.perf_counter() - start, outputs
+
+def main():
+  for filename in CSV_FILES:
+    frames, label_names, size = load_frames(os.path.join(ASSETS, filename))
+    for copies in COPIES:
+      content = record(frames, label_names, size, copies)
+      boxes = np.mean([len(boxes) for _, _, boxes, _ in content])
+      print('{} x{}: {} frames, {:.1f} boxes/frame'.format(filename, copies, len(content), boxes))
+      reference = None
+      for name in sorted(overlay.RENDERERS):
+        elapsed, outputs = measure(overlay.make_renderer(name, skip_unchanged=False), content)
+        if reference is None:
+          reference = outputs
+        assert outputs == reference, name
+        skipping = overlay.make_renderer(name, skip_unchanged=True)
+        skip_elapsed, _ = measure(skipping, content)
+        print('  {:10s} {:9.1f} fps  with skip_unchanged {:9.1f} fps ({} of {} frames skipped)'.format(
+          name, len(content) / elapsed, len(content) / skip_elapsed, skipping.skipped, len(content)))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,96 @@
+"""Counting lines and dwell zones through the spatial grid vs testing every
+segment against every line and every point against every zone.
+
+The trajectories of `assets/*.csv` are loaded, then 1, 10 and 100 random
+counting lines and polygon zones spread over each scene are evaluated both
+ways, on the same stacked segments and points. Per line counts and per zone
+dwell times must agree, also with `ObjTrajectories.count_lines` and
+`zone_dwell`.
+
+python3 adhoc/bench_regions.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from geometry import points_in_polygons
+from tracking.crossings import count_crosses, stack_segments
+from tracking.regions import CountingLines, Zones
+from tracking.trajectories import ObjTrajectories
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+COUNTS = [1, 10, 100]
+REPEAT = 5
+
+def random_lines(rng, count, size):
+  start = rng.uniform(0, 1, (count, 2)) * size
+  end = start + rng.normal(0, 0.1, (count, 2)) * size
+  return [(tuple(p0), tuple(p1)) for p0, p1 in zip(start.tolist(), end.tolist())]
+
+def random_zones(rng, count, size):
+  zones = []
+  for _ in range(count):
+    center = rng.uniform(0, 1, 2) * size
+    vertices = rng.integers(3, 9)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    radii = rng.uniform(0.02, 0.1, vertices) * size.min()
+    zones.append([tuple(center + radius * np.array([np.cos(angle), np.sin(angle)]))
+                  for angle, radius in zip(angles, radii)])
+  return zones
+
+def brute_force_lines(segments, cross_segments):
+  return np.array([count_crosses(segments, cross_segment) for cross_segment in cross_segments])
+
+def brute_force_dwell(track_points, polygons):
+  track_ids = np.concatenate([np.full(len(points), track_id) for track_id, points in track_points])
+  cx = np.concatenate([points.cx for _, points in track_points])
+  cy = np.concatenate([points.cy for _, points in track_points])
+  timestamps = np.concatenate([points.timestamp for _, points in track_points])
+  same_track = track_ids[1:] == track_ids[:-1]
+  visitors, seconds = [], []
+  for polygon in polygons:
+    vertices = np.broadcast_to(np.array(polygon), (len(cx), len(polygon), 2))
+    inside = points_in_polygons(cx, cy, vertices)
+    visitors.append(len(np.unique(track_ids[inside])))
+    stays = inside[1:] & inside[:-1] & same_track
+    seconds.append(np.sum(np.diff(timestamps)[stays]))
+  return np.array(visitors), np.array(seconds)
+
+def measure(function, *args):
+  start = time.perf_counter()
+  for _ in range(REPEAT):
+    result = function(*args)
+  return (time.perf_counter() - start) / REPEAT, result
+
+def main():
+  rng = np.random.default_rng(0)
+  for filename in CSV_FILES:
+    trajectories = ObjTrajectories(None)
+    trajectories.load_csv(os.path.join(ASSETS, filename))
+    track_points = [(traj.track_id, points) for traj, points in trajectories.select()]
+    segments = stack_segments(track_points).segments
+    size = np.max(segments[:, 2:], axis=0)
+    print('{}: {} tracks, {} segments'.format(filename, len(track_points), len(segments)))
+    for count in COUNTS:
+      lines = CountingLines(random_lines(rng, count, size))
+      grid_time, counts = measure(lines.count, segments)
+      brute_time, reference = measure(brute_force_lines, segments, lines.cross_segments)
+      assert (counts == reference).all() and (trajectories.count_lines(lines) == counts).all()
+      zones = Zones(random_zones(rng, count, size))
+      zone_time, dwell = measure(zones.dwell, track_points)
+      brute_zone_time, (visitors, seconds) = measure(brute_force_dwell, track_points, zones.polygons)
+      assert (dwell.visitors == visitors).all() and np.allclose(dwell.seconds, seconds)
+      assert np.allclose(trajectories.zone_dwell(zones).seconds, seconds)
+      print('  {:3d} lines: grid {:7.2f} ms, every line {:7.2f} ms ({} crossings)   '
+            '{:3d} zones: grid {:7.2f} ms, every zone {:7.2f} ms ({:.0f} s dwell)'.format(
+              count, grid_time * 1000, brute_time * 1000, int(counts.sum()),
+              count, zone_time * 1000, brute_zone_time * 1000, dwell.seconds.sum()))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,83 @@
+"""Per-frame latency of the vectorized SORT vs the reference SORT implementation.
+
+Replays the detections recorded in `assets/*.csv` (one box per collected
+point, grouped by frame) through `tracker.VectorizedSort` and, if it is
+installed in third_party/sort-master (see gstreamer/install_requirements.sh),
+through `sort.Sort`. To see how both scale with the number of tracks, each
+frame is also replayed with its detections copied side by side `copies` times.
+When both trackers run, their outputs are checked to be the same.
+
+python3 adhoc/bench_tracker.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+sys.path.append(os.path.join(ROOT, 'third_party', 'sort-master'))
+
+from tracker import VectorizedSort
+from tracking.csv_chunks import read_csv_chunks
+from tracking.point_store import PointStore
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+COPIES = [1, 4, 16]
+
+try:
+  import sort
+except ImportError:
+  sort = None
+
+def read_frames(filename):
+  points = PointStore()
+  for chunk in read_csv_chunks(filename):
+    points.extend(chunk.columns())
+  boxes = np.column_stack((points.x, points.y, points.x + points.w, points.y + points.h, points.score))
+  frames = points.frame
+  order = np.argsort(frames, kind='stable')
+  starts = np.flatnonzero(np.diff(frames[order], prepend=-1))
+  return np.split(boxes[order], starts[1:])
+
+def tile(frames, copies):
+  """Copies every frame's boxes side by side, shifted right by the width of the scene."""
+  width = max(frame[:, 2].max() for frame in frames if len(frame)) + 1
+  shifts = np.zeros((copies, 5))
+  shifts[:, [0, 2]] = (np.arange(copies) * width)[:, None]
+  return [(frame[None, :, :] + shifts[:, None, :]).reshape(-1, 5) for frame in frames]
+
+def replay(tracker, frames):
+  outputs, latencies = [], np.empty(len(frames))
+  for i, detections in enumerate(frames):
+    start = time.perf_counter()
+    outputs.append(tracker.update(detections))
+    latencies[i] = time.perf_counter() - start
+  return outputs, latencies
+
+def main():
+  if sort is None:
+    print('third_party/sort-master is not installed, timing the vectorized tracker only')
+  for filename in CSV_FILES:
+    frames = read_frames(os.path.join(ASSETS, filename))
+    print('{}: {} frames'.format(filename, len(frames)))
+    for copies in COPIES:
+      tiled = tile(frames, copies)
+      tracks = np.mean([len(frame) for frame in tiled])
+      outputs, latencies = replay(VectorizedSort(), tiled)
+      line = '  {:5.1f} boxes/frame  vectorized {:7.3f} ms/frame'.format(tracks, latencies.mean() * 1000)
+      if sort is not None:
+        # Ids of the reference tracker are counted across instances.
+        sort.KalmanBoxTracker.count = 0
+        reference, reference_latencies = replay(sort.Sort(), tiled)
+        for output, expected in zip(outputs, reference):
+          assert output.shape == expected.shape
+          assert np.allclose(output, expected)
+        line += '  reference {:7.3f} ms/frame  speedup {:.1f}x'.format(
+          reference_latencies.mean() * 1000, reference_latencies.mean() / latencies.mean())
+      print(line)
+
+if __name__ == '__main__':
+  main()
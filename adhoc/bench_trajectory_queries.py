@@ -0,0 +1,75 @@
+"""Window queries over hours of trajectories: indexed `ObjTrajectories.select` vs the
+previous deepcopy + per-point filtering.
+
+The people CSV is repeated back to back, with fresh track ids and shifted
+timestamps, until it covers `HOURS` hours. Then "persons between t and t+30s"
+crossing counts are computed both ways for windows spread over the whole
+recording and must agree.
+
+python3 adhoc/bench_trajectory_queries.py
+"""
+import copy
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from tracking.crossings import collect_segments, count_crosses
+from tracking.csv_chunks import read_csv_chunks
+from tracking.point_store import PointStore
+from tracking.trajectories import ObjTrajectories
+from tracking.trajectory import filter_by_timestamp
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILE = 'people_walking_standing_1080p.csv'
+CROSS_SEGMENT = ((290.0, 0), (285.0, 270.0))
+HOURS = 2
+WINDOW = 30.0
+QUERIES = 20
+
+def build(hours):
+  points = PointStore()
+  for chunk in read_csv_chunks(os.path.join(ASSETS, CSV_FILE)):
+    points.extend(chunk.columns())
+  duration = float(points.timestamp.max()) + 1
+  id_step = int(points.id.max()) + 1
+  copies = int(np.ceil(hours * 3600 / duration))
+  trajectories = ObjTrajectories(CROSS_SEGMENT)
+  for i in range(copies):
+    columns = { name: column.copy() for name, column in points.columns().items() }
+    columns['id'] += i * id_step
+    columns['timestamp'] += i * duration
+    trajectories.add_points(PointStore.from_columns(columns))
+  return trajectories, copies * duration
+
+def legacy_count(obj_trajectories, start_time, end_time, label):
+  trajectories = copy.deepcopy(obj_trajectories.trajectories)
+  trajectories = { key: value for key, value in trajectories.items() if value.average_label == label }
+  batch = collect_segments(trajectories.values(), [filter_by_timestamp(start_time, end_time)])
+  return count_crosses(batch.segments, CROSS_SEGMENT) if len(batch.segments) else (0, 0)
+
+def main():
+  start = time.perf_counter()
+  trajectories, duration = build(HOURS)
+  points = sum(len(traj.points) for traj in trajectories.trajectories.values())
+  print('{:.1f} h, {} tracks, {} points, built in {:.1f} s'.format(
+    duration / 3600, len(trajectories.trajectories), points, time.perf_counter() - start))
+  windows = np.linspace(0, duration - WINDOW, QUERIES)
+
+  start = time.perf_counter()
+  indexed = [trajectories.count_crosses(t, t + WINDOW, label='person') for t in windows]
+  indexed_time = (time.perf_counter() - start) / QUERIES
+  start = time.perf_counter()
+  legacy = [legacy_count(trajectories, t, t + WINDOW, 'person') for t in windows[:3]]
+  legacy_time = (time.perf_counter() - start) / 3
+  assert indexed[:3] == legacy, (indexed[:3], legacy)
+
+  print('persons in a {:.0f} s window: indexed {:8.3f} ms/query, deepcopy + filter {:8.1f} ms/query ({:.0f}x)'.format(
+    WINDOW, indexed_time * 1000, legacy_time * 1000, legacy_time / indexed_time))
+
+if __name__ == '__main__':
+  main()
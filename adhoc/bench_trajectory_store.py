@@ -0,0 +1,107 @@
+"""Memory and speed of the columnar trajectory store vs per-point namedtuples.
+
+The legacy layout (one `DetectedObject` per row in a list per track) is
+rebuilt here from the same CSV rows so both layouts are measured side by side.
+
+`build` adds parsed rows one at a time. The columnar side is slower there: every
+point updates the running state of its `Trajectory` (last segment, lifetime,
+label totals) and stores ten NumPy scalars, where the legacy layout only
+appends a tuple to a list. `load` reads the whole file, as
+`ObjTrajectories.load_csv` does in chunks of columns, against the legacy
+`csv.DictReader` loop.
+
+python3 adhoc/bench_trajectory_store.py
+"""
+import csv
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from tracking.detected_object import DetectedObject
+from tracking.trajectories import ObjTrajectories
+from tracking.trajectory import Trajectory
+
+ASSETS = os.path.join(ROOT, 'assets')
+CSV_FILES = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+
+def read_rows(filename):
+  with open(filename, 'r') as csvfile:
+    return list(csv.DictReader(csvfile))
+
+def build_legacy(rows):
+  tracks = {}
+  for row in rows:
+    row = DetectedObject.from_dict(dict(row))
+    tracks.setdefault(row.id, []).append(row)
+  return tracks
+
+def build_columnar(rows):
+  tracks = {}
+  for row in rows:
+    row = DetectedObject.from_dict(dict(row))
+    if row.id not in tracks:
+      tracks[row.id] = Trajectory(row.id)
+    tracks[row.id].add_object(row)
+  return tracks
+
+def load_legacy(filename):
+  return build_legacy(read_rows(filename))
+
+def load_columnar(filename):
+  trajectories = ObjTrajectories(None)
+  trajectories.load_csv(filename)
+  return trajectories
+
+def legacy_pass(tracks):
+  for points in tracks.values():
+    [((a.cx, a.cy), (b.cx, b.cy)) for a, b in zip(points, points[1:])]
+
+def columnar_pass(tracks):
+  for traj in tracks.values():
+    traj.get_segment_arrays()
+
+def measure(build, rows):
+  """Returns built tracks, the bytes they retain once building is done and the best
+  build time, which is measured without tracemalloc slowing down allocations."""
+  tracemalloc.start()
+  tracks = build(rows)
+  retained, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return tracks, retained, best_time(build, rows, repeat=5)
+
+def timed(fn, *args, repeat=20):
+  start = time.perf_counter()
+  for _ in range(repeat):
+    fn(*args)
+  return (time.perf_counter() - start) / repeat
+
+def best_time(fn, *args, repeat):
+  times = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn(*args)
+    times.append(time.perf_counter() - start)
+  return min(times)
+
+def main():
+  for name in CSV_FILES:
+    filename = os.path.join(ASSETS, name)
+    rows = read_rows(filename)
+    legacy, legacy_bytes, legacy_build = measure(build_legacy, rows)
+    columnar, columnar_bytes, columnar_build = measure(build_columnar, rows)
+    print('{}: {} rows, {} tracks'.format(name, len(rows), len(legacy)))
+    print('  memory   legacy {:9.1f} KiB  columnar {:9.1f} KiB'.format(
+      legacy_bytes / 1024, columnar_bytes / 1024))
+    print('  build    legacy {:9.3f} ms   columnar {:9.3f} ms'.format(
+      legacy_build * 1000, columnar_build * 1000))
+    print('  load     legacy {:9.3f} ms   columnar {:9.3f} ms'.format(
+      best_time(load_legacy, filename, repeat=5) * 1000, best_time(load_columnar, filename, repeat=5) * 1000))
+    print('  segments legacy {:9.3f} ms   columnar {:9.3f} ms'.format(
+      timed(legacy_pass, legacy) * 1000, timed(columnar_pass, columnar) * 1000))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,73 @@
+"""Converts collector CSVs to binary trajectory logs and checks the round trip.
+
+python3 adhoc/csv_to_binary_log.py [file.csv ...]
+
+Without arguments the CSVs in `assets/` are converted next to themselves.
+Each log is read back and compared with the CSV: ids, labels, frames and
+timestamps must match exactly and the float32 columns must equal the CSV
+values rounded to float32. Parse times of both formats are printed.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'gstreamer'))
+
+from tracking.binary_log import EXTENSION, RECORD_DTYPE, BinaryLog, BinaryLogWriter, convert_csv
+from tracking.csv_chunks import read_csv_chunks
+from tracking.point_store import PointStore
+from tracking.trajectories import ObjTrajectories
+
+ASSETS = os.path.join(ROOT, 'assets')
+
+def read_csv(filename):
+  store = PointStore()
+  for chunk in read_csv_chunks(filename):
+    store.extend(chunk.columns())
+  return store
+
+def check_round_trip(csv_filename, log_filename):
+  expected = read_csv(csv_filename)
+  log = BinaryLog(log_filename)
+  points = log.points
+  assert len(points) == len(expected)
+  for name in ('id', 'frame', 'timestamp'):
+    assert np.array_equal(points.column(name), expected.column(name)), name
+  for name in ('x', 'y', 'w', 'h', 'score'):
+    assert np.array_equal(points.column(name), expected.column(name).astype(RECORD_DTYPE[name])), name
+  assert [log.labels.label(code) for code in points.label_codes.tolist()] ==\
+    [expected.labels.label(code) for code in expected.label_codes.tolist()]
+  # Writing the log back out must reproduce it byte for byte.
+  copy_filename = log_filename + '.copy'
+  with BinaryLogWriter(copy_filename, labels=log.labels) as writer:
+    writer.write(points)
+  with open(log_filename, 'rb') as original, open(copy_filename, 'rb') as copy:
+    assert original.read() == copy.read()
+  os.remove(copy_filename)
+
+def timed_load(load, filename):
+  trajectories = ObjTrajectories(((0, 300), (1280, 300)))
+  start = time.perf_counter()
+  getattr(trajectories, load)(filename)
+  return time.perf_counter() - start, trajectories
+
+def main():
+  filenames = sys.argv[1:] or [os.path.join(ASSETS, name) for name in sorted(os.listdir(ASSETS)) if name.endswith('.csv')]
+  for csv_filename in filenames:
+    log_filename = os.path.splitext(csv_filename)[0] + EXTENSION
+    rows = convert_csv(csv_filename, log_filename)
+    check_round_trip(csv_filename, log_filename)
+    csv_time, from_csv = timed_load('load_csv', csv_filename)
+    log_time, from_log = timed_load('load_binary', log_filename)
+    print('{}: {} rows, {} -> {} bytes, round trip ok'.format(
+      os.path.basename(csv_filename), rows, os.path.getsize(csv_filename), os.path.getsize(log_filename)))
+    print('  load csv {:7.2f} ms  in/out {}'.format(csv_time * 1000,
+      (from_csv._cross_clockwise_counter, from_csv._cross_counter_clockwise_counter)))
+    print('  load trk {:7.2f} ms  in/out {}'.format(log_time * 1000,
+      (from_log._cross_clockwise_counter, from_log._cross_counter_clockwise_counter)))
+
+if __name__ == '__main__':
+  main()
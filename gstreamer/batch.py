@@ -0,0 +1,148 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Counts crossings and tracks of many collector logs in parallel.
+
+Every file (CSV or binary log) is loaded, filtered and counted by a worker
+process, which sends back a small `TrajectorySummary`; the summaries are
+merged into one report. Files are independent, so with enough files the wall
+time goes down about linearly with the number of workers.
+
+Summarize all logs of a directory on every core:
+python3 batch.py /home/mendel/csv --cross 290 0 285 270
+
+Only persons between 10 s and 40 s, with 4 workers, also written as JSON:
+python3 batch.py ../assets --cross 290 0 285 270 --label person \
+  --start_time 10 --end_time 40 --workers 4 --json /tmp/report.json
+
+One occupancy heatmap of all cameras (.png, or .npz to merge it again later):
+python3 batch.py /home/mendel/csv --heatmap /tmp/week.png --heatmap_size 1920 1080
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
+from tracking.binary_log import EXTENSION as BINARY_LOG_EXTENSION
+from tracking.heatmap import LAYERS as HEATMAP_LAYERS, Heatmap
+from tracking.summary import TrajectorySummary
+from tracking.trajectories import ObjTrajectories
+
+def find_logs(paths):
+    """Returns the collector logs among `paths` and in the directories among them.
+
+    A recording found in a directory both as CSV and as binary log (e.g. after
+    adhoc/csv_to_binary_log.py) is only returned once, as the binary log.
+    """
+    logs = []
+    for path in paths:
+        if not os.path.isdir(path):
+            logs.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            binary_stems = {name[:-len(BINARY_LOG_EXTENSION)] for name in names if name.endswith(BINARY_LOG_EXTENSION)}
+            logs.extend(os.path.join(root, name) for name in sorted(names)
+                        if name.endswith(BINARY_LOG_EXTENSION)
+                        or name.endswith('.csv') and name[:-len('.csv')] not in binary_stems)
+    return logs
+
+def summarize_file(filename, cross_segment=None, start_time=0, end_time=None, label=None, name=None,
+                   heatmap_size=None):
+    """Loads one collector log and returns its `TrajectorySummary`, under `name` if given,
+    with a heatmap of `heatmap_size` if given."""
+    # Points are only needed to count crossings in a time window or draw a heatmap.
+    keep_points = start_time != 0 or end_time is not None or heatmap_size is not None
+    trajectories = ObjTrajectories(cross_segment)
+    if filename.endswith(BINARY_LOG_EXTENSION):
+        trajectories.load_binary(filename, keep_points=keep_points)
+    else:
+        trajectories.load_csv(filename, keep_points=keep_points)
+    summary = TrajectorySummary.from_trajectories(name or filename, trajectories, start_time, end_time, label)
+    if heatmap_size is not None:
+        summary.heatmap = Heatmap(heatmap_size)
+        summary.heatmap.add_trajectories(trajectories, start_time, end_time, label=label)
+    return summary
+
+def summarize(filenames, cross_segment=None, start_time=0, end_time=None, label=None, workers=None, names=None,
+              heatmap_size=None):
+    """Summarizes `filenames` on a pool of `workers` processes (all cores by default).
+
+    Largest files are started first so that no worker is left with a big file at the end.
+    """
+    names = names or filenames
+    jobs = sorted(zip(filenames, names), key=lambda job: os.path.getsize(job[0]), reverse=True)
+    summary = TrajectorySummary()
+    if workers == 1:
+        for filename, name in jobs:
+            summary.merge(summarize_file(filename, cross_segment, start_time, end_time, label, name, heatmap_size))
+        return summary
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(summarize_file, filename, cross_segment, start_time, end_time, label, name,
+                                   heatmap_size)
+                   for filename, name in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            summary.merge(future.result())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+', help='collector logs (.csv or binary) or directories of them')
+    parser.add_argument('--cross', type=float, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'),
+                        help='line to count crossings of, in pixels')
+    parser.add_argument('--start_time', type=float, default=0,
+                        help='only count points from this many seconds')
+    parser.add_argument('--end_time', type=float, default=None,
+                        help='only count points up to this many seconds')
+    parser.add_argument('--label', help='only count tracks with this average label, e.g. person')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes, all cores by default')
+    parser.add_argument('--json', help='file to write the report to as JSON')
+    parser.add_argument('--heatmap', help='file to write the heatmap of all selected points to, '
+                        'a .png image or the raw .npz counts')
+    parser.add_argument('--heatmap_size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), default=(1920, 1080),
+                        help='scene size of the heatmap, in pixels')
+    parser.add_argument('--heatmap_layer', default='occupancy', choices=HEATMAP_LAYERS,
+                        help='heatmap layer drawn in a .png')
+    args = parser.parse_args()
+
+    filenames = find_logs(args.paths)
+    if not filenames:
+        parser.error('no collector logs found')
+    cross_segment = None
+    if args.cross:
+        cross_segment = (tuple(args.cross[:2]), tuple(args.cross[2:]))
+    # Files are reported relative to the common directory, so that equal names stay apart.
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(name)) for name in filenames])
+    names = [os.path.relpath(os.path.abspath(name), root) for name in filenames]
+
+    start = time.perf_counter()
+    summary = summarize(filenames, cross_segment, args.start_time, args.end_time, args.label, args.workers, names,
+                        args.heatmap_size if args.heatmap else None)
+    print(summary.format_report())
+    print('{} files in {:.2f} s'.format(len(filenames), time.perf_counter() - start))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary.to_dict(), f, indent=1)
+    if args.heatmap:
+        if args.heatmap.endswith('.npz'):
+            summary.heatmap.save(args.heatmap)
+        else:
+            summary.heatmap.save_png(args.heatmap, args.heatmap_layer)
+
+
+if __name__ == '__main__':
+    main()
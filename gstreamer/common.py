@@ -12,20 +12,64 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Common utilities."""
-import collections
-import gi
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst
+"""Common utilities.
+
+GStreamer and the TFLite runtime are imported on first use, so the module
+loads with NumPy only.
+"""
+import contextlib
 import numpy as np
-import svgwrite
-import tflite_runtime.interpreter as tflite
-import time
 
 EDGETPU_SHARED_LIB = 'libedgetpu.so.1'
 
+_Gst = None
+
+def _gst():
+    """Returns the Gst module, imported on first use."""
+    global _Gst
+    if _Gst is None:
+        import gi
+        gi.require_version('Gst', '1.0')
+        from gi.repository import Gst
+        _Gst = Gst
+    return _Gst
+
+def _tflite():
+    """Returns tflite_runtime.interpreter, imported on first use."""
+    import tflite_runtime.interpreter as tflite
+    return tflite
+
+@contextlib.contextmanager
+def map_buffer(buf):
+    """Maps a Gst.Buffer for reading and yields its memory as a uint8 array.
+
+    The array must not be used after the block exits. It views the mapped
+    memory where the bindings map to a memoryview (gst-python 1.18 and later);
+    plain PyGObject hands out a bytes copy of the frame instead.
+    """
+    Gst = _gst()
+    result, mapinfo = buf.map(Gst.MapFlags.READ)
+    if not result:
+        raise RuntimeError('Failed to map Gst.Buffer')
+    try:
+        yield np.frombuffer(mapinfo.data, dtype=np.uint8)
+    finally:
+        buf.unmap(mapinfo)
+
 def make_interpreter(model_file):
+    """Opens `model_file`, optionally suffixed with `@device`.
+
+    Devices are Edge TPU names such as `usb:0` or `pci:1`, `cpu` for the plain
+    TFLite interpreter (needs the CPU version of the model) or `stub` for a
+    `stub_interpreter.StubInterpreter` that ignores the model.
+    """
     model_file, *device = model_file.split('@')
+    if device == ['stub']:
+        from stub_interpreter import StubInterpreter
+        return StubInterpreter()
+    tflite = _tflite()
+    if device == ['cpu']:
+        return tflite.Interpreter(model_path=model_file)
     return tflite.Interpreter(
       model_path=model_file,
       experimental_delegates=[
@@ -33,6 +77,16 @@ def make_interpreter(model_file):
                                {'device': device[0]} if device else {})
       ])
 
+def make_interpreters(model_file):
+    """Opens one interpreter per device of `model.tflite@device[,device...]`.
+
+    Returns a list of (device, interpreter) pairs; device is '' without suffix.
+    """
+    model_file, *devices = model_file.split('@', 1)
+    devices = devices[0].split(',') if devices else ['']
+    return [(device, make_interpreter('{}@{}'.format(model_file, device) if device else model_file))
+            for device in devices]
+
 def input_image_size(interpreter):
     """Returns input size as (width, height, channels) tuple."""
     _, height, width, channels = interpreter.get_input_details()[0]['shape']
@@ -45,7 +99,7 @@ def input_tensor(interpreter):
 
 def set_input(interpreter, buf):
     """Copies data to input tensor."""
-    result, mapinfo = buf.map(Gst.MapFlags.READ)
+    result, mapinfo = buf.map(_gst().MapFlags.READ)
     if result:
         np_buffer = np.reshape(np.frombuffer(mapinfo.data, dtype=np.uint8),
             interpreter.get_input_details()[0]['shape'])
@@ -63,13 +117,56 @@ def output_tensor(interpreter, i):
         return output_data - zero_point
     return scale * (output_data - zero_point)
 
-def avg_fps_counter(window_size):
-    window = collections.deque(maxlen=window_size)
-    prev = time.monotonic()
-    yield 0.0  # First fps value.
+class CachedInterpreter:
+    """Interpreter wrapper that resolves tensor details once.
+
+    Tensor indices, shapes and quantization parameters are read at construction
+    (after `allocate_tensors()`); outputs are dequantized into preallocated
+    float32 buffers, so the per-frame path does not allocate. Returned outputs
+    are overwritten by the next `output_tensor` call for the same index.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        input_details = interpreter.get_input_details()[0]
+        self.input_shape = tuple(int(d) for d in input_details['shape'])
+        self._input = interpreter.tensor(input_details['index'])
+        self._outputs = []
+        for details in interpreter.get_output_details():
+            shape = tuple(int(d) for d in details['shape'] if d != 1)
+            scale, zero_point = details.get('quantization', (0.0, 0))
+            self._outputs.append((interpreter.tensor(details['index']),
+                                  np.empty(shape, dtype=np.float32),
+                                  np.float32(scale), zero_point))
+
+    def input_image_size(self):
+        """Returns input size as (width, height, channels) tuple."""
+        _, height, width, channels = self.input_shape
+        return width, height, channels
+
+    def input_tensor(self):
+        """Returns input tensor view as numpy array of shape (height, width, channels)."""
+        return self._input()[0]
+
+    def set_input(self, buf):
+        """Copies a Gst.Buffer (or a uint8 array) to the input tensor.
+
+        Copies as often as the legacy `set_input` (see `map_buffer`), but with
+        the input shape and tensor resolved once instead of per frame.
+        """
+        if isinstance(buf, np.ndarray):
+            np.copyto(self._input(), buf.reshape(self.input_shape))
+            return
+        with map_buffer(buf) as data:
+            np.copyto(self._input(), data.reshape(self.input_shape))
+
+    def invoke(self):
+        self.interpreter.invoke()
 
-    while True:
-        curr = time.monotonic()
-        window.append(curr - prev)
-        prev = curr
-        yield len(window) / sum(window)
+    def output_tensor(self, i):
+        """Returns dequantized output tensor `i` in its preallocated buffer."""
+        tensor, output, scale, zero_point = self._outputs[i]
+        raw = tensor().reshape(output.shape)
+        np.subtract(raw, zero_point, out=output, dtype=np.float32)
+        if scale != 0:
+            np.multiply(output, scale, out=output)
+        return output
@@ -25,6 +25,25 @@ python3 detect.py --videosrc /dev/video1 --videofmt jpeg
 Choose an Object Tracker. Example : To run sort tracker
 python3 detect.py --tracker sort
 
+Overlap inference, tracking and rendering of consecutive frames
+python3 detect.py --tracker sort --pipelined
+
+Run several cameras sharing one interpreter, each with its own tracker and log
+python3 detect.py --tracker sort --pipelined --videosrc /dev/video0 /dev/video1
+
+Count objects crossing one or more lines, in source pixels
+python3 detect.py --tracker sort --cross_segment 320 0 320 480 --cross_segment 0 240 640 240
+
+Run the detector on every 3rd frame only, drawing tracker predictions in between
+python3 detect.py --tracker sort --detect_every 3
+
+Accumulate a heatmap of the tracked paths, written on exit (.png, or .npz for the raw counts):
+python3 detect.py --tracker sort --heatmap /tmp/paths.png --heatmap_layer paths
+
+Spread frames over several Edge TPUs, or over stub interpreters without one
+python3 detect.py --pipelined --model ${MODEL}@usb:0,usb:1
+python3 detect.py --pipelined --model ${MODEL}@stub,stub
+
 TEST_DATA=../all_models
 
 Run coco model:
@@ -35,16 +54,24 @@ python3 detect.py \
 import argparse
 import collections
 import common
-import gstreamer
+import metrics
 import numpy as np
 import os
+import overlay
 import re
-import svgwrite
 import time
-from tracker import ObjectTracker
-from tracking.collector import CollectorSingletone
+from scheduler import InferenceScheduler
+from tracker import DetectionCadence, ObjectTracker, match_detections
+from tracking.collector import Collector, CollectorSingletone
+from tracking.heatmap import LAYERS as HEATMAP_LAYERS, Heatmap
+from tracking.live_crossings import LiveCrossingCounter
 
 Object = collections.namedtuple('Object', ['id', 'score', 'bbox'])
+FrameResult = collections.namedtuple('FrameResult', [
+    'src_size', 'inference_box', 'mot_tracker', 'detections', 'class_ids',
+    'inference_time', 'trdata', 'tracker_flag', 'matches', 'predicted'], defaults=(None, False))
+# Size the source is scaled to; boxes, cross segments and heatmaps are in its pixels.
+SRC_SIZE = (640, 480)
 
 def load_labels(path):
     p = re.compile(r'\s*(\d+)(.+)')
@@ -53,33 +80,34 @@ def load_labels(path):
         return {int(num): text.strip() for num, text in lines}
 
 
-def shadow_text(dwg, x, y, text, font_size=20):
-    dwg.add(dwg.text(text, insert=(x+1, y+1), fill='black', font_size=font_size))
-    dwg.add(dwg.text(text, insert=(x, y), fill='white', font_size=font_size))
+def generate_svg(src_size, inference_size, inference_box, detections, class_ids, labels, text_lines, trdata, trackerFlag,
+                 collector=CollectorSingletone, matches=None, renderer=None, analytics=None, predicted=False):
+    """Renders the overlay for `detections`, an (N, 5) array of xmin, ymin, xmax, ymax, score
+    rows with their `class_ids`, or for the tracker output `trdata` when `trackerFlag` is set.
+    `matches` are the indices of the detections of the tracked boxes, see `match_detections`.
+    Tracked points are added to `collector`, and their centroids to `analytics`, a
+    `LiveCrossingCounter` whose lines and counts are drawn too. `predicted` tracked boxes
+    come from the tracker alone (see `DetectionCadence`) and are labeled and collected so.
 
-
-def generate_svg(src_size, inference_size, inference_box, objs, labels, text_lines, trdata, trackerFlag):
-    dwg = svgwrite.Drawing('', size=src_size)
+    The SVG is built by `renderer` (see `overlay`), svgwrite by default. A renderer that
+    skips unchanged frames returns None for them."""
+    if renderer is None:
+        renderer = overlay.SvgwriteRenderer()
     src_w, src_h = src_size
     inf_w, inf_h = inference_size
     box_x, box_y, box_w, box_h = inference_box
     scale_x, scale_y = src_w / box_w, src_h / box_h
 
-    CollectorSingletone.increment_frame_number()
-    for y, line in enumerate(text_lines, start=1):
-        shadow_text(dwg, 10, y*20, line)
+    collector.increment_frame_number()
+    boxes, track_ids, cx, cy = [], [], [], []
     if trackerFlag and (np.array(trdata)).size:
-        for td in trdata:
-            x0, y0, x1, y1, trackID = td[0].item(), td[1].item(
-            ), td[2].item(), td[3].item(), td[4].item()
-            overlap = 0
-            for ob in objs:
-                dx0, dy0, dx1, dy1 = ob.bbox.xmin.item(), ob.bbox.ymin.item(
-                ), ob.bbox.xmax.item(), ob.bbox.ymax.item()
-                area = (min(dx1, x1)-max(dx0, x0))*(min(dy1, y1)-max(dy0, y0))
-                if (area > overlap):
-                    overlap = area
-                    obj = ob
+        trdata = np.asarray(trdata)
+        if matches is None:
+            matches = match_detections(trdata, detections)
+        for (x0, y0, x1, y1, trackID), match in zip(trdata[:, :5].tolist(), matches.tolist()):
+            # A track without a detection has no score or class to show.
+            if match < 0:
+                continue
 
             # Relative coordinates.
             x, y, w, h = x0, y0, x1 - x0, y1 - y0
@@ -90,17 +118,21 @@ def generate_svg(src_size, inference_size, inference_box, objs, labels, text_lin
             x, y = x - box_x, y - box_y
             # Scale to source coordinate space.
             x, y, w, h = x * scale_x, y * scale_y, w * scale_x, h * scale_y
-            percent = int(100 * obj.score)
-            label_name = labels.get(obj.id, obj.id)
+            score = detections[match, 4]
+            class_id = int(class_ids[match])
+            percent = int(100 * score)
+            label_name = labels.get(class_id, class_id)
             label = '{}% {} ID:{}'.format(
                 percent, label_name, int(trackID))
-            shadow_text(dwg, x, y - 5, label)
-            dwg.add(dwg.rect(insert=(x, y), size=(w, h),
-                             fill='none', stroke='red', stroke_width='2'))
-            CollectorSingletone.add_point(label_name, x, y, w, h, int(trackID), obj.score)
+            if predicted:
+                label += ' predicted'
+            boxes.append(overlay.OverlayBox(x, y, w, h, label))
+            collector.add_point(label_name, x, y, w, h, int(trackID), score, predicted)
+            track_ids.append(int(trackID))
+            cx.append(x + w / 2)
+            cy.append(y + h / 2)
     else:
-        for obj in objs:
-            x0, y0, x1, y1 = list(obj.bbox)
+        for (x0, y0, x1, y1, score), class_id in zip(detections.tolist(), class_ids.tolist()):
             # Relative coordinates.
             x, y, w, h = x0, y0, x1 - x0, y1 - y0
             # Absolute coordinates, input tensor space.
@@ -110,12 +142,15 @@ def generate_svg(src_size, inference_size, inference_box, objs, labels, text_lin
             x, y = x - box_x, y - box_y
             # Scale to source coordinate space.
             x, y, w, h = x * scale_x, y * scale_y, w * scale_x, h * scale_y
-            percent = int(100 * obj.score)
-            label = '{}% {}'.format(percent, labels.get(obj.id, obj.id))
-            shadow_text(dwg, x, y - 5, label)
-            dwg.add(dwg.rect(insert=(x, y), size=(w, h),
-                             fill='none', stroke='red', stroke_width='2'))
-    return dwg.tostring()
+            percent = int(100 * score)
+            label = '{}% {}'.format(percent, labels.get(class_id, class_id))
+            boxes.append(overlay.OverlayBox(x, y, w, h, label))
+    lines = ()
+    if analytics is not None:
+        analytics.update(track_ids, cx, cy)
+        text_lines = list(text_lines) + analytics.text_lines()
+        lines = analytics.cross_segments
+    return renderer.render(src_size, text_lines, boxes, lines)
 
 
 class BBox(collections.namedtuple('BBox', ['xmin', 'ymin', 'xmax', 'ymax'])):
@@ -126,30 +161,44 @@ class BBox(collections.namedtuple('BBox', ['xmin', 'ymin', 'xmax', 'ymax'])):
     __slots__ = ()
 
 
+def get_detections(interpreter, score_threshold, top_k):
+    """Returns detections above `score_threshold` among the first `top_k` output slots
+    of a `common.CachedInterpreter`.
+
+    The result is an (N, 5) float32 array of xmin, ymin, xmax, ymax, score rows
+    (boxes clipped to [0, 1]), ready for the tracker, and an (N,) int array of
+    class ids.
+    """
+    boxes = interpreter.output_tensor(0)[:top_k]
+    category_ids = interpreter.output_tensor(1)[:top_k]
+    scores = interpreter.output_tensor(2)[:top_k]
+
+    keep = scores >= score_threshold
+    detections = np.empty((np.count_nonzero(keep), 5), dtype=np.float32)
+    # Output boxes are ymin, xmin, ymax, xmax.
+    np.maximum(boxes[keep][:, [1, 0]], 0.0, out=detections[:, 0:2])
+    np.minimum(boxes[keep][:, [3, 2]], 1.0, out=detections[:, 2:4])
+    detections[:, 4] = scores[keep]
+    return detections, category_ids[keep].astype(int)
+
+
 def get_output(interpreter, score_threshold, top_k, image_scale=1.0):
-    """Returns list of detected objects."""
-    boxes = common.output_tensor(interpreter, 0)
-    category_ids = common.output_tensor(interpreter, 1)
-    scores = common.output_tensor(interpreter, 2)
-
-    def make(i):
-        ymin, xmin, ymax, xmax = boxes[i]
-        return Object(
-            id=int(category_ids[i]),
-            score=scores[i],
-            bbox=BBox(xmin=np.maximum(0.0, xmin),
-                      ymin=np.maximum(0.0, ymin),
-                      xmax=np.minimum(1.0, xmax),
-                      ymax=np.minimum(1.0, ymax)))
-    return [make(i) for i in range(top_k) if scores[i] >= score_threshold]
+    """Returns list of detected objects from a `common.CachedInterpreter`."""
+    detections, class_ids = get_detections(interpreter, score_threshold, top_k)
+    return [Object(id=int(class_id), score=score, bbox=BBox(*box))
+            for (*box, score), class_id in zip(detections, class_ids)]
 
 
 def main():
+    # Loads GStreamer and GTK, so detect.py's helpers can be imported without them.
+    import gstreamer
+
     default_model_dir = '../models'
     default_model = 'mobilenet_ssd_v2_coco_quant_postprocess_edgetpu.tflite'
     default_labels = 'coco_labels.txt'
     parser = argparse.ArgumentParser()
-    parser.add_argument('--model', help='.tflite model path',
+    parser.add_argument('--model', help='.tflite model path, optionally followed by '
+                        '@device[,device...] to open one interpreter per device',
                         default=os.path.join(default_model_dir, default_model))
     parser.add_argument('--labels', help='label file path',
                         default=os.path.join(default_model_dir, default_labels))
@@ -157,69 +206,281 @@ def main():
                         help='number of categories with highest score to display')
     parser.add_argument('--threshold', type=float, default=0.1,
                         help='classifier score threshold')
-    parser.add_argument('--videosrc', help='Which video source to use. ',
-                        default='/dev/video0')
+    parser.add_argument('--videosrc', help='Which video source to use. Several sources '
+                        'share the interpreter, each with its own tracker and log.',
+                        nargs='+', default=['/dev/video0'])
     parser.add_argument('--videofmt', help='Input video format.',
                         default='raw',
                         choices=['raw', 'h264', 'jpeg'])
     parser.add_argument('--tracker', help='Name of the Object Tracker To be used.',
                         default=None,
-                        choices=[None, 'sort'])
+                        choices=[None, 'sort', 'sort_legacy'])
+    parser.add_argument('--log_dir', help='Directory for collected detection logs.',
+                        default='/home/mendel/csv')
+    parser.add_argument('--log_format', help='Format of collected detection logs.',
+                        default='csv', choices=['csv', 'binary'])
+    parser.add_argument('--spill_interval', type=float, default=0,
+                        help='seconds between background flushes of collected points '
+                             'to rotating logs in --log_format; 0 keeps everything in memory until exit')
+    parser.add_argument('--spill_buffer_rows', type=int, default=100000,
+                        help='points buffered in memory between flushes when spilling')
+    parser.add_argument('--spill_rotate_rows', type=int, default=1000000,
+                        help='rows per log file when spilling')
+    parser.add_argument('--overlay', help='overlay renderer; svgwrite builds a DOM per frame, '
+                        'template formats the same SVG from string templates',
+                        default='template', choices=sorted(overlay.RENDERERS))
+    parser.add_argument('--overlay_text_interval', type=float, default=0.5,
+                        help='seconds between updates of the inference time and fps text, '
+                             'so that frames whose boxes did not change are not rendered again')
+    parser.add_argument('--cross_segment', type=float, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'),
+                        action='append', default=[],
+                        help='line, in source pixels, to count tracked objects crossing live; '
+                             'may be repeated')
+    parser.add_argument('--heatmap', help='file to write a heatmap of the collected points to on exit, '
+                        '.png or .npz; with several sources, the source name is appended to the file name')
+    parser.add_argument('--heatmap_layer', default='occupancy', choices=HEATMAP_LAYERS,
+                        help='heatmap layer drawn in a .png')
+    parser.add_argument('--detect_every', type=int, default=1, metavar='N',
+                        help='run the detector on every N-th frame only; the sort tracker predicts '
+                             'the boxes of the frames in between')
+    parser.add_argument('--max_error', type=float,
+                        help='adapt the detection interval, up to --detect_every, to keep the distance '
+                             'between detections and predictions below this many box sizes')
+    parser.add_argument('--max_motion', type=float,
+                        help='also detect as soon as a predicted box moved this many box sizes '
+                             'since its last detection')
+    parser.add_argument('--metrics_file', help='JSON file the latency histograms and frame '
+                        'counters are written to every --metrics_interval seconds')
+    parser.add_argument('--metrics_interval', type=float, default=metrics.EXPORT_INTERVAL,
+                        help='seconds between writes of --metrics_file')
+    parser.add_argument('--metrics_port', type=int,
+                        help='serve the metrics as JSON on http://127.0.0.1:PORT/')
+    parser.add_argument('--metrics_socket', help='serve the metrics as JSON on this Unix socket')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='run invoke, tracking and rendering on separate threads '
+                             'so consecutive frames overlap')
     args = parser.parse_args()
+    use_cadence = args.detect_every > 1 or args.max_error is not None or args.max_motion is not None
+    if use_cadence and args.tracker != 'sort':
+        parser.error('--detect_every, --max_error and --max_motion need --tracker sort')
+    if args.cross_segment and not args.tracker:
+        parser.error('--cross_segment needs --tracker')
 
     print('Loading {} with {} labels.'.format(args.model, args.labels))
-    interpreter = common.make_interpreter(args.model)
-    interpreter.allocate_tensors()
+    devices, interpreters = [], []
+    for device, interpreter in common.make_interpreters(args.model):
+        interpreter.allocate_tensors()
+        devices.append(device or 'default')
+        interpreters.append(common.CachedInterpreter(interpreter))
+    interpreter = interpreters[0]
     labels = load_labels(args.labels)
 
-    w, h, _ = common.input_image_size(interpreter)
+    w, h, _ = interpreter.input_image_size()
     inference_size = (w, h)
-    # Average fps over last 30 frames.
-    fps_counter = common.avg_fps_counter(30)
 
-    def user_callback(input_tensor, src_size, inference_box, mot_tracker):
-        nonlocal fps_counter
-        start_time = time.monotonic()
-        common.set_input(interpreter, input_tensor)
+    # With several streams or devices, one scheduler thread per device owns its
+    # interpreter and serves the streams' frames in turn. With --pipelined a
+    # stream keeps several frames in flight, so it can use several devices.
+    scheduler = None
+    if len(args.videosrc) > 1 or len(interpreters) > 1:
+        scheduler = InferenceScheduler(interpreters, devices)
+
+    # Spans of all streams, named '<stream>.<span>' with several streams.
+    registry = metrics.Metrics()
+
+    def infer(interpreter, input_tensor, timers):
+        set_input_timer, invoke_timer, get_output_timer = timers
+        start_time = metrics.now()
+        interpreter.set_input(input_tensor)
+        invoke_time = metrics.now()
+        set_input_timer.record(invoke_time - start_time)
         interpreter.invoke()
+        output_time = metrics.now()
+        invoke_timer.record(output_time - invoke_time)
         # For larger input image sizes, use the edgetpu.classification.engine for better performance
-        objs = get_output(interpreter, args.threshold, args.top_k)
-        end_time = time.monotonic()
-        detections = []  # np.array([])
-        for n in range(0, len(objs)):
-            element = []  # np.array([])
-            element.append(objs[n].bbox.xmin)
-            element.append(objs[n].bbox.ymin)
-            element.append(objs[n].bbox.xmax)
-            element.append(objs[n].bbox.ymax)
-            element.append(objs[n].score)  # print('element= ',element)
-            detections.append(element)  # print('dets: ',dets)
-        # convert to numpy array #      print('npdets: ',dets)
-        detections = np.array(detections)
-        trdata = []
-        trackerFlag = False
-        if detections.any():
-            if mot_tracker != None:
-                trdata = mot_tracker.update(detections)
-                trackerFlag = True
-            text_lines = [
-                'Inference: {:.2f} ms'.format((end_time - start_time) * 1000),
-                'FPS: {} fps'.format(round(next(fps_counter))), ]
-        if len(objs) != 0:
-            return generate_svg(src_size, inference_size, inference_box, objs, labels, text_lines, trdata, trackerFlag)
-
-    def user_callback_on_exit():
-        # todo: remove hardcoded value; get from args
-        csv_filpath = f'/home/mendel/csv/{os.path.basename(args.videosrc)}'
-        CollectorSingletone.dump(csv_filpath)
-
-    result = gstreamer.run_pipeline(user_callback,
-                                    src_size=(640, 480),
-                                    appsink_size=inference_size,
-                                    trackerName=args.tracker,
-                                    videosrc=args.videosrc,
-                                    videofmt=args.videofmt,
-                                    user_function_on_exit=user_callback_on_exit)
+        detections, class_ids = get_detections(interpreter, args.threshold, args.top_k)
+        end_time = metrics.now()
+        get_output_timer.record(end_time - output_time)
+        return detections, class_ids, (end_time - start_time) / 1e9
+
+    def make_stream(name, videosrc, collector):
+        prefix = name + '.' if len(args.videosrc) > 1 else ''
+        timers = tuple(registry.histogram(prefix + span) for span in ('set_input', 'invoke', 'get_output'))
+        track_timer = registry.histogram(prefix + 'track')
+        render_timer = registry.histogram(prefix + 'generate_svg')
+        # Frames are counted by the pipeline; the fps shown is their rate over the last 30.
+        frame_counter = registry.counter(prefix + 'frames')
+        predicted_counter = registry.counter(prefix + 'predicted')
+        renderer = overlay.make_renderer(args.overlay)
+        text_lines, text_time = [], 0.0
+        cadence = DetectionCadence(args.detect_every, args.max_error, args.max_motion) if use_cadence else None
+        # Shown on the frames the detector skips.
+        last_inference_time = 0.0
+
+        def print_crossings(events, counter):
+            for event in events:
+                print('{}track {} crossed line {} {}'.format(
+                    '{}: '.format(name) if len(args.videosrc) > 1 else '', event.track_id, event.line,
+                    'in' if event.clockwise else 'out'))
+
+        analytics = None
+        if args.cross_segment:
+            analytics = LiveCrossingCounter(
+                [(tuple(cross[:2]), tuple(cross[2:])) for cross in args.cross_segment],
+                callback=print_crossings)
+
+        log_filepath = os.path.join(args.log_dir, name)
+        if args.log_format == 'binary':
+            log_filepath += '.trk'
+        if args.spill_interval > 0:
+            collector.enable_spill(log_filepath,
+                                   buffer_rows=args.spill_buffer_rows,
+                                   flush_interval=args.spill_interval,
+                                   rotate_rows=args.spill_rotate_rows)
+        heatmap_filepath = args.heatmap
+        if args.heatmap:
+            if len(args.videosrc) > 1:
+                root, ext = os.path.splitext(args.heatmap)
+                heatmap_filepath = '{}-{}{}'.format(root, name, ext)
+            collector.enable_heatmap(Heatmap(SRC_SIZE))
+
+        def skipped_frame(src_size, inference_box, mot_tracker):
+            return FrameResult(src_size, inference_box, mot_tracker, None, None, last_inference_time,
+                               trdata=[], tracker_flag=False, predicted=True)
+
+        def invoke_stage(input_tensor, src_size, inference_box, mot_tracker):
+            nonlocal last_inference_time
+            if cadence and not cadence.detect_next():
+                return skipped_frame(src_size, inference_box, mot_tracker)
+            if scheduler:
+                detections, class_ids, inference_time = scheduler.run(name, infer, input_tensor, timers)
+            else:
+                detections, class_ids, inference_time = infer(interpreter, input_tensor, timers)
+            last_inference_time = inference_time
+            return FrameResult(src_size, inference_box, mot_tracker, detections, class_ids,
+                               inference_time, trdata=[], tracker_flag=False)
+
+        def submit_stage(input_tensor, src_size, inference_box, mot_tracker):
+            if cadence and not cadence.detect_next():
+                return None, src_size, inference_box, mot_tracker
+            return scheduler.submit(name, infer, input_tensor, timers), src_size, inference_box, mot_tracker
+
+        def wait_stage(submitted):
+            nonlocal last_inference_time
+            # Requests are waited on in submission order, whichever device finishes first.
+            request, src_size, inference_box, mot_tracker = submitted
+            if request is None:
+                return skipped_frame(src_size, inference_box, mot_tracker)
+            detections, class_ids, inference_time = request.wait()
+            last_inference_time = inference_time
+            return FrameResult(src_size, inference_box, mot_tracker, detections, class_ids,
+                               inference_time, trdata=[], tracker_flag=False)
+
+        def track_stage(frame):
+            if cadence:
+                # Also without detections, so that predictions stop at tracks the detector lost.
+                start_time = metrics.now()
+                trdata, detections, class_ids, matches = cadence.track(
+                    frame.mot_tracker, frame.detections, frame.class_ids)
+                track_timer.record_since(start_time)
+                if frame.predicted:
+                    predicted_counter.increment()
+                return frame._replace(detections=detections, class_ids=class_ids, trdata=trdata,
+                                      tracker_flag=True, matches=matches)
+            if frame.detections.any() and frame.mot_tracker != None:
+                start_time = metrics.now()
+                trdata = frame.mot_tracker.update(frame.detections)
+                track_timer.record_since(start_time)
+                # Trackers that know which detection updated each returned track report it.
+                matches = getattr(frame.mot_tracker, 'detection_indices', None)
+                if matches is None:
+                    matches = match_detections(trdata, frame.detections)
+                return frame._replace(trdata=trdata, tracker_flag=True, matches=matches)
+            return frame
+
+        def render_stage(frame):
+            nonlocal text_lines, text_time
+            # Every frame is rendered, so boxes of a frame without detections are cleared;
+            # unchanged frames are skipped by the renderer.
+            if time.monotonic() - text_time >= args.overlay_text_interval:
+                text_time = time.monotonic()
+                text_lines = [
+                    'Inference: {:.2f} ms'.format(frame.inference_time * 1000),
+                    'FPS: {} fps'.format(round(frame_counter.rate)), ]
+            start_time = metrics.now()
+            svg = generate_svg(frame.src_size, inference_size, frame.inference_box, frame.detections,
+                               frame.class_ids, labels, text_lines, frame.trdata, frame.tracker_flag,
+                               collector, frame.matches, renderer, analytics, frame.predicted)
+            render_timer.record_since(start_time)
+            return svg
+
+        def user_callback(input_tensor, src_size, inference_box, mot_tracker):
+            return render_stage(track_stage(invoke_stage(input_tensor, src_size, inference_box, mot_tracker)))
+
+        def user_callback_on_exit():
+            collector.dump(log_filepath)
+            if heatmap_filepath:
+                if heatmap_filepath.endswith('.npz'):
+                    collector.heatmap.save(heatmap_filepath)
+                else:
+                    collector.heatmap.save_png(heatmap_filepath, args.heatmap_layer)
+
+        user_stages = None
+        if args.pipelined and scheduler:
+            user_stages = [('submit', submit_stage), ('invoke', wait_stage),
+                           ('track', track_stage), ('render', render_stage)]
+        elif args.pipelined:
+            user_stages = [('invoke', invoke_stage), ('track', track_stage), ('render', render_stage)]
+
+        return gstreamer.make_pipeline(user_callback,
+                                       src_size=SRC_SIZE,
+                                       appsink_size=inference_size,
+                                       trackerName=args.tracker,
+                                       videosrc=videosrc,
+                                       videofmt=args.videofmt,
+                                       user_function_on_exit=user_callback_on_exit,
+                                       user_stages=user_stages,
+                                       collector=collector,
+                                       name=name if len(args.videosrc) > 1 else None,
+                                       metrics=registry,
+                                       metrics_prefix=prefix)
+
+    def run_streams():
+        if not scheduler:
+            videosrc = args.videosrc[0]
+            make_stream(os.path.basename(videosrc), videosrc, CollectorSingletone).run()
+            return
+
+        names = [os.path.basename(videosrc) for videosrc in args.videosrc]
+        # Same file names from different directories get their position appended.
+        names = [name if names.count(name) == 1 else '{}-{}'.format(name, i) for i, name in enumerate(names)]
+        collectors = [CollectorSingletone] if len(names) == 1 else [Collector() for _ in names]
+        pipelines = [make_stream(name, videosrc, collector)
+                     for name, videosrc, collector in zip(names, args.videosrc, collectors)]
+        scheduler.start()
+        try:
+            gstreamer.run_pipelines(pipelines)
+        finally:
+            scheduler.stop()
+            print('Inference:', scheduler.format_stats())
+
+    exporter = None
+    if args.metrics_file:
+        exporter = metrics.MetricsExporter(registry, args.metrics_file, args.metrics_interval)
+        exporter.start()
+    servers = []
+    if args.metrics_port:
+        servers.append(metrics.serve_http(registry, args.metrics_port))
+    if args.metrics_socket:
+        servers.append(metrics.serve_unix(registry, args.metrics_socket))
+    try:
+        run_streams()
+    finally:
+        if exporter:
+            exporter.stop()
+        for server in servers:
+            server.shutdown()
+        print('Metrics:', registry.format_stats())
 
 
 if __name__ == '__main__':
@@ -1,3 +1,5 @@
+import numpy as np
+
 EPS = 2e-8
 
 def get_line_parameters(p1, p2):
@@ -37,4 +39,80 @@ def point_to_segment_orientation(segment, point):
     xp, yp = point
     ((x0, y0), (x1, y1)) = segment
     cross_product = (x1 - xp) * (y0 - yp) - (x0 - xp) * (y1 - yp)
-    return cross_product > 0
\ No newline at end of file
+    return cross_product > 0
+
+def segment_pairs_intersection_mask(segments1, segments2):
+    """`segments_intersection` of the rows of two (N, 4) segment arrays, pair by pair.
+
+    `segments2` may also be a single (1, 4) row, tested against every row of
+    `segments1`. Uses the same arithmetic as the scalar functions, so the mask is
+    True exactly where `segments_intersection` would return a point for the pair.
+    """
+    x0, y0, x1, y1 = (segments1[:, i] for i in range(4))
+    q0x, q0y, q1x, q1y = (segments2[:, i] for i in range(4))
+    A1, B1, C1 = y0 - y1, x1 - x0, -(x0*y1 - x1*y0)
+    A2, B2, C2 = q0y - q1y, q1x - q0x, -(q0x*q1y - q1x*q0y)
+    D  = A1 * B2 - B1 * A2
+    Dx = C1 * B2 - B1 * C2
+    Dy = A1 * C2 - C1 * A2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = Dx / D
+        y = Dy / D
+    on_segments = (D != 0)
+    on_segments &= (np.minimum(x0, x1) - EPS <= x) & (x <= np.maximum(x0, x1) + EPS)
+    on_segments &= (np.minimum(y0, y1) - EPS <= y) & (y <= np.maximum(y0, y1) + EPS)
+    on_segments &= (np.minimum(q0x, q1x) - EPS <= x) & (x <= np.maximum(q0x, q1x) + EPS)
+    on_segments &= (np.minimum(q0y, q1y) - EPS <= y) & (y <= np.maximum(q0y, q1y) + EPS)
+    return on_segments
+
+def segments_intersection_mask(segments, segment):
+    """Vectorized `segments_intersection` for an (N, 4) array of x0, y0, x1, y1 segments.
+
+    Uses the same arithmetic as the scalar functions, so the mask is True exactly
+    where `segments_intersection` would return a point.
+    """
+    return segment_pairs_intersection_mask(segments, np.asarray(segment, dtype=np.float64).reshape(1, 4))
+
+def points_to_segment_orientation(segment, xp, yp):
+    """Vectorized `point_to_segment_orientation` for arrays of point coordinates."""
+    ((x0, y0), (x1, y1)) = segment
+    cross_product = (x1 - xp) * (y0 - yp) - (x0 - xp) * (y1 - yp)
+    return cross_product > 0
+
+def iou_matrix(boxes1, boxes2):
+    """Returns the (N, M) intersection over union of x0, y0, x1, y1 boxes.
+
+    Boxes that do not intersect have an IoU of 0, as do pairs of empty boxes.
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64)[:, None, :4]
+    boxes2 = np.asarray(boxes2, dtype=np.float64)[None, :, :4]
+    w = np.clip(np.minimum(boxes1[..., 2], boxes2[..., 2]) - np.maximum(boxes1[..., 0], boxes2[..., 0]), 0, None)
+    h = np.clip(np.minimum(boxes1[..., 3], boxes2[..., 3]) - np.maximum(boxes1[..., 1], boxes2[..., 1]), 0, None)
+    intersection = w * h
+    area1 = (boxes1[..., 2] - boxes1[..., 0]) * (boxes1[..., 3] - boxes1[..., 1])
+    area2 = (boxes2[..., 2] - boxes2[..., 0]) * (boxes2[..., 3] - boxes2[..., 1])
+    union = area1 + area2 - intersection
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(union > 0, intersection / union, 0.0)
+
+def points_to_segments_orientation(segments, xp, yp):
+    """`point_to_segment_orientation` of points against the rows of an (N, 4) segment array."""
+    x0, y0, x1, y1 = (segments[:, i] for i in range(4))
+    cross_product = (x1 - xp) * (y0 - yp) - (x0 - xp) * (y1 - yp)
+    return cross_product > 0
+
+def points_in_polygons(xp, yp, vertices):
+    """Even-odd test of points against polygons, pair by pair.
+
+    `vertices` is an (N, V, 2) array, the polygon of each of the N points; shorter
+    polygons are padded by repeating a vertex, which adds empty edges only.
+    Returns an (N,) mask of the points strictly inside their polygon.
+    """
+    xi, yi = vertices[..., 0], vertices[..., 1]
+    xj, yj = np.roll(xi, 1, axis=1), np.roll(yi, 1, axis=1)
+    xp, yp = xp[:, None], yp[:, None]
+    straddles = (yi > yp) != (yj > yp)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = (xj - xi) * (yp - yi) / (yj - yi) + xi
+    crosses = straddles & (xp < crossing_x)
+    return (np.count_nonzero(crosses, axis=1) % 2) == 1
@@ -13,8 +13,10 @@
 # limitations under the License.
 
 import sys
-import svgwrite
 import threading
+import time
+from metrics import Metrics, now
+from stages import StagedPipeline
 from tracker import ObjectTracker
 
 import gi
@@ -28,10 +30,30 @@ from tracking.collector import CollectorSingletone
 GObject.threads_init()
 Gst.init(None)
 
+STATS_INTERVAL = 5.0
+
 class GstPipeline:
-    def __init__(self, pipeline, user_function, src_size, mot_tracker, user_function_on_exit=None):
+    def __init__(self, pipeline, user_function, src_size, mot_tracker, user_function_on_exit=None,
+                 user_stages=None, collector=CollectorSingletone, name=None, on_finished=None,
+                 metrics=None, metrics_prefix=''):
         self.user_function = user_function
         self.user_function_on_exit = user_function_on_exit
+        self.collector = collector
+        self.name = name
+        # Called instead of Gtk.main_quit on EOS or error, see run_pipelines.
+        self.on_finished = on_finished
+        self.finished = False
+        # Frames received and dropped before inference, and time spent setting the overlay.
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.frame_counter = self.metrics.counter(metrics_prefix + 'frames')
+        self.drop_counter = self.metrics.counter(metrics_prefix + 'dropped')
+        self.overlay_timer = self.metrics.histogram(metrics_prefix + 'set_overlay')
+        # With user_stages, frames go through a StagedPipeline instead of inference_loop.
+        # A failing stage ends the pipeline as an error message on the bus would.
+        self.stages = StagedPipeline(user_stages, sink=self.set_overlay,
+                                     on_error=lambda stage, e: GLib.idle_add(self.finish)) if user_stages else None
+        self.worker = None
+        self.stats_time = time.monotonic()
         self.running = False
         self.gstbuffer = None
         self.sink_size = None
@@ -54,51 +76,92 @@ class GstPipeline:
         self.setup_window()
 
     def run(self):
+        self.start()
+        try:
+            Gtk.main()
+        except:
+            pass
+        self.stop()
+        self.raise_stage_error()
+
+    def raise_stage_error(self):
+        if self.stages and self.stages.error is not None:
+            raise self.stages.error
+
+    def start(self):
         # Start inference worker.
         self.running = True
-        worker = threading.Thread(target=self.inference_loop)
-        worker.start()
+        if self.stages:
+            self.stages.start()
+        else:
+            self.worker = threading.Thread(target=self.inference_loop)
+            self.worker.start()
 
         # Run pipeline.
         self.pipeline.set_state(Gst.State.PLAYING)
-        try:
-            Gtk.main()
-        except:
-            pass
 
+    def stop(self):
         # Clean up.
         self.pipeline.set_state(Gst.State.NULL)
         while GLib.MainContext.default().iteration(False):
             pass
+        self.stop_inference()
+
+    def stop_inference(self):
+        """Waits for the frames being processed, so that nothing is collected after it returns."""
+        if self.stages:
+            self.stages.stop()
+            return
         with self.condition:
             self.running = False
             self.condition.notify_all()
-        worker.join()
+        if self.worker is not None:
+            self.worker.join()
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            # The frames still in flight are collected before user_function_on_exit dumps them.
+            self.stop_inference()
+            if self.user_function_on_exit is not None:
+                self.user_function_on_exit()
+        finally:
+            if self.on_finished is not None:
+                self.on_finished(self)
+            else:
+                Gtk.main_quit()
 
     def on_bus_message(self, bus, message):
         t = message.type
         if t == Gst.MessageType.EOS:
-            if self.user_function_on_exit is not None:
-                self.user_function_on_exit()
-            Gtk.main_quit()
+            self.finish()
         elif t == Gst.MessageType.WARNING:
             err, debug = message.parse_warning()
             sys.stderr.write('Warning: %s: %s\n' % (err, debug))
         elif t == Gst.MessageType.ERROR:
             err, debug = message.parse_error()
             sys.stderr.write('Error: %s: %s\n' % (err, debug))
-            if self.user_function_on_exit is not None:
-                self.user_function_on_exit()
-            Gtk.main_quit()
+            self.finish()
         return True
 
     def on_new_sample(self, sink):
         sample = sink.emit('pull-sample')
-        CollectorSingletone.start()
+        self.collector.start()
         if not self.sink_size:
             s = sample.get_caps().get_structure(0)
             self.sink_size = (s.get_value('width'), s.get_value('height'))
+        self.frame_counter.increment()
+        if self.stages:
+            dropped = self.stages.put(sample.get_buffer(), self.src_size, self.get_box(), self.mot_tracker)
+            if dropped:
+                self.drop_counter.increment(dropped)
+            return Gst.FlowReturn.OK
         with self.condition:
+            if self.gstbuffer:
+                # The inference loop did not get to the previous frame.
+                self.drop_counter.increment()
             self.gstbuffer = sample.get_buffer()
             self.condition.notify_all()
         return Gst.FlowReturn.OK
@@ -130,18 +193,26 @@ class GstPipeline:
                 gstbuffer = self.gstbuffer
                 self.gstbuffer = None
 
-            # Passing Gst.Buffer as input tensor avoids 2 copies of it:
-            # * Python bindings copies the data when mapping gstbuffer
-            # * Numpy copies the data when creating ndarray.
-            # This requires a recent version of the python3-edgetpu package. If this
-            # raises an exception please make sure dependencies are up to date.
+            # The Gst.Buffer is passed as input tensor; set_input maps it
+            # (common.map_buffer) and copies it into the input tensor.
             input_tensor = gstbuffer
             svg = self.user_function(input_tensor, self.src_size, self.get_box(), self.mot_tracker)
             if svg:
-                if self.overlay:
-                    self.overlay.set_property('data', svg)
-                if self.overlaysink:
-                    self.overlaysink.set_property('svg', svg)
+                self.set_overlay(svg)
+
+    def set_overlay(self, svg):
+        start_time = now()
+        if self.overlay:
+            self.overlay.set_property('data', svg)
+        if self.overlaysink:
+            self.overlaysink.set_property('svg', svg)
+        self.overlay_timer.record_since(start_time)
+        if self.stages and time.monotonic() - self.stats_time > STATS_INTERVAL:
+            self.stats_time = time.monotonic()
+            if self.name:
+                print('Stages {}:'.format(self.name), self.stages.format_stats())
+            else:
+                print('Stages:', self.stages.format_stats())
 
     def setup_window(self):
         # Only set up our own window if we have Coral overlay sink in the pipeline.
@@ -216,7 +287,49 @@ def run_pipeline(user_function,
                  trackerName,
                  videosrc='/dev/video1',
                  videofmt='raw',
-                 user_function_on_exit=None):
+                 user_function_on_exit=None,
+                 user_stages=None):
+    pipeline = make_pipeline(user_function, src_size, appsink_size, trackerName,
+                             videosrc, videofmt, user_function_on_exit, user_stages)
+    pipeline.run()
+
+def run_pipelines(pipelines):
+    """Plays several pipelines from `make_pipeline` in one main loop until all of them finished."""
+    remaining = set(pipelines)
+    def on_finished(pipeline):
+        remaining.discard(pipeline)
+        if not remaining:
+            Gtk.main_quit()
+
+    for pipeline in pipelines:
+        pipeline.on_finished = on_finished
+        pipeline.start()
+    try:
+        Gtk.main()
+    except:
+        pass
+    for pipeline in pipelines:
+        pipeline.stop()
+    for pipeline in pipelines:
+        pipeline.raise_stage_error()
+
+def make_pipeline(user_function,
+                  src_size,
+                  appsink_size,
+                  trackerName,
+                  videosrc='/dev/video1',
+                  videofmt='raw',
+                  user_function_on_exit=None,
+                  user_stages=None,
+                  collector=CollectorSingletone,
+                  name=None,
+                  metrics=None,
+                  metrics_prefix=''):
+    """Builds the GstPipeline for `videosrc` with its own object tracker.
+
+    Frame and drop counters and the overlay latency are recorded in `metrics`
+    (a `metrics.Metrics`) with names starting with `metrics_prefix`.
+    """
     objectOfTracker = None
     if videofmt == 'h264':
         SRC_CAPS = 'video/x-h264,width={width},height={height},framerate=30/1'
@@ -279,5 +392,5 @@ def run_pipeline(user_function,
 
     print('Gstreamer pipeline:\n', pipeline)
 
-    pipeline = GstPipeline(pipeline, user_function, src_size, mot_tracker, user_function_on_exit)
-    pipeline.run()
+    return GstPipeline(pipeline, user_function, src_size, mot_tracker, user_function_on_exit, user_stages,
+                       collector=collector, name=name, metrics=metrics, metrics_prefix=metrics_prefix)
@@ -0,0 +1,250 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency histograms and frame counters of the running pipeline.
+
+Spans are timed with `now()` (integer nanoseconds of a monotonic clock):
+
+    start = metrics.now()
+    interpreter.invoke()
+    registry.histogram('invoke').record_since(start)
+
+Recording appends to a list, which is atomic under the GIL, so any thread can
+record without a lock; every `FOLD_SIZE` values the list is folded into
+log-linear buckets (32 per power of two, so percentiles are within ~3%) with
+NumPy. A span, with both clock reads, costs well under a microsecond
+(see adhoc/bench_metrics.py).
+
+A `Metrics` registry can be written to a JSON file periodically
+(`MetricsExporter`) or served as JSON over local HTTP (`serve_http`) or a Unix
+socket (`serve_unix`).
+"""
+import collections
+import http.server
+import json
+import os
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+now = time.perf_counter_ns
+
+FOLD_SIZE = 1024
+SUB_BUCKET_BITS = 5
+# Buckets up to 2^45 ns (~10 hours); longer spans are counted in the last one.
+MAX_SHIFT = 40
+BUCKETS = (MAX_SHIFT + 2) << SUB_BUCKET_BITS
+EXPORT_INTERVAL = 5.0
+
+def bucket_index(ns):
+    """Returns the bucket of each of the int64 array `ns`."""
+    ns = np.maximum(ns, 1)
+    shift = np.clip(np.floor(np.log2(ns)).astype(np.int64) - SUB_BUCKET_BITS, 0, MAX_SHIFT)
+    return np.minimum((shift << SUB_BUCKET_BITS) + (ns >> shift), BUCKETS - 1)
+
+def bucket_bounds(index):
+    """Returns the [low, high) nanoseconds of each bucket of `index`."""
+    index = np.asarray(index, dtype=np.int64)
+    shift = np.maximum((index >> SUB_BUCKET_BITS) - 1, 0)
+    mantissa = index - (shift << SUB_BUCKET_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    """HDR-style histogram of span durations in nanoseconds."""
+    def __init__(self):
+        self.counts = np.zeros(BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def record(self, ns):
+        pending = self._pending
+        pending.append(ns)
+        if len(pending) >= FOLD_SIZE:
+            self.fold()
+
+    def record_since(self, start):
+        """Records the time since `start`, a value of `now()`."""
+        self.record(now() - start)
+
+    def fold(self):
+        """Moves the recorded values into the buckets."""
+        with self._lock:
+            # Values appended by other threads meanwhile stay for the next fold.
+            size = len(self._pending)
+            if not size:
+                return
+            values = np.array(self._pending[:size], dtype=np.int64)
+            del self._pending[:size]
+            self.counts += np.bincount(bucket_index(values), minlength=BUCKETS)
+            self.count += size
+            self.total += int(values.sum())
+            self.max = max(self.max, int(values.max()))
+
+    def percentile(self, q):
+        """Returns the q-th percentile in nanoseconds: the middle of its bucket, at most `max`."""
+        self.fold()
+        if not self.count:
+            return 0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        low, high = bucket_bounds(index)
+        return min(int(low + high) // 2, self.max)
+
+    def summary(self):
+        """Returns count, mean, p50, p99 and max in milliseconds."""
+        self.fold()
+        return collections.OrderedDict([
+            ('count', self.count),
+            ('mean_ms', self.total / self.count / 1e6 if self.count else 0.0),
+            ('p50_ms', self.percentile(50) / 1e6),
+            ('p99_ms', self.percentile(99) / 1e6),
+            ('max_ms', self.max / 1e6)])
+
+
+class Counter:
+    """Count of events, with their rate over the last `window_size` events."""
+    def __init__(self, window_size=30):
+        self.count = 0
+        self.window = collections.deque(maxlen=window_size)
+
+    def increment(self, n=1):
+        self.count += n
+        self.window.append(time.monotonic())
+
+    @property
+    def rate(self):
+        window = tuple(self.window)
+        if len(window) < 2 or window[-1] == window[0]:
+            return 0.0
+        return (len(window) - 1) / (window[-1] - window[0])
+
+    def summary(self):
+        return collections.OrderedDict([('count', self.count), ('rate', self.rate)])
+
+
+class Metrics:
+    """Named histograms and counters, created on first use."""
+    def __init__(self):
+        self.histograms = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def snapshot(self):
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        return collections.OrderedDict([
+            ('time', time.time()),
+            ('histograms', collections.OrderedDict((name, h.summary()) for name, h in histograms)),
+            ('counters', collections.OrderedDict((name, c.summary()) for name, c in counters))])
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=1)
+
+    def format_stats(self):
+        snapshot = self.snapshot()
+        spans = ' | '.join('{} p50 {:.2f} p99 {:.2f} max {:.2f} ms'.format(
+            name, h['p50_ms'], h['p99_ms'], h['max_ms']) for name, h in snapshot['histograms'].items())
+        counters = ' | '.join('{} {}'.format(name, c['count']) for name, c in snapshot['counters'].items())
+        return ' | '.join(part for part in (spans, counters) if part)
+
+
+class MetricsExporter:
+    """Writes `metrics` as JSON to `path` every `interval` seconds from a daemon thread.
+
+    The file is replaced atomically, so readers never see a partial snapshot.
+    """
+    def __init__(self, metrics, path, interval=EXPORT_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='metrics-exporter', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.export()
+
+    def export(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.metrics.to_json())
+        os.replace(temp_path, self.path)
+
+    def stop(self):
+        """Stops the thread and writes a last snapshot."""
+        self._stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.export()
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
+
+def serve_http(metrics, port, host='127.0.0.1'):
+    """Serves the JSON snapshot of `metrics` to any GET on http://host:port/.
+
+    Returns the server; call its `shutdown()` to stop it.
+    """
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.to_json().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return _serve(http.server.ThreadingHTTPServer((host, port), Handler))
+
+def serve_unix(metrics, path):
+    """Writes the JSON snapshot of `metrics` to every connection to the Unix socket `path`.
+
+    Returns the server; call its `shutdown()` to stop it.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.wfile.write(metrics.to_json().encode('utf-8') + b'\n')
+
+    if os.path.exists(path):
+        os.unlink(path)
+    return _serve(socketserver.ThreadingUnixStreamServer(path, Handler))
@@ -0,0 +1,107 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""SVG overlay renderers.
+
+A renderer turns the content of one frame (the size of the overlay, lines of
+status text, the labelled boxes and the counting lines) into the SVG document rsvgoverlay draws.
+`SvgwriteRenderer` builds it with svgwrite; `TemplateRenderer` formats the
+same markup from string templates, byte for byte identical, without building
+a DOM. With `skip_unchanged`, `render` returns None when the content is the
+same as the previous frame's, so the overlay keeps the document it already
+parsed instead of being sent a copy.
+"""
+import collections
+from xml.sax.saxutils import escape
+
+OverlayBox = collections.namedtuple('OverlayBox', ['x', 'y', 'w', 'h', 'label'])
+
+class Renderer:
+    def __init__(self, skip_unchanged=False):
+        self.skip_unchanged = skip_unchanged
+        self.rendered = 0
+        self.skipped = 0
+        self._last = None
+
+    def render(self, size, text_lines, boxes, lines=()):
+        """Returns the SVG for `boxes`, a list of `OverlayBox` in overlay pixels, and
+        `lines`, ((x0, y0), (x1, y1)) segments in overlay pixels, or None if
+        `skip_unchanged` is set and nothing changed since the last call."""
+        if self.skip_unchanged:
+            content = (tuple(size), tuple(text_lines), tuple(boxes), tuple(lines))
+            if content == self._last:
+                self.skipped += 1
+                return None
+            self._last = content
+        self.rendered += 1
+        return self.render_svg(size, text_lines, boxes, lines)
+
+    def render_svg(self, size, text_lines, boxes, lines=()):
+        raise NotImplementedError
+
+
+class SvgwriteRenderer(Renderer):
+    def render_svg(self, size, text_lines, boxes, lines=()):
+        import svgwrite
+        dwg = svgwrite.Drawing('', size=size)
+        for start, end in lines:
+            dwg.add(dwg.line(start=start, end=end, stroke='blue', stroke_width='4'))
+        for y, line in enumerate(text_lines, start=1):
+            shadow_text(dwg, 10, y*20, line)
+        for x, y, w, h, label in boxes:
+            shadow_text(dwg, x, y - 5, label)
+            dwg.add(dwg.rect(insert=(x, y), size=(w, h),
+                             fill='none', stroke='red', stroke_width='2'))
+        return dwg.tostring()
+
+
+def shadow_text(dwg, x, y, text, font_size=20):
+    dwg.add(dwg.text(text, insert=(x+1, y+1), fill='black', font_size=font_size))
+    dwg.add(dwg.text(text, insert=(x, y), fill='white', font_size=font_size))
+
+
+# svgwrite writes attributes sorted by name and numbers with str().
+SVG_HEAD = ('<svg baseProfile="full" height="{1}" version="1.1" width="{0}" '
+            'xmlns="http://www.w3.org/2000/svg" xmlns:ev="http://www.w3.org/2001/xml-events" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink"><defs />')
+SVG_TAIL = '</svg>'
+SHADOW_TEXT = ('<text fill="black" font-size="20" x="{}" y="{}">{text}</text>'
+               '<text fill="white" font-size="20" x="{}" y="{}">{text}</text>')
+LINE = '<line stroke="blue" stroke-width="4" x1="{}" x2="{}" y1="{}" y2="{}" />'
+RECT = '<rect fill="none" height="{}" stroke="red" stroke-width="2" width="{}" x="{}" y="{}" />'
+
+class TemplateRenderer(Renderer):
+    def render_svg(self, size, text_lines, boxes, lines=()):
+        parts = [SVG_HEAD.format(*size)]
+        for (x0, y0), (x1, y1) in lines:
+            parts.append(LINE.format(x0, x1, y0, y1))
+        for y, line in enumerate(text_lines, start=1):
+            y *= 20
+            parts.append(SHADOW_TEXT.format(11, y + 1, 10, y, text=escape(line)))
+        for x, y, w, h, label in boxes:
+            # Same arithmetic as shadow_text(dwg, x, y - 5, label) so floats print the same.
+            text_y = y - 5
+            parts.append(SHADOW_TEXT.format(x + 1, text_y + 1, x, text_y, text=escape(label)))
+            parts.append(RECT.format(h, w, x, y))
+        parts.append(SVG_TAIL)
+        return ''.join(parts)
+
+
+RENDERERS = {
+    'svgwrite': SvgwriteRenderer,
+    'template': TemplateRenderer,
+}
+
+def make_renderer(name, skip_unchanged=True):
+    return RENDERERS[name](skip_unchanged)
@@ -0,0 +1,246 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replays detections through the tracker and analytics as fast as possible,
+without a camera, GStreamer or an interpreter.
+
+Each frame goes through the steps detect.py runs after inference: the object
+tracker, the collector (one point per tracked box), ObjTrajectories with its
+crossing counters and, with counting lines, the live crossing counter.
+Frames per second of each step are printed at the end.
+
+Replay the detections of a collector log (CSV or binary):
+python3 replay.py --input ../assets/reail_store_1_720p.csv
+
+Replay 50 synthetic objects moving around for 5000 frames:
+python3 replay.py --synthetic 50 --frames 5000
+
+Count crossings of a line and keep the collected points:
+python3 replay.py --input ../assets/people_walking_standing_1080p.csv \
+  --cross 290 0 285 270 --output /tmp/replayed.csv
+
+Accumulate a heatmap of the paths while replaying (.png, or .npz for the raw counts):
+python3 replay.py --input ../assets/reail_store_1_720p.csv --heatmap /tmp/paths.png --heatmap_layer paths
+
+Count crossings of several lines live (ObjTrajectories counts the first one):
+python3 replay.py --input ../assets/people_walking_standing_1080p.csv \
+  --cross 290 0 285 270 --cross 0 150 640 150
+
+Use the detections of every 4th frame only, and tracker predictions in between:
+python3 replay.py --input ../assets/people_walking_standing_1080p.csv \
+  --cross 290 0 285 270 --detect_every 4 --max_error 0.5
+"""
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from tracker import DetectionCadence, ObjectTracker, match_detections
+from tracking.binary_log import EXTENSION as BINARY_LOG_EXTENSION, BinaryLog
+from tracking.collector import Collector
+from tracking.csv_chunks import read_csv_chunks
+from tracking.heatmap import LAYERS as HEATMAP_LAYERS, Heatmap
+from tracking.live_crossings import LiveCrossingCounter
+from tracking.point_store import PointStore
+from tracking.trajectories import ObjTrajectories
+
+# Pixel boxes, scores and label codes of the detections of one frame.
+ReplayFrame = collections.namedtuple('ReplayFrame', ['boxes', 'scores', 'labels'])
+STAGES = ['track', 'collect', 'analytics', 'live', 'heatmap']
+SYNTHETIC_SIZE = (1280, 720)
+# The number the collector gives the first frame.
+FIRST_FRAME = 1
+
+def load_frames(filename):
+    """Returns the frames of a collector log, its label names and the scene size.
+
+    There is one frame per frame number from `FIRST_FRAME` to the last one
+    logged: the frames without any collected point have no detections, so the
+    tracker ages its tracks over them as it did live.
+    """
+    if filename.endswith(BINARY_LOG_EXTENSION):
+        points = BinaryLog(filename).points
+    else:
+        points = PointStore()
+        for chunk in read_csv_chunks(filename):
+            points.extend(chunk.columns())
+    order = np.argsort(points.frame, kind='stable')
+    points = points.select(order)
+    boxes = np.column_stack((points.x, points.y, points.x + points.w, points.y + points.h))
+    last = points.frame[-1] if len(points) else FIRST_FRAME - 1
+    bounds = np.searchsorted(points.frame, np.arange(FIRST_FRAME, last + 2))
+    frames = [ReplayFrame(boxes[start:end], points.score[start:end], points.label_codes[start:end])
+              for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+    size = (boxes[:, 2].max(), boxes[:, 3].max()) if len(boxes) else SYNTHETIC_SIZE
+    return frames, points.labels.names(), size
+
+def synthetic_frames(objects, frames, size=SYNTHETIC_SIZE, miss_rate=0.05, seed=0):
+    """Yields frames of `objects` boxes bouncing around a `size` scene, each missed
+    by the detector with probability `miss_rate`."""
+    rng = np.random.default_rng(seed)
+    size = np.array(size, dtype=float)
+    extent = rng.uniform((30, 60), (80, 200), (objects, 2))
+    position = rng.uniform(0, 1, (objects, 2)) * (size - extent)
+    velocity = rng.normal(0, 4, (objects, 2))
+    for _ in range(frames):
+        position += velocity
+        bounce = (position < 0) | (position > size - extent)
+        velocity[bounce] *= -1
+        np.clip(position, 0, size - extent, out=position)
+        visible = rng.random(objects) >= miss_rate
+        count = np.count_nonzero(visible)
+        yield ReplayFrame(np.column_stack((position[visible], position[visible] + extent[visible])),
+                          rng.uniform(0.4, 0.95, count), np.zeros(count, dtype=int))
+
+def replay(frames, label_names, size, tracker_name='sort', cross_segments=(), heatmap=None, cadence=None):
+    """Runs `frames` through a new tracker, Collector, ObjTrajectories counting
+    the first of `cross_segments`, a LiveCrossingCounter counting all of them
+    and, if given, adds the collected points of every frame to `heatmap`.
+    With a `DetectionCadence`, the detections of the frames it skips are not
+    used and the collected boxes of those frames are predicted.
+
+    Returns the collector, the trajectories, the live counter, the number of
+    frames and the seconds spent in each of `STAGES`.
+    """
+    mot_tracker = ObjectTracker(tracker_name).trackerObject.mot_tracker
+    collector = Collector()
+    collector.start()
+    trajectories = ObjTrajectories(cross_segments[0] if cross_segments else None)
+    live = LiveCrossingCounter(cross_segments)
+    seconds = collections.OrderedDict((stage, 0.0) for stage in STAGES)
+    # The tracker sees relative coordinates, as in detect.py.
+    scale = np.array([size[0], size[1], size[0], size[1]], dtype=float)
+    count = 0
+    for frame in frames:
+        start = time.perf_counter()
+        labels, predicted = frame.labels, False
+        detections = np.column_stack((frame.boxes / scale, frame.scores))
+        if cadence is not None:
+            predicted = not cadence.detect_next()
+            trdata, detections, labels, matches = cadence.track(
+                mot_tracker, None if predicted else detections, None if predicted else labels)
+        else:
+            trdata = mot_tracker.update(detections)
+            matches = getattr(mot_tracker, 'detection_indices', None)
+            if matches is None:
+                matches = match_detections(trdata, detections)
+        tracked = time.perf_counter()
+
+        first = len(collector.points)
+        collector.increment_frame_number()
+        tracked_boxes = np.asarray(trdata)[:, :4].reshape(-1, 4) * scale
+        track_ids = np.asarray(trdata)[:, 4].reshape(-1)
+        for (x0, y0, x1, y1), track_id, match in zip(tracked_boxes.tolist(), track_ids.tolist(), matches.tolist()):
+            if match < 0:
+                continue
+            collector.add_point(label_names[labels[match]], x0, y0, x1 - x0, y1 - y0,
+                                int(track_id), float(detections[match, 4]), predicted)
+        collected = time.perf_counter()
+
+        points = collector.points.select(slice(first, None))
+        trajectories.add_points(points)
+        analyzed = time.perf_counter()
+
+        if cross_segments:
+            live.update(points.id, points.cx, points.cy)
+        counted = time.perf_counter()
+
+        if heatmap is not None:
+            heatmap.add_points(points)
+        drawn = time.perf_counter()
+
+        seconds['track'] += tracked - start
+        seconds['collect'] += collected - tracked
+        seconds['analytics'] += analyzed - collected
+        seconds['live'] += counted - analyzed
+        seconds['heatmap'] += drawn - counted
+        count += 1
+    return collector, trajectories, live, count, seconds
+
+def format_report(count, seconds):
+    lines = ['{:10s} {:10.1f} fps {:8.3f} ms/frame'.format(stage, count / t if t else float('inf'), 1000 * t / count)
+             for stage, t in seconds.items()]
+    total = sum(seconds.values())
+    lines.append('{:10s} {:10.1f} fps {:8.3f} ms/frame'.format('total', count / total if total else float('inf'),
+                                                                1000 * total / count))
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='collector log (.csv or binary) to replay the detections of')
+    source.add_argument('--synthetic', type=int, metavar='OBJECTS',
+                        help='number of synthetic moving objects to replay instead')
+    parser.add_argument('--frames', type=int, default=1000,
+                        help='number of synthetic frames')
+    parser.add_argument('--tracker', help='Name of the Object Tracker To be used.',
+                        default='sort', choices=['sort', 'sort_legacy'])
+    parser.add_argument('--cross', type=float, nargs=4, metavar=('X0', 'Y0', 'X1', 'Y1'),
+                        action='append', default=[],
+                        help='line to count crossings of, in pixels; may be repeated')
+    parser.add_argument('--detect_every', type=int, default=1, metavar='N',
+                        help='use the detections of every N-th frame only, and tracker predictions '
+                             'in between (sort tracker only)')
+    parser.add_argument('--max_error', type=float,
+                        help='adapt the detection interval, up to --detect_every, to keep the distance '
+                             'between detections and predictions below this many box sizes')
+    parser.add_argument('--max_motion', type=float,
+                        help='also detect as soon as a predicted box moved this many box sizes '
+                             'since its last detection')
+    parser.add_argument('--output', help='file (.csv or binary) to write the collected points to')
+    parser.add_argument('--heatmap', help='file to write a heatmap of the collected points to, '
+                        'a .png image or the raw .npz counts')
+    parser.add_argument('--heatmap_layer', default='occupancy', choices=HEATMAP_LAYERS,
+                        help='heatmap layer drawn in a .png')
+    args = parser.parse_args()
+    cadence = None
+    if args.detect_every > 1 or args.max_error is not None or args.max_motion is not None:
+        if args.tracker != 'sort':
+            parser.error('--detect_every, --max_error and --max_motion need --tracker sort')
+        cadence = DetectionCadence(args.detect_every, args.max_error, args.max_motion)
+
+    if args.input:
+        frames, label_names, size = load_frames(args.input)
+    else:
+        # Generated up front so that generation is not timed as part of a stage.
+        frames = list(synthetic_frames(args.synthetic, args.frames))
+        label_names, size = ['person'], SYNTHETIC_SIZE
+    cross_segments = [(tuple(cross[:2]), tuple(cross[2:])) for cross in args.cross]
+
+    heatmap = Heatmap(np.ceil(size)) if args.heatmap else None
+    collector, trajectories, live, count, seconds = replay(frames, label_names, size, args.tracker, cross_segments,
+                                                           heatmap, cadence)
+    print('{} frames, {} points, {} tracks'.format(count, len(collector.points), len(trajectories.trajectories)))
+    if cadence:
+        print('Detected {} frames, predicted {} frames ({} points)'.format(
+            cadence.detected_frames, cadence.predicted_frames, np.count_nonzero(collector.points.predicted)))
+    if cross_segments:
+        print('Crosses clockwise {} counter clockwise {}'.format(
+            trajectories._cross_clockwise_counter, trajectories._cross_counter_clockwise_counter))
+        for line, (clockwise, counter_clockwise) in enumerate(live.counts.tolist()):
+            print('Live line {}: clockwise {} counter clockwise {}'.format(line, clockwise, counter_clockwise))
+    print(format_report(count, seconds))
+    if args.output:
+        collector.dump(args.output)
+    if args.heatmap:
+        if args.heatmap.endswith('.npz'):
+            heatmap.save(args.heatmap)
+        else:
+            heatmap.save_png(args.heatmap, args.heatmap_layer)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Round-robin inference scheduling for several streams sharing interpreters.
+
+Streams submit requests from their own threads. One worker thread per
+interpreter (e.g. one per Edge TPU) takes the next request whenever it is
+free, visiting streams with pending requests in round-robin order, so a fast
+camera cannot starve a slow one and every interpreter is only ever used from
+its own thread.
+
+A stream may have several requests in flight on different interpreters; they
+may finish out of order, but waiting on them in submission order (as the
+pipeline stages after the invoke stage do) hands frames to tracking in order.
+"""
+import collections
+import threading
+import time
+
+STATS_INTERVAL = 5.0
+
+class Request:
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self):
+        """Blocks until the request was served and returns its result."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class StreamStats:
+    """Completion times of the last `window_size` requests of a stream or interpreter."""
+    def __init__(self, window_size=30):
+        self.window = collections.deque(maxlen=window_size)
+        self.served = 0
+
+    def add(self, timestamp):
+        self.window.append(timestamp)
+        self.served += 1
+
+    @property
+    def fps(self):
+        if len(self.window) < 2 or self.window[-1] == self.window[0]:
+            return 0.0
+        return (len(self.window) - 1) / (self.window[-1] - self.window[0])
+
+
+class InferenceScheduler:
+    """Serves requests of several streams on `interpreters`, one worker thread each.
+
+    `device_names` label the interpreters in the stats, by default their position.
+    """
+    def __init__(self, interpreters, device_names=None, stats_interval=STATS_INTERVAL):
+        self.interpreters = list(interpreters)
+        self.device_names = list(device_names or map(str, range(len(self.interpreters))))
+        self.stats = collections.OrderedDict()
+        self.device_stats = [StreamStats() for _ in self.interpreters]
+        self.stats_interval = stats_interval
+        self._streams = []
+        self._pending = {}
+        self._cursor = 0
+        self._running = False
+        self._condition = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._loop, args=(i,), daemon=True,
+                                          name='inference-' + name)
+                         for i, name in enumerate(self.device_names)]
+        self._stats_time = time.monotonic()
+
+    def start(self):
+        self._running = True
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        # Release streams still waiting so their threads can exit.
+        with self._condition:
+            for requests in self._pending.values():
+                for request in requests:
+                    request.error = RuntimeError('inference scheduler stopped')
+                    request.done.set()
+            self._pending.clear()
+
+    def add_stream(self, stream):
+        with self._condition:
+            if stream not in self.stats:
+                self._streams.append(stream)
+                self._pending[stream] = collections.deque()
+                self.stats[stream] = StreamStats()
+
+    def submit(self, stream, function, *args):
+        """Queues `function(interpreter, *args)` for `stream` and returns its `Request`."""
+        request = Request(function, args)
+        self.add_stream(stream)
+        with self._condition:
+            if not self._running:
+                raise RuntimeError('inference scheduler is not running')
+            self._pending[stream].append(request)
+            self._condition.notify()
+        return request
+
+    def run(self, stream, function, *args):
+        """Runs `function(interpreter, *args)` in `stream`'s turn and returns its result."""
+        return self.submit(stream, function, *args).wait()
+
+    def _next_request(self):
+        for i in range(len(self._streams)):
+            stream = self._streams[(self._cursor + i) % len(self._streams)]
+            if self._pending[stream]:
+                self._cursor = (self._cursor + i + 1) % len(self._streams)
+                return stream, self._pending[stream].popleft()
+        return None, None
+
+    def _loop(self, device):
+        interpreter = self.interpreters[device]
+        while True:
+            with self._condition:
+                while True:
+                    if not self._running:
+                        return
+                    stream, request = self._next_request()
+                    if request is not None:
+                        break
+                    self._condition.wait()
+            try:
+                request.result = request.function(interpreter, *request.args)
+            except Exception as e:
+                request.error = e
+            with self._stats_lock:
+                now = time.monotonic()
+                self.stats[stream].add(now)
+                self.device_stats[device].add(now)
+                report = self.stats_interval and now - self._stats_time > self.stats_interval
+                if report:
+                    self._stats_time = now
+            request.done.set()
+            if report:
+                print('Inference:', self.format_stats())
+
+    def format_stats(self):
+        rates = ['{} {:.1f} fps'.format(stream, stats.fps) for stream, stats in self.stats.items()]
+        rates.append('total {:.1f} fps'.format(sum(stats.fps for stats in self.stats.values())))
+        if len(self.interpreters) > 1:
+            rates.extend('{} {:.1f} fps'.format(name, stats.fps)
+                         for name, stats in zip(self.device_names, self.device_stats))
+        return ' | '.join(rates)
@@ -0,0 +1,186 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Multi-stage frame pipeline.
+
+Each stage runs on its own thread and is connected to the next one by a
+bounded FIFO queue, so frames leave the pipeline in the order they entered
+it while e.g. the TPU works on frame N+1 and the CPU tracks and renders
+frame N. The input queue is leaky (the oldest waiting frame is dropped when
+it is full), later queues apply back pressure.
+
+An exception in a stage function is logged and stops the pipeline: the
+failed stage drops the frames still reaching it, so the stages around it
+never block, and `on_error` is called so that its owner can quit.
+"""
+import collections
+import queue
+import sys
+import threading
+import time
+import traceback
+
+_STOP = object()
+# Seconds `StagedPipeline.stop` waits for each stage to finish the frames in flight.
+STOP_TIMEOUT = 5.0
+
+class StageStats:
+    """Latency of the last `window_size` items processed by a stage."""
+    def __init__(self, window_size=30):
+        self.window = collections.deque(maxlen=window_size)
+        self.processed = 0
+        self.dropped = 0
+
+    def add(self, seconds):
+        self.window.append(seconds)
+        self.processed += 1
+
+    @property
+    def latency_ms(self):
+        return 1000 * sum(self.window) / len(self.window) if self.window else 0.0
+
+
+class Stage:
+    def __init__(self, name, function, inbox, outbox=None, sink=None, unpack=False, on_error=None):
+        self.name = name
+        self.function = function
+        self.inbox = inbox
+        self.outbox = outbox
+        self.sink = sink
+        self.unpack = unpack
+        self.on_error = on_error
+        # The exception that stopped this stage, if any.
+        self.error = None
+        self.stats = StageStats()
+        self.thread = threading.Thread(target=self.run, name='stage-' + name, daemon=True)
+
+    def run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                if self.outbox is not None:
+                    try:
+                        self.outbox.put(_STOP, timeout=STOP_TIMEOUT)
+                    except queue.Full:
+                        sys.stderr.write('Stage %s: next stage is not draining, not stopping it\n' % self.name)
+                break
+            if self.error is not None:
+                self.stats.dropped += 1
+                continue
+            start = time.monotonic()
+            try:
+                result = self.function(*item) if self.unpack else self.function(item)
+                if self.sink is not None and result is not None:
+                    self.sink(result)
+            except Exception as e:
+                sys.stderr.write('Stage %s failed:\n%s' % (self.name, traceback.format_exc()))
+                self.error = e
+                if self.on_error is not None:
+                    self.on_error(self, e)
+                continue
+            # Time spent blocked on a full outbox shows up as queue depth instead.
+            self.stats.add(time.monotonic() - start)
+            # A stage returns None to drop the frame.
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+
+
+class StagedPipeline:
+    """Runs `stages`, a list of (name, function) pairs, on one thread each.
+
+    The first function is called with the arguments passed to `put`, every
+    other function with the previous stage's result. Results of the last stage
+    are passed to `sink` on the last stage's thread. When a function raises,
+    `on_error(stage, exception)` is called on that stage's thread and the
+    pipeline accepts no more frames.
+    """
+    def __init__(self, stages, sink=None, queue_size=2, on_error=None):
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.stages = []
+        self.stopped = False
+        # Keeps put from touching the input queue once stop queued its marker.
+        self._put_lock = threading.Lock()
+        for i, (name, function) in enumerate(stages):
+            last = i + 1 == len(stages)
+            self.stages.append(Stage(name, function, self.queues[i],
+                                     outbox=None if last else self.queues[i + 1],
+                                     sink=sink if last else None,
+                                     unpack=i == 0,
+                                     on_error=on_error))
+
+    @property
+    def error(self):
+        """The exception of the first stage that failed, or None."""
+        return next((stage.error for stage in self.stages if stage.error is not None), None)
+
+    def start(self):
+        for stage in self.stages:
+            stage.thread.start()
+
+    def put(self, *item):
+        """Queues a frame for the first stage, dropping the oldest waiting frame when full.
+
+        Returns the number of frames dropped to make room. Once a stage failed
+        or the pipeline is stopped, the frame itself is dropped and counted.
+        """
+        with self._put_lock:
+            if self.stopped or self.error is not None:
+                self.stages[0].stats.dropped += 1
+                return 1
+            inbox = self.queues[0]
+            dropped = 0
+            while True:
+                try:
+                    inbox.put_nowait(item)
+                    return dropped
+                except queue.Full:
+                    try:
+                        inbox.get_nowait()
+                        self.stages[0].stats.dropped += 1
+                        dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Lets every stage finish the frames already queued, then ends the stage threads.
+
+        Waits up to `timeout` seconds for each stage; a stage still busy after
+        that is reported and left running as a daemon thread.
+        """
+        with self._put_lock:
+            if self.stopped:
+                return
+            self.stopped = True
+        try:
+            self.queues[0].put(_STOP, timeout=timeout)
+        except queue.Full:
+            sys.stderr.write('Stages: first stage is not draining, not stopping it\n')
+            return
+        for stage in self.stages:
+            stage.thread.join(timeout)
+            if stage.thread.is_alive():
+                sys.stderr.write('Stage %s did not stop within %.1f s\n' % (stage.name, timeout))
+                return
+
+    def stats(self):
+        """Returns {stage name: (queue depth, average latency ms, processed, dropped)}."""
+        return {stage.name: (stage.inbox.qsize(), stage.stats.latency_ms,
+                             stage.stats.processed, stage.stats.dropped)
+                for stage in self.stages}
+
+    def format_stats(self):
+        stats = ' | '.join('{} q{} {:.1f}ms'.format(name, depth, latency)
+                           for name, (depth, latency, _, _) in self.stats().items())
+        return '{} | dropped {}'.format(stats, self.stages[0].stats.dropped)
+
@@ -0,0 +1,67 @@
+# Copyright 2019 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Stand-in for a detection model interpreter, for running without an accelerator.
+
+`StubInterpreter` has the subset of the `tflite.Interpreter` API used by
+`common.CachedInterpreter` and the outputs of an SSD postprocess model (boxes,
+class ids, scores, count). `invoke` sleeps for `latency` seconds, releasing
+the GIL like a real accelerator does, and produces `detections` random boxes,
+so scheduling and dispatch can be tested and benchmarked on any machine.
+"""
+import time
+
+import numpy as np
+
+class StubInterpreter:
+    def __init__(self, input_shape=(1, 300, 300, 3), latency=0.01, detections=3, num_classes=90, seed=0):
+        self.input_shape = tuple(input_shape)
+        self.latency = latency
+        self.detections = detections
+        self.num_classes = num_classes
+        self.invocations = 0
+        self._rng = np.random.default_rng(seed)
+        self._tensors = None
+
+    def allocate_tensors(self):
+        count = self.detections
+        self._tensors = [np.zeros(self.input_shape, dtype=np.uint8),
+                         np.zeros((1, count, 4), dtype=np.float32),
+                         np.zeros((1, count), dtype=np.float32),
+                         np.zeros((1, count), dtype=np.float32),
+                         np.full((1,), count, dtype=np.float32)]
+
+    def get_input_details(self):
+        return [{ 'index': 0, 'shape': np.array(self.input_shape), 'dtype': np.uint8,
+                  'quantization': (0.0, 0) }]
+
+    def get_output_details(self):
+        return [{ 'index': i, 'shape': np.array(self._tensors[i].shape), 'dtype': np.float32,
+                  'quantization': (0.0, 0) } for i in range(1, len(self._tensors))]
+
+    def tensor(self, index):
+        return lambda: self._tensors[index]
+
+    def invoke(self):
+        if self._tensors is None:
+            raise RuntimeError('allocate_tensors() must be called before invoke()')
+        if self.latency:
+            time.sleep(self.latency)
+        count = self.detections
+        corners = np.sort(self._rng.random((count, 2, 2)), axis=1)
+        # Boxes are ymin, xmin, ymax, xmax like the real model's.
+        self._tensors[1][0] = corners.reshape(count, 4)
+        self._tensors[2][0] = self._rng.integers(0, self.num_classes, count)
+        self._tensors[3][0] = np.sort(self._rng.random(count))[::-1]
+        self.invocations += 1
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other relative to gstreamer/, as when run from there.
+GSTREAMER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(GSTREAMER_DIR, '..', 'assets')
+sys.path.insert(0, GSTREAMER_DIR)
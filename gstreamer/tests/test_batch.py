@@ -0,0 +1,34 @@
+import os
+import shutil
+
+from conftest import ASSETS_DIR
+from batch import find_logs, summarize
+from tracking.binary_log import convert_csv
+
+ASSET = 'reail_store_1_720p'
+
+def copy_as_csv_and_binary_log(directory):
+  """Puts the asset in `directory` as adhoc/csv_to_binary_log.py leaves it: X.csv next to X.trk."""
+  shutil.copy(os.path.join(ASSETS_DIR, ASSET + '.csv'), directory)
+  convert_csv(os.path.join(ASSETS_DIR, ASSET + '.csv'), os.path.join(directory, ASSET + '.trk'))
+
+def test_binary_log_is_preferred_over_its_csv(tmp_path):
+  copy_as_csv_and_binary_log(str(tmp_path))
+  shutil.copy(os.path.join(ASSETS_DIR, 'people_walking_standing_1080p.csv'), str(tmp_path))
+  logs = find_logs([str(tmp_path)])
+  assert sorted(os.path.basename(log) for log in logs) == ['people_walking_standing_1080p.csv', ASSET + '.trk']
+
+def test_explicit_files_are_kept(tmp_path):
+  copy_as_csv_and_binary_log(str(tmp_path))
+  files = [str(tmp_path / (ASSET + extension)) for extension in ('.csv', '.trk')]
+  assert find_logs(files) == files
+
+def test_directory_counts_each_recording_once(tmp_path):
+  cross_segment = ((290, 0), (285, 270))
+  csv = os.path.join(ASSETS_DIR, ASSET + '.csv')
+  alone = summarize([csv], cross_segment, workers=1)
+  copy_as_csv_and_binary_log(str(tmp_path))
+  both = summarize(find_logs([str(tmp_path)]), cross_segment, workers=1)
+  counts = lambda summary: [summary.to_dict()[key] for key in ('tracks_by_label', 'people', 'in', 'out')]
+  assert counts(both) == counts(alone)
+  assert len(both.to_dict()['files']) == 1
@@ -0,0 +1,67 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ASSETS_DIR
+from tracking.binary_log import MAGIC, RECORD_DTYPE, _PREFIX, BinaryLog, BinaryLogWriter, convert_csv
+from tracking.collector import write_points_csv
+from tracking.csv_chunks import read_csv_chunks
+from tracking.point_store import COLUMN_DTYPES, PointStore
+
+ASSETS = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+
+def read_csv(filename):
+  points = PointStore()
+  for chunk in read_csv_chunks(filename):
+    points.extend(chunk.columns())
+  return points
+
+def assert_same_points(points, expected):
+  assert len(points) == len(expected)
+  for name in COLUMN_DTYPES:
+    if name == 'label':
+      assert [points.labels.label(code) for code in points.label_codes.tolist()] == \
+        [expected.labels.label(code) for code in expected.label_codes.tolist()]
+    else:
+      # Coordinates and scores are stored as float32.
+      assert np.array_equal(points.column(name), expected.column(name).astype(RECORD_DTYPE[name])), name
+
+@pytest.mark.parametrize('name', ASSETS)
+def test_convert_csv_round_trip(tmp_path, name):
+  csv_filename = os.path.join(ASSETS_DIR, name)
+  log_filename = str(tmp_path / 'log.trk')
+  expected = read_csv(csv_filename)
+  assert convert_csv(csv_filename, log_filename) == len(expected)
+  assert_same_points(BinaryLog(log_filename).points, expected)
+
+def test_predicted_flag_round_trip(tmp_path):
+  points = read_csv(os.path.join(ASSETS_DIR, ASSETS[0]))
+  assert not points.predicted.any()
+  points.predicted[::3] = True
+  csv_filename = str(tmp_path / 'predicted.csv')
+  with open(csv_filename, 'w', newline='') as f:
+    write_points_csv(f, points)
+  from_csv = read_csv(csv_filename)
+  assert np.array_equal(from_csv.predicted, points.predicted)
+  log_filename = str(tmp_path / 'predicted.trk')
+  convert_csv(csv_filename, log_filename)
+  assert_same_points(BinaryLog(log_filename).points, from_csv)
+
+def test_truncated_log_reads_complete_records(tmp_path):
+  expected = read_csv(os.path.join(ASSETS_DIR, ASSETS[0]))
+  log_filename = str(tmp_path / 'log.trk')
+  with BinaryLogWriter(log_filename) as writer:
+    writer.write(expected)
+  with open(log_filename, 'r+b') as f:
+    f.truncate(os.path.getsize(log_filename) - RECORD_DTYPE.itemsize // 2)
+  assert len(BinaryLog(log_filename)) == len(expected) - 1
+
+def test_unknown_layout_is_rejected(tmp_path):
+  log_filename = str(tmp_path / 'other.trk')
+  header = json.dumps({ 'fields': [('timestamp', '<f8')], 'labels': [] }).encode('utf-8')
+  with open(log_filename, 'wb') as f:
+    f.write(_PREFIX.pack(MAGIC, _PREFIX.size + len(header)) + header)
+  with pytest.raises(ValueError):
+    BinaryLog(log_filename)
@@ -0,0 +1,74 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from tracking.collector import Collector
+from tracking.csv_chunks import read_csv_chunks
+from tracking.heatmap import LAYERS, Heatmap
+
+def read_ids(filenames):
+  return [track_id for filename in filenames for chunk in read_csv_chunks(filename) for track_id in chunk.id.tolist()]
+
+def test_dump_writes_collected_points(tmp_path):
+  collector = Collector()
+  collector.start()
+  collector.add_point('person', 1, 2, 3, 4, 7, 0.9)
+  collector.add_point('car', 5, 6, 7, 8, 8, 0.8, predicted=True)
+  filename = str(tmp_path / 'points.csv')
+  collector.dump(filename)
+  chunk = next(read_csv_chunks(filename))
+  assert chunk.id.tolist() == [7, 8]
+  assert chunk.predicted.tolist() == [False, True]
+
+def test_spill_keeps_spilling_after_reset(tmp_path):
+  collector = Collector()
+  collector.start()
+  collector.enable_spill(str(tmp_path / 'spill.csv'), flush_interval=60)
+  collector.add_point('person', 1, 2, 3, 4, 1, 0.9)
+  collector.reset()
+  collector.start()
+  collector.add_point('person', 1, 2, 3, 4, 2, 0.9)
+  collector.dump()
+  assert read_ids(collector._spill.files) == [1, 2]
+
+def test_spill_dump_rejects_another_filename(tmp_path):
+  collector = Collector()
+  collector.start()
+  collector.enable_spill(str(tmp_path / 'spill.trk'), flush_interval=60)
+  collector.add_point('person', 1, 2, 3, 4, 1, 0.9)
+  with pytest.raises(ValueError):
+    collector.dump(str(tmp_path / 'other.csv'))
+  collector.dump(str(tmp_path / 'spill.trk'))
+  assert collector._spill.files == [str(tmp_path / 'spill-0000.trk')]
+
+def test_spill_error_is_raised_by_dump(tmp_path):
+  collector = Collector()
+  collector.start()
+  collector.enable_spill(str(tmp_path / 'missing' / 'spill.csv'), flush_interval=60, flush_rows=1)
+  collector.add_point('person', 1, 2, 3, 4, 1, 0.9)
+  deadline = time.monotonic() + 5
+  while collector._spill.error is None and time.monotonic() < deadline:
+    time.sleep(0.01)
+  assert isinstance(collector._spill.error, FileNotFoundError)
+  with pytest.raises(FileNotFoundError):
+    collector.dump()
+  assert not os.path.exists(str(tmp_path / 'missing'))
+
+def test_heatmap_gets_one_batch_per_frame(tmp_path):
+  collector = Collector()
+  collector.start()
+  heatmap = Heatmap((100, 60))
+  collector.enable_heatmap(heatmap)
+  collector.enable_spill(str(tmp_path / 'spill.csv'), flush_interval=60)
+  for frame in range(5):
+    collector.increment_frame_number()
+    collector.add_point('person', 4 * frame, 20, 2, 2, 1, 0.9)
+    collector.add_point('person', 4 * frame, 40, 2, 2, 2, 0.9)
+  collector.dump(str(tmp_path / 'spill.csv'))
+  expected = Heatmap((100, 60))
+  for frame in range(5):
+    expected.add_boxes([1, 2], [4 * frame] * 2, [20, 40], [2, 2], [2, 2])
+  assert heatmap.points == 10
+  assert all(np.array_equal(heatmap.layer(name), expected.layer(name)) for name in LAYERS)
@@ -0,0 +1,111 @@
+import types
+
+import numpy as np
+import pytest
+
+import common
+
+SHAPE = (1, 4, 6, 3)
+
+class FakeInterpreter:
+  """Owns an input tensor only, as CachedInterpreter reads it."""
+  def __init__(self, shape):
+    self.input = np.zeros(shape, dtype=np.uint8)
+
+  def get_input_details(self):
+    return [{ 'index': 0, 'shape': np.array(self.input.shape) }]
+
+  def get_output_details(self):
+    return []
+
+  def tensor(self, index):
+    return lambda: self.input
+
+class FakeBuffer:
+  """Maps like Gst.Buffer.map: (success, map info with the data as bytes)."""
+  def __init__(self, data, mappable=True):
+    self.data = data
+    self.mappable = mappable
+    self.mapped = 0
+
+  def map(self, flags):
+    assert flags == FakeGst.MapFlags.READ
+    if not self.mappable:
+      return False, None
+    self.mapped += 1
+    return True, types.SimpleNamespace(data=self.data)
+
+  def unmap(self, mapinfo):
+    self.mapped -= 1
+
+FakeGst = types.SimpleNamespace(MapFlags=types.SimpleNamespace(READ=1))
+
+@pytest.fixture
+def gst(monkeypatch):
+  monkeypatch.setattr(common, '_Gst', FakeGst)
+
+@pytest.fixture
+def frame():
+  return np.random.default_rng(0).integers(0, 255, size=SHAPE, dtype=np.uint8)
+
+def test_set_input_from_array(frame):
+  interpreter = common.CachedInterpreter(FakeInterpreter(SHAPE))
+  interpreter.set_input(frame.reshape(-1))
+  assert np.array_equal(interpreter.interpreter.input, frame)
+  assert interpreter.input_image_size() == (6, 4, 3)
+
+def test_set_input_from_buffer_unmaps_it(gst, frame):
+  interpreter = common.CachedInterpreter(FakeInterpreter(SHAPE))
+  buf = FakeBuffer(frame.tobytes())
+  interpreter.set_input(buf)
+  assert np.array_equal(interpreter.interpreter.input, frame)
+  assert buf.mapped == 0
+
+def test_buffer_of_wrong_size_is_unmapped(gst, frame):
+  interpreter = common.CachedInterpreter(FakeInterpreter(SHAPE))
+  buf = FakeBuffer(frame.tobytes()[:-1])
+  with pytest.raises(ValueError):
+    interpreter.set_input(buf)
+  assert buf.mapped == 0
+
+def test_unmappable_buffer_raises(gst, frame):
+  with pytest.raises(RuntimeError):
+    with common.map_buffer(FakeBuffer(frame.tobytes(), mappable=False)):
+      pass
+
+class FakeOutputInterpreter(FakeInterpreter):
+  """Also owns SSD-like outputs: quantized uint8 boxes, float class ids, scores and count."""
+  def __init__(self, shape):
+    super().__init__(shape)
+    rng = np.random.default_rng(1)
+    self.outputs = [rng.integers(0, 255, size=(1, 5, 4), dtype=np.uint8),
+                    rng.integers(0, 90, size=(1, 5)).astype(np.float32),
+                    rng.random((1, 5), dtype=np.float32),
+                    np.array([5], dtype=np.float32)]
+    self.quantization = [(1 / 255, 3), (0.0, 0), (0.0, 0), (0.0, 0)]
+
+  def get_output_details(self):
+    return [{ 'index': i + 1, 'shape': np.array(output.shape), 'quantization': quantization }
+            for i, (output, quantization) in enumerate(zip(self.outputs, self.quantization))]
+
+  def tensor(self, index):
+    return lambda: self.outputs[index - 1] if index else self.input
+
+def test_output_tensor_matches_uncached():
+  fake = FakeOutputInterpreter(SHAPE)
+  interpreter = common.CachedInterpreter(fake)
+  for i in range(len(fake.outputs)):
+    expected = common.output_tensor(fake, i)
+    output = interpreter.output_tensor(i)
+    assert output.dtype == np.float32
+    assert output.shape == expected.shape
+    assert np.allclose(output, expected, atol=1e-6)
+
+def test_output_tensor_reuses_its_buffer():
+  fake = FakeOutputInterpreter(SHAPE)
+  interpreter = common.CachedInterpreter(fake)
+  first = interpreter.output_tensor(2)
+  fake.outputs[2][:] = 0.5
+  second = interpreter.output_tensor(2)
+  assert second is first
+  assert np.all(second == 0.5)
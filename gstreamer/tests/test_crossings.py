@@ -0,0 +1,71 @@
+import numpy as np
+
+from tracking.crossings import (collect_segments, count_crosses, count_crosses_by_time, count_crosses_by_track,
+                                detect_crosses, stack_segments)
+from tracking.point_store import PointStore
+from tracking.trajectory import Trajectory
+
+CROSS_SEGMENT = ((50, 0), (50, 100))
+
+def random_tracks(seed=0, tracks=20, length=30):
+  """Returns {track_id: PointStore} of boxes wandering around a 100x100 scene."""
+  rng = np.random.default_rng(seed)
+  result = {}
+  for track_id in range(1, tracks + 1):
+    points = PointStore()
+    x, y = rng.uniform(0, 100, 2)
+    for frame in range(length):
+      x, y = np.clip((x, y) + rng.normal(0, 10, 2), 0, 100)
+      points.add(track_id, 'person', x - 5, y - 10, 10, 20, 0.9, frame, 0.1 * frame, False)
+    result[track_id] = points
+  return result
+
+def scalar_crosses(points):
+  """(clockwise, counter_clockwise) crossing of every segment, as `Trajectory.detect_cross`."""
+  return [Trajectory.detect_cross(segment, CROSS_SEGMENT) for segment in Trajectory.build_segments(points)]
+
+def test_detect_crosses_matches_scalar():
+  for points in random_tracks().values():
+    segments = stack_segments([(1, points)]).segments
+    clockwise, counter_clockwise = detect_crosses(segments, CROSS_SEGMENT)
+    assert list(zip(clockwise.astype(int).tolist(), counter_clockwise.astype(int).tolist())) == scalar_crosses(points)
+
+def test_counts_match_scalar():
+  tracks = random_tracks()
+  batch = stack_segments(tracks.items())
+  by_track = {}
+  for track_id, points in tracks.items():
+    crosses = scalar_crosses(points)
+    total = (sum(cw for cw, _ in crosses), sum(ccw for _, ccw in crosses))
+    if total != (0, 0):
+      by_track[track_id] = total
+  assert by_track
+  assert count_crosses(batch.segments, CROSS_SEGMENT) == tuple(map(sum, zip(*by_track.values())))
+  assert count_crosses_by_track(batch, CROSS_SEGMENT) == by_track
+
+def test_count_by_time_buckets_segment_end_times():
+  tracks = random_tracks()
+  batch = stack_segments(tracks.items())
+  starts, clockwise, counter_clockwise = count_crosses_by_time(batch, CROSS_SEGMENT, bucket_size=1.0, start_time=0.5)
+  expected_clockwise = np.zeros(len(starts), dtype=int)
+  expected_counter_clockwise = np.zeros(len(starts), dtype=int)
+  for points in tracks.values():
+    for timestamp, (cw, ccw) in zip(points.timestamp[1:].tolist(), scalar_crosses(points)):
+      # Crossings before start_time are not counted.
+      if timestamp >= 0.5:
+        bucket = int(np.floor(timestamp - 0.5))
+        expected_clockwise[bucket] += cw
+        expected_counter_clockwise[bucket] += ccw
+  assert np.allclose(starts, 0.5 + np.arange(len(starts)))
+  assert clockwise.tolist() == expected_clockwise.tolist()
+  assert counter_clockwise.tolist() == expected_counter_clockwise.tolist()
+
+def test_short_and_missing_tracks():
+  single = PointStore()
+  single.add(1, 'person', 0, 0, 10, 10, 0.9, 0, 0.0, False)
+  batch = stack_segments([(1, single), (2, PointStore())])
+  assert batch.segments.shape == (0, 4)
+  assert count_crosses(batch.segments, CROSS_SEGMENT) == (0, 0)
+  assert count_crosses_by_track(batch, CROSS_SEGMENT) == {}
+  assert len(count_crosses_by_time(batch, CROSS_SEGMENT, 1.0)[0]) == 0
+  assert len(collect_segments([]).track_ids) == 0
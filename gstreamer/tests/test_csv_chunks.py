@@ -0,0 +1,38 @@
+import pytest
+
+from tracking.csv_chunks import read_csv_chunks
+
+HEADER = 'id,label,x,y,w,h,score,frame,timestamp\n'
+ROWS = ['{},person,{},2,3,4,0.5,{},{}\n'.format(i, i * 10, i, i * 0.1) for i in range(1, 7)]
+
+def write(tmp_path, text):
+  filename = str(tmp_path / 'points.csv')
+  with open(filename, 'w', newline='') as f:
+    f.write(text)
+  return filename
+
+def read_ids(filename, chunk_bytes=1 << 20):
+  return [track_id for chunk in read_csv_chunks(filename, chunk_bytes=chunk_bytes) for track_id in chunk.id.tolist()]
+
+@pytest.mark.parametrize('chunk_bytes', [1 << 20, 100])
+def test_blank_lines_are_skipped(tmp_path, chunk_bytes):
+  text = HEADER + ROWS[0] + '\n' + ROWS[1] + ROWS[2] + '\r\n\n' + ''.join(ROWS[3:]) + '\n\n'
+  filename = write(tmp_path, text)
+  assert read_ids(filename, chunk_bytes) == list(range(1, 7))
+  assert [x for chunk in read_csv_chunks(filename, chunk_bytes=chunk_bytes) for x in chunk.x.tolist()] == \
+    [10.0 * i for i in range(1, 7)]
+
+def test_blank_lines_are_skipped_with_quoted_fields(tmp_path):
+  text = HEADER + ROWS[0] + '\n' + '2,"person",20,2,3,4,0.5,2,0.2\n'
+  assert read_ids(write(tmp_path, text)) == [1, 2]
+
+def test_short_row_is_rejected(tmp_path):
+  # The short and the long row have as many numeric fields together as two good ones.
+  text = HEADER + ROWS[0] + '2,person,20,2,3,4,0.5,2\n' + '3,person,30,2,3,4,0.5,3,0.3,9\n'
+  with pytest.raises(ValueError, match='malformed CSV row: 8 fields'):
+    read_ids(write(tmp_path, text))
+
+def test_short_quoted_row_is_rejected(tmp_path):
+  text = HEADER + ROWS[0] + '2,"person",20,2,3,4,0.5,2\n'
+  with pytest.raises(ValueError, match='malformed CSV row: 8 fields'):
+    read_ids(write(tmp_path, text))
@@ -0,0 +1,49 @@
+import numpy as np
+
+import common
+from detect import get_detections, get_output
+from stub_interpreter import StubInterpreter
+
+def reference_output(interpreter, score_threshold, top_k):
+  """The per-slot decoding get_detections replaced, as (class id, score, box) tuples."""
+  boxes = common.output_tensor(interpreter, 0)
+  category_ids = common.output_tensor(interpreter, 1)
+  scores = common.output_tensor(interpreter, 2)
+  result = []
+  for i in range(top_k):
+    if scores[i] >= score_threshold:
+      ymin, xmin, ymax, xmax = boxes[i]
+      result.append((int(category_ids[i]), scores[i], (max(0.0, xmin), max(0.0, ymin), min(1.0, xmax), min(1.0, ymax))))
+  return result
+
+def make_interpreter(detections=10, seed=0):
+  stub = StubInterpreter(latency=0, detections=detections, seed=seed)
+  stub.allocate_tensors()
+  stub.invoke()
+  # Some boxes reach out of the frame and get clipped.
+  stub._tensors[1][0, :3] = [[-0.25, 0.5, 0.5, 1.25], [0.1, -0.1, 1.5, 0.9], [0.2, 0.3, 0.4, 0.5]]
+  return stub, common.CachedInterpreter(stub)
+
+def test_detections_match_per_slot_decoding():
+  for seed in range(5):
+    stub, interpreter = make_interpreter(seed=seed)
+    for threshold, top_k in ((0.0, 10), (0.5, 10), (0.3, 4), (1.1, 10)):
+      detections, class_ids = get_detections(interpreter, threshold, top_k)
+      expected = reference_output(stub, threshold, top_k)
+      assert detections.dtype == np.float32
+      assert detections.shape == (len(expected), 5)
+      assert class_ids.tolist() == [class_id for class_id, _, _ in expected]
+      assert np.allclose(detections[:, 4], [score for _, score, _ in expected])
+      assert np.allclose(detections[:, :4], np.reshape([box for _, _, box in expected], (-1, 4)))
+
+def test_boxes_are_clipped():
+  _, interpreter = make_interpreter()
+  detections, _ = get_detections(interpreter, 0.0, 3)
+  assert detections[:, :4].min() >= 0.0 and detections[:, :4].max() <= 1.0
+
+def test_get_output_wraps_detections():
+  stub, interpreter = make_interpreter()
+  objects = get_output(interpreter, 0.3, 10)
+  expected = reference_output(stub, 0.3, 10)
+  assert [obj.id for obj in objects] == [class_id for class_id, _, _ in expected]
+  assert np.allclose([tuple(obj.bbox) for obj in objects], [box for _, _, box in expected])
@@ -0,0 +1,42 @@
+import numpy as np
+
+from geometry import segment_pairs_intersection_mask, segments_intersection, segments_intersection_mask
+
+def scalar_mask(segments, others):
+  return np.array([segments_intersection(((a[0], a[1]), (a[2], a[3])), ((b[0], b[1]), (b[2], b[3]))) is not None
+                   for a, b in zip(segments.tolist(), others.tolist())], dtype=bool)
+
+def edge_cases():
+  """Segments against the line (0, 0)-(10, 10): crossing, touching an end, parallel,
+  collinear, missing by less and by more than EPS."""
+  return np.array([
+    [0, 10, 10, 0],
+    [10, 10, 20, 0],
+    [10, 0, 10, 10],
+    [1, 0, 11, 10],
+    [2, 2, 4, 4],
+    [10 + 1e-8, 0, 10 + 1e-8, 20],
+    [10 + 1e-6, 0, 10 + 1e-6, 20],
+    [5, 5, 5, 5],
+    [-5, 3, 5, 3],
+  ], dtype=np.float64)
+
+def random_segments(rng, count):
+  # Small integer grids make touching and collinear segments common.
+  return rng.integers(0, 6, size=(count, 4)).astype(np.float64)
+
+def test_single_segment_matches_scalar():
+  rng = np.random.default_rng(0)
+  for segments in (edge_cases(), random_segments(rng, 2000), rng.random((2000, 4)) * 100):
+    for segment in ((0, 0), (10, 10)), ((2, 0), (3, 5)), ((0.5, 0.25), (99.5, 70.125)):
+      expected = scalar_mask(segments, np.tile(np.ravel(segment), (len(segments), 1)))
+      assert np.array_equal(segments_intersection_mask(segments, segment), expected)
+
+def test_pairs_match_scalar():
+  rng = np.random.default_rng(1)
+  for segments1, segments2 in ((random_segments(rng, 5000), random_segments(rng, 5000)),
+                               (rng.random((5000, 4)) * 100, rng.random((5000, 4)) * 100)):
+    assert np.array_equal(segment_pairs_intersection_mask(segments1, segments2), scalar_mask(segments1, segments2))
+
+def test_empty_segments():
+  assert segments_intersection_mask(np.empty((0, 4)), ((0, 0), (1, 1))).shape == (0,)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from tracking.heatmap import LAYERS, Heatmap
+
+def walk(track_id, frames, start=0):
+  """Boxes of a track walking right by 4 pixels a frame, one per frame."""
+  return [(track_id, 4.0 * frame, 20.0 + track_id, 2.0, 2.0) for frame in range(start, start + frames)]
+
+def add_frames(heatmap, frames):
+  for boxes in frames:
+    heatmap.add_boxes(*zip(*boxes)) if boxes else heatmap.add_boxes([], [], [], [], [])
+
+def same_layers(a, b):
+  return all(np.array_equal(a.layer(name), b.layer(name)) for name in LAYERS)
+
+def test_frame_batches_match_one_batch():
+  boxes = walk(1, 20) + walk(2, 20, start=5)
+  one_batch = Heatmap((100, 60))
+  one_batch.add_boxes(*zip(*boxes))
+  per_frame = Heatmap((100, 60))
+  frames = [[box for box in boxes if box[1] == 4.0 * frame] for frame in range(25)]
+  add_frames(per_frame, frames)
+  assert per_frame.points == one_batch.points == len(boxes)
+  assert same_layers(per_frame, one_batch)
+
+def test_finished_tracks_are_evicted():
+  heatmap = Heatmap((100, 60), max_missed_batches=3)
+  for track_id in range(100):
+    heatmap.add_boxes(*zip(*walk(track_id % 20, 1, start=track_id % 20)))
+    heatmap.add_boxes([1000 + track_id], [0], [0], [1], [1])
+    assert len(heatmap._last_centroids) <= 2 * (heatmap.max_missed_batches + 1)
+  add_frames(heatmap, [[]] * 4)
+  assert heatmap._last_centroids == {}
+
+def test_path_restarts_after_eviction():
+  def paths_across_gap(max_missed_batches):
+    heatmap = Heatmap((100, 60), max_missed_batches=max_missed_batches)
+    heatmap.add_point(1, 0, 10, 2, 2)
+    add_frames(heatmap, [[]] * 3)
+    heatmap.add_point(1, 80, 10, 2, 2)
+    return heatmap.layer('paths').sum()
+  assert paths_across_gap(4) > 0
+  assert paths_across_gap(2) == 0
+
+def test_merge_and_save_load(tmp_path):
+  a, b = Heatmap((100, 60)), Heatmap((100, 60))
+  a.add_boxes(*zip(*walk(1, 10)))
+  b.add_boxes(*zip(*walk(2, 10)))
+  both = Heatmap((100, 60))
+  both.add_boxes(*zip(*(walk(1, 10) + walk(2, 10))))
+  a.merge(b)
+  assert same_layers(a, both)
+  filename = str(tmp_path / 'heatmap.npz')
+  a.save(filename)
+  assert same_layers(Heatmap.load(filename), both)
@@ -0,0 +1,23 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import GSTREAMER_DIR
+
+HEAVY = ['gi', 'tflite_runtime', 'svgwrite']
+
+PROBE = '''
+import json, sys
+__import__({module!r})
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+'''
+
+@pytest.mark.parametrize('module', ['common', 'detect', 'overlay', 'replay', 'batch', 'scheduler', 'tracker',
+                                    'tracking.trajectories', 'tracking.collector'])
+def test_module_imports_without_heavy_dependencies(module):
+  # A fresh interpreter, as sys.modules of this one may already hold them.
+  output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)], cwd=GSTREAMER_DIR,
+                          check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+  assert json.loads(output) == []
@@ -0,0 +1,67 @@
+import os
+import queue
+
+import numpy as np
+
+from conftest import ASSETS_DIR
+from replay import load_frames, replay
+from tracking.live_crossings import CrossingEvent, LiveCrossingCounter
+from tracking.trajectory import Trajectory
+
+LINES = [((50, 0), (50, 100)), ((0, 50), (100, 50)), ((10, 10), (90, 90))]
+
+def random_walks(seed=0, tracks=15, frames=60):
+  """Yields (track_ids, cx, cy) per frame of tracks wandering in a 100x100 scene, each
+  missing from some frames."""
+  rng = np.random.default_rng(seed)
+  position = rng.uniform(0, 100, (tracks, 2))
+  for _ in range(frames):
+    position = np.clip(position + rng.normal(0, 8, (tracks, 2)), 0, 100)
+    visible = np.flatnonzero(rng.random(tracks) > 0.2)
+    yield visible + 1, position[visible, 0], position[visible, 1]
+
+def expected_counts(max_missed_frames):
+  """Per-line (clockwise, counter_clockwise) counts with `Trajectory.detect_cross`."""
+  counts = np.zeros((len(LINES), 2), dtype=int)
+  last = {}
+  for frame, (track_ids, cx, cy) in enumerate(random_walks(), start=1):
+    for track_id, x, y in zip(track_ids.tolist(), cx.tolist(), cy.tolist()):
+      if track_id in last and last[track_id][2] >= frame - 1 - max_missed_frames:
+        for line, cross_segment in enumerate(LINES):
+          counts[line] += Trajectory.detect_cross((last[track_id][:2], (x, y)), cross_segment)
+      last[track_id] = (x, y, frame)
+  return counts
+
+def test_counts_match_detect_cross():
+  for max_missed_frames in (0, 1, 30):
+    counter = LiveCrossingCounter(LINES, max_missed_frames=max_missed_frames)
+    for frame in random_walks():
+      counter.update(*frame)
+    assert counter.counts.tolist() == expected_counts(max_missed_frames).tolist()
+  assert counter.counts.min() > 0
+
+def test_events_reach_callback_and_queue():
+  reported, events = [], queue.Queue()
+  counter = LiveCrossingCounter(LINES[:1], callback=lambda frame_events, _: reported.extend(frame_events),
+                                events=events)
+  assert counter.update([7], [40], [50]) == []
+  assert counter.update([7], [60], [50]) == reported == [CrossingEvent(2, 7, 0, reported[0].clockwise)]
+  assert events.get_nowait() == reported[0]
+  counter.update([7], [40], [50])
+  assert reported[1].clockwise != reported[0].clockwise
+  assert counter.text_lines() == ['In: 1. Out: 1']
+
+def test_missing_tracks_are_forgotten():
+  counter = LiveCrossingCounter(LINES[:1], max_missed_frames=2)
+  counter.update([1, 2], [40, 40], [50, 60])
+  for _ in range(3):
+    counter.update([2], [40], [60])
+  assert len(counter) == 1
+  # Track 1 comes back on the other side: a new track, not a crossing.
+  assert counter.update([1], [60], [50]) == []
+
+def test_replay_live_counts_match_trajectories():
+  frames, label_names, size = load_frames(os.path.join(ASSETS_DIR, 'people_walking_standing_1080p.csv'))
+  _, trajectories, live, _, _ = replay(frames, label_names, size, cross_segments=[((290, 0), (285, 270))])
+  assert live.counts.sum() > 0
+  assert tuple(live.counts[0].tolist()) == trajectories.count_crosses()
@@ -0,0 +1,89 @@
+import json
+import socket
+import threading
+import urllib.request
+
+import numpy as np
+import pytest
+
+import metrics
+
+def test_buckets_contain_their_values():
+  rng = np.random.default_rng(0)
+  ns = np.r_[np.arange(1, 200), rng.integers(1, 2 ** 45, 10000)].astype(np.int64)
+  low, high = metrics.bucket_bounds(metrics.bucket_index(ns))
+  assert np.all((low <= ns) & (ns < high))
+  # 32 buckets per power of two.
+  assert np.all(high - low <= np.maximum(low / 32, 1))
+
+def test_longest_spans_fall_in_the_last_bucket():
+  assert metrics.bucket_index(np.array([2 ** 50, 2 ** 60], dtype=np.int64)).tolist() == [metrics.BUCKETS - 1] * 2
+
+def test_percentiles_are_within_bucket_precision():
+  values = np.random.default_rng(1).lognormal(np.log(2e6), 0.5, 5000).astype(np.int64)
+  histogram = metrics.Histogram()
+  for value in values.tolist():
+    histogram.record(value)
+  for q in (50, 90, 99):
+    assert histogram.percentile(q) == pytest.approx(np.percentile(values, q), rel=0.04)
+  summary = histogram.summary()
+  assert summary['count'] == len(values)
+  assert summary['mean_ms'] == pytest.approx(values.mean() / 1e6)
+  assert summary['max_ms'] == values.max() / 1e6
+  assert metrics.Histogram().summary()['p99_ms'] == 0.0
+
+def test_concurrent_records_are_all_counted():
+  histogram = metrics.Histogram()
+  def record():
+    for i in range(5000):
+      histogram.record(1000 + i)
+  threads = [threading.Thread(target=record) for _ in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert histogram.summary()['count'] == 20000
+
+def make_registry():
+  registry = metrics.Metrics()
+  registry.histogram('invoke').record(5 * 10 ** 6)
+  registry.counter('frames').increment(3)
+  return registry
+
+def check_snapshot(snapshot):
+  assert snapshot['histograms']['invoke']['count'] == 1
+  assert snapshot['counters']['frames']['count'] == 3
+
+def test_registry_returns_the_same_metric_by_name():
+  registry = make_registry()
+  assert registry.histogram('invoke') is registry.histogram('invoke')
+  assert registry.counter('frames') is registry.counter('frames')
+  assert registry.format_stats() == 'invoke p50 5.00 p99 5.00 max 5.00 ms | frames 3'
+
+def test_exporter_writes_a_last_snapshot(tmp_path):
+  path = str(tmp_path / 'metrics.json')
+  exporter = metrics.MetricsExporter(make_registry(), path, interval=60)
+  exporter.start()
+  exporter.stop()
+  with open(path) as f:
+    check_snapshot(json.load(f))
+
+def test_serve_http():
+  server = metrics.serve_http(make_registry(), 0)
+  try:
+    with urllib.request.urlopen('http://127.0.0.1:{}/'.format(server.server_address[1]), timeout=5) as response:
+      check_snapshot(json.load(response))
+  finally:
+    server.shutdown()
+    server.server_close()
+
+def test_serve_unix(tmp_path):
+  path = str(tmp_path / 'metrics.sock')
+  server = metrics.serve_unix(make_registry(), path)
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+      client.connect(path)
+      check_snapshot(json.loads(client.makefile().read()))
+  finally:
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import overlay
+from overlay import OverlayBox
+
+pytest.importorskip('svgwrite')
+
+def random_frame(rng, boxes=5):
+  """Float and integer coordinates, labels with markup characters, a counting line."""
+  frame_boxes = [OverlayBox(*rng.uniform(0, 600, 4).tolist(), '{}% person & <cat> "{}"'.format(i * 10, i))
+                 for i in range(boxes)]
+  frame_boxes.append(OverlayBox(10, 20, 30, 40, "dog's"))
+  return (640, 480), ['Inference: 12.35 ms', 'FPS: 30 fps', '1 in > 2 out'], frame_boxes, [((320, 0), (320.5, 480))]
+
+def test_template_matches_svgwrite():
+  rng = np.random.default_rng(0)
+  svgwrite_renderer, template_renderer = overlay.SvgwriteRenderer(), overlay.TemplateRenderer()
+  for _ in range(20):
+    frame = random_frame(rng)
+    assert template_renderer.render(*frame) == svgwrite_renderer.render(*frame)
+  empty = ((320, 240), [], [], [])
+  assert template_renderer.render(*empty) == svgwrite_renderer.render(*empty)
+
+@pytest.mark.parametrize('name', sorted(overlay.RENDERERS))
+def test_unchanged_frames_are_skipped(name):
+  renderer = overlay.make_renderer(name)
+  frame = random_frame(np.random.default_rng(1))
+  first = renderer.render(*frame)
+  assert first is not None
+  assert renderer.render(*frame) is None
+  size, text_lines, boxes, lines = frame
+  assert renderer.render(size, text_lines, boxes[:-1], lines) is not None
+  assert (renderer.rendered, renderer.skipped) == (2, 1)
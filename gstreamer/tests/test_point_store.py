@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ASSETS_DIR
+from tracking.csv_chunks import read_csv_chunks
+from tracking.detected_object import DetectedObject
+from tracking.point_store import LabelTable, PointRing, PointStore
+from tracking.trajectories import ObjTrajectories
+from tracking.trajectory import Trajectory
+
+CROSS_SEGMENT = ((290, 0), (285, 270))
+
+def make_store(rows, labels=None):
+  store = PointStore(capacity=2, labels=LabelTable() if labels is None else labels)
+  for row in rows:
+    store.append(row)
+  return store
+
+def make_rows(count, track_id=1, label='person'):
+  return [DetectedObject(track_id, label, 10.0 * i, 5.0 * i, 20.0, 40.0, 0.5 + i / 100, i, i / 10)
+          for i in range(count)]
+
+def load_asset(name):
+  points = PointStore()
+  for chunk in read_csv_chunks(os.path.join(ASSETS_DIR, name)):
+    points.extend(chunk.columns())
+  return points
+
+def test_label_table_interns_labels():
+  labels = LabelTable()
+  assert labels.code('person') == 0
+  assert labels.code('car') == 1
+  assert labels.code('person') == 0
+  assert labels.codes(['car', 'person', 'dog']).tolist() == [1, 0, 2]
+  assert labels.names() == ['person', 'car', 'dog']
+  assert labels.label(2) == 'dog'
+  assert len(labels) == 3
+
+def test_append_grows_and_reads_rows_back():
+  rows = make_rows(20)
+  store = make_store(rows)
+  assert len(store) == 20
+  assert list(store) == rows
+  assert store[-1] == rows[-1]
+  with pytest.raises(IndexError):
+    store[20]
+  assert np.array_equal(store.cx, [row.cx for row in rows])
+
+def test_extend_appends_columns():
+  labels = LabelTable()
+  store = make_store(make_rows(3), labels)
+  other = make_store(make_rows(4, track_id=2, label='car'), labels)
+  store.extend(other.columns())
+  assert len(store) == 7
+  assert list(store)[3:] == list(other)
+
+def test_select_copies_rows():
+  store = make_store(make_rows(10))
+  selected = store.select(store.frame % 2 == 0)
+  assert list(selected) == list(store)[::2]
+  selected.x[:] = -1
+  assert store.x[0] == 0
+
+def test_view_shares_memory():
+  store = make_store(make_rows(10))
+  view = store.view(2, 5)
+  assert list(view) == list(store)[2:5]
+  view.x[:] = -1
+  assert store.x[2:5].tolist() == [-1, -1, -1]
+  # Appending to a view reallocates it instead of writing into the store.
+  view.append(make_rows(1)[0])
+  assert len(store) == 10 and store.x[5] == 50
+
+def test_wrap_fills_missing_optional_columns():
+  store = make_store(make_rows(3))
+  columns = store.columns()
+  del columns['predicted']
+  wrapped = PointStore.wrap(columns, store.labels)
+  assert wrapped.predicted.tolist() == [False, False, False]
+
+def test_ring_drains_in_order():
+  ring = PointRing(5, labels=LabelTable())
+  rows = make_rows(3)
+  assert [ring.add(*row) for row in rows] == [1, 2, 3]
+  assert list(ring.drain()) == rows
+  assert len(ring) == 0
+  assert len(ring.drain()) == 0
+
+def test_ring_overwrites_oldest_and_counts_drops():
+  ring = PointRing(4, labels=LabelTable())
+  rows = make_rows(7)
+  for row in rows[:5]:
+    ring.add(*row)
+  assert ring.dropped == 1
+  assert list(ring.drain()) == rows[1:5]
+  # The ring wraps around after a drain.
+  for row in rows[5:]:
+    ring.add(*row)
+  assert ring.dropped == 1
+  assert list(ring.drain()) == rows[5:]
+
+def test_add_objects_matches_point_by_point():
+  points = load_asset('people_walking_standing_1080p.csv')
+  track_id = int(np.bincount(points.id).argmax())
+  track = points.select(points.id == track_id)
+  one_by_one = Trajectory(track_id, CROSS_SEGMENT)
+  for row in track:
+    one_by_one.add_object(row)
+  batched = Trajectory(track_id, CROSS_SEGMENT)
+  # Uneven batches, so that segments also span batch boundaries.
+  for start, stop in [(0, 1), (1, 7), (7, 30), (30, len(track))]:
+    batched.add_objects(track.columns(start, stop))
+  assert list(batched.points) == list(one_by_one.points)
+  assert batched.last_centroid == pytest.approx(one_by_one.last_centroid)
+  assert np.allclose(batched.last_segment, one_by_one.last_segment)
+  assert (batched.clockwise_crosses, batched.counter_clockwise_crosses) == \
+    (one_by_one.clockwise_crosses, one_by_one.counter_clockwise_crosses)
+  assert batched.average_label == one_by_one.average_label
+  assert (batched.first_timestamp, batched.last_timestamp) == (one_by_one.first_timestamp, one_by_one.last_timestamp)
+
+@pytest.mark.parametrize('name', ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv'])
+def test_batched_crossing_counts_match_point_by_point(name):
+  points = load_asset(name)
+  one_by_one = ObjTrajectories(CROSS_SEGMENT)
+  for row in points:
+    one_by_one.add_object(row)
+  batched = ObjTrajectories(CROSS_SEGMENT)
+  for start in range(0, len(points), 1000):
+    batched.add_points(points.view(start, start + 1000))
+  assert list(batched.trajectories) == list(one_by_one.trajectories)
+  assert (batched._cross_clockwise_counter, batched._cross_counter_clockwise_counter) == \
+    (one_by_one._cross_clockwise_counter, one_by_one._cross_counter_clockwise_counter)
+  for track_id, traj in batched.trajectories.items():
+    expected = one_by_one.trajectories[track_id]
+    assert (traj.clockwise_crosses, traj.counter_clockwise_crosses) == \
+      (expected.clockwise_crosses, expected.counter_clockwise_crosses)
+    assert traj.average_label == expected.average_label
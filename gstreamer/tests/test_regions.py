@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from tracking.point_store import PointStore
+from tracking.regions import CountingLines, SpatialGrid, Zones
+from tracking.trajectory import Trajectory
+
+def random_boxes(rng, count, scene=100, size=20):
+  corners = rng.uniform(0, scene, (count, 2))
+  return np.column_stack((corners, corners + rng.uniform(0, size, (count, 2))))
+
+def overlapping_pairs(bboxes, items):
+  return {(row, item) for row, a in enumerate(bboxes.tolist()) for item, b in enumerate(items.tolist())
+          if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]}
+
+@pytest.mark.parametrize('cells_per_axis', [None, 1, 7])
+def test_grid_candidates_are_the_overlapping_items(cells_per_axis):
+  rng = np.random.default_rng(0)
+  items = random_boxes(rng, 50)
+  grid = SpatialGrid(items, cells_per_axis)
+  # Queries also reach outside of the grid.
+  queries = random_boxes(rng, 300, scene=140, size=30) - 20
+  rows, found = grid.candidates(queries)
+  assert len(set(zip(rows.tolist(), found.tolist()))) == len(rows)
+  assert set(zip(rows.tolist(), found.tolist())) == overlapping_pairs(queries, items)
+
+def test_empty_grid_has_no_candidates():
+  rows, items = SpatialGrid(np.empty((0, 4))).candidates([[0, 0, 1, 1]])
+  assert len(rows) == len(items) == 0
+
+def test_counting_lines_match_detect_cross():
+  rng = np.random.default_rng(1)
+  lines = [((x0, y0), (x1, y1)) for x0, y0, x1, y1 in rng.uniform(0, 100, (40, 4)).tolist()]
+  segments = np.column_stack((rng.uniform(0, 100, (500, 2)), rng.uniform(0, 100, (500, 2))))
+  expected = np.zeros((len(lines), 2), dtype=int)
+  for x0, y0, x1, y1 in segments.tolist():
+    for line, cross_segment in enumerate(lines):
+      expected[line] += Trajectory.detect_cross(((x0, y0), (x1, y1)), cross_segment)
+  assert expected.sum() > 0
+  assert CountingLines(lines).count(segments).tolist() == expected.tolist()
+  assert CountingLines(lines, cells_per_axis=1).count(segments).tolist() == expected.tolist()
+
+def scalar_inside(x, y, polygon):
+  inside = False
+  for (xi, yi), (xj, yj) in zip(polygon, polygon[-1:] + polygon[:-1]):
+    if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+      inside = not inside
+  return inside
+
+POLYGONS = [((10, 10), (40, 10), (40, 40), (10, 40)),
+            ((30, 30), (70, 35), (50, 80)),
+            ((60, 10), (90, 10), (90, 50), (75, 20), (60, 50))]
+
+def test_zones_locate_matches_scalar():
+  rng = np.random.default_rng(2)
+  x, y = rng.uniform(0, 100, (2, 2000))
+  rows, zones = Zones(POLYGONS).locate(x, y)
+  expected = {(row, zone) for row, (px, py) in enumerate(zip(x.tolist(), y.tolist()))
+              for zone, polygon in enumerate(POLYGONS) if scalar_inside(px, py, list(polygon))}
+  assert set(zip(rows.tolist(), zones.tolist())) == expected
+
+def test_zone_dwell():
+  tracks = []
+  for track_id, path in ((1, [(20, 20), (25, 25), (35, 35), (50, 50), (85, 30)]),
+                         (2, [(5, 5), (20, 30), (22, 30)]),
+                         (3, [(95, 95)])):
+    points = PointStore()
+    for i, (cx, cy) in enumerate(path):
+      points.add(track_id, 'person', cx - 1, cy - 1, 2, 2, 0.9, i, 0.5 * i, False)
+    tracks.append((track_id, points))
+  dwell = Zones(POLYGONS).dwell(tracks)
+  # Track 1 stays in zone 0 for its first 3 points, is in zones 0 and 1 at (35, 35) and
+  # reaches zone 1 at (50, 50) and zone 2 at (85, 30); track 2 stays in zone 0 once.
+  assert dwell.visitors.tolist() == [2, 1, 1]
+  assert dwell.seconds.tolist() == [1.5, 0.5, 0.0]
+  assert Zones(POLYGONS).dwell([]).visitors.tolist() == [0, 0, 0]
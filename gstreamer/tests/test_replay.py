@@ -0,0 +1,35 @@
+import numpy as np
+
+from replay import load_frames, replay
+from tracking.collector import Collector
+
+def write_log(filename, frames):
+  """Logs one box moving right on each of `frames` and nothing on the others."""
+  collector = Collector()
+  collector.start()
+  for frame in range(1, max(frames) + 1):
+    collector.increment_frame_number()
+    if frame in frames:
+      collector.add_point('person', 100 + 2 * frame, 100, 50, 120, 1, 0.9)
+  collector.dump(filename)
+
+def test_load_frames_keeps_frames_without_points(tmp_path):
+  filename = str(tmp_path / 'gap.csv')
+  write_log(filename, [1, 2, 5])
+  frames, label_names, _ = load_frames(filename)
+  assert [len(frame.boxes) for frame in frames] == [1, 1, 0, 0, 1]
+  assert frames[2].boxes.shape == (0, 4)
+  assert label_names[frames[4].labels[0]] == 'person'
+
+def test_replay_ages_tracks_over_frames_without_points(tmp_path):
+  filename = str(tmp_path / 'gap.csv')
+  logged = list(range(1, 11)) + list(range(15, 25))
+  write_log(filename, logged)
+  collector, _, _, count, _ = replay(*load_frames(filename))
+  assert count == 24
+  frames = collector.points.frame.tolist()
+  assert set(frames) <= set(logged)
+  # SORT drops the track during the gap, so the box gets a new id after it.
+  ids = collector.points.id.tolist()
+  assert ids[0] != ids[-1]
+  assert frames[-1] == 24
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+import common
+from scheduler import InferenceScheduler
+from stub_interpreter import StubInterpreter
+
+def hold(scheduler, stream):
+  """Occupies the first free interpreter until the returned event is set."""
+  started, release = threading.Event(), threading.Event()
+  def function(interpreter):
+    started.set()
+    release.wait(5)
+  request = scheduler.submit(stream, function)
+  assert started.wait(5)
+  return request, release
+
+def test_streams_are_served_round_robin():
+  scheduler = InferenceScheduler(['interpreter'], stats_interval=0)
+  scheduler.start()
+  order = []
+  scheduler.add_stream('a')
+  scheduler.add_stream('b')
+  held, release = hold(scheduler, 'a')
+  requests = [scheduler.submit('a', lambda interpreter, i: order.append(('a', i)), i) for i in range(4)]
+  requests += [scheduler.submit('b', lambda interpreter, i: order.append(('b', i)), i) for i in range(2)]
+  release.set()
+  for request in [held] + requests:
+    request.wait()
+  scheduler.stop()
+  # 'a' was served last, so the busy stream 'a' cannot starve 'b'.
+  assert order == [('b', 0), ('a', 0), ('b', 1), ('a', 1), ('a', 2), ('a', 3)]
+  assert scheduler.stats['a'].served == 5 and scheduler.stats['b'].served == 2
+
+def test_results_and_errors_reach_the_stream():
+  scheduler = InferenceScheduler(['interpreter'], stats_interval=0)
+  scheduler.start()
+  assert scheduler.run('a', lambda interpreter, x: (interpreter, 2 * x), 21) == ('interpreter', 42)
+  def fail(interpreter):
+    raise ValueError('bad frame')
+  with pytest.raises(ValueError):
+    scheduler.run('a', fail)
+  # The worker survives a failed request.
+  assert scheduler.run('a', lambda interpreter: 'ok') == 'ok'
+  scheduler.stop()
+
+def test_stop_releases_waiting_streams():
+  scheduler = InferenceScheduler(['interpreter'], stats_interval=0)
+  scheduler.start()
+  held, release = hold(scheduler, 'a')
+  waiting = scheduler.submit('b', lambda interpreter: 'never')
+  stopper = threading.Thread(target=scheduler.stop)
+  stopper.start()
+  release.set()
+  stopper.join(5)
+  assert not stopper.is_alive()
+  held.wait()
+  with pytest.raises(RuntimeError):
+    waiting.wait()
+  with pytest.raises(RuntimeError):
+    scheduler.submit('a', lambda interpreter: None)
+
+def test_each_interpreter_is_used_from_its_own_thread():
+  scheduler = InferenceScheduler(['tpu0', 'tpu1'], device_names=['usb:0', 'usb:1'], stats_interval=0)
+  scheduler.start()
+  threads = {}
+  both_busy = threading.Barrier(2, timeout=5)
+  def function(interpreter, i):
+    threads.setdefault(interpreter, set()).add(threading.current_thread().name)
+    if i < 2:
+      # The first two requests only finish once both interpreters run one.
+      both_busy.wait()
+    return i
+  requests = [scheduler.submit('a', function, i) for i in range(10)]
+  assert [request.wait() for request in requests] == list(range(10))
+  scheduler.stop()
+  assert threads == {'tpu0': {'inference-usb:0'}, 'tpu1': {'inference-usb:1'}}
+  assert sum(stats.served for stats in scheduler.device_stats) == 10
+
+def test_make_interpreters_opens_one_per_device():
+  interpreters = common.make_interpreters('model.tflite@stub,stub')
+  assert [device for device, _ in interpreters] == ['stub', 'stub']
+  assert all(isinstance(interpreter, StubInterpreter) for _, interpreter in interpreters)
+  assert interpreters[0][1] is not interpreters[1][1]
@@ -0,0 +1,80 @@
+import os
+import re
+
+import numpy as np
+import pytest
+import svgwrite
+
+from conftest import ASSETS_DIR
+from tracking.simplify import TOLERANCES, LevelOfDetail, douglas_peucker_importance
+from tracking.trajectories import ObjTrajectories
+
+ASSETS = ['people_walking_standing_1080p.csv', 'reail_store_1_720p.csv']
+CROSS_SEGMENT = ((290, 0), (285, 270))
+
+def draw(trajectories, **kwargs):
+  drawing = svgwrite.Drawing('', size=(1920, 1080))
+  trajectories.get_trajectories_svg(drawing, **kwargs)
+  return drawing.tostring()
+
+def same_svg(svg1, svg2):
+  """Compares drawings up to svgwrite's global id counter, without a huge diff on failure."""
+  return re.sub(r'id\d+', 'id', svg1) == re.sub(r'id\d+', 'id', svg2)
+
+def crossing_text(svg):
+  return re.search(r'In: \d+\. Out: \d+', svg).group(0)
+
+def load(name):
+  trajectories = ObjTrajectories(CROSS_SEGMENT)
+  trajectories.load_csv(os.path.join(ASSETS_DIR, name))
+  return trajectories
+
+def douglas_peucker(x, y, tolerance):
+  """Plain recursive Douglas-Peucker; returns the kept point mask."""
+  keep = np.zeros(len(x), dtype=bool)
+  keep[[0, -1]] = True
+  def split(start, stop):
+    if stop - start < 2:
+      return
+    dx, dy = x[stop] - x[start], y[stop] - y[start]
+    px, py = x[start + 1:stop] - x[start], y[start + 1:stop] - y[start]
+    t = np.clip((px * dx + py * dy) / (dx * dx + dy * dy), 0, 1) if dx or dy else np.zeros(len(px))
+    distances = np.hypot(px - t * dx, py - t * dy)
+    i = int(np.argmax(distances))
+    if distances[i] > tolerance:
+      keep[start + 1 + i] = True
+      split(start, start + 1 + i)
+      split(start + 1 + i, stop)
+  split(0, len(x) - 1)
+  return keep
+
+@pytest.mark.parametrize('name', ASSETS)
+def test_default_draws_every_point_within_budget(name):
+  trajectories = load(name)
+  assert same_svg(draw(trajectories), draw(trajectories, tolerance=0))
+
+def test_simplifies_only_over_budget():
+  trajectories = load(ASSETS[0])
+  points = sum(len(traj.points) for traj in trajectories.trajectories.values())
+  full = draw(trajectories, tolerance=0)
+  assert same_svg(draw(trajectories, max_points=points), full)
+  simplified = draw(trajectories, max_points=points // 4)
+  assert simplified.count('<line') < full.count('<line')
+  # Crossings are counted on every point at any level of detail.
+  assert crossing_text(simplified) == crossing_text(full) == 'In: 2. Out: 1'
+
+def test_choose_tolerance():
+  importances = [np.array([np.inf, 0.7, 3.0, np.inf]), np.array([np.inf, 1.5, np.inf])]
+  assert LevelOfDetail.choose_tolerance(importances, 7) == 0
+  assert LevelOfDetail.choose_tolerance([], 0) == 0
+  # At 0.5 all 7 points are kept, at 1.0 six, at 2.0 five.
+  assert LevelOfDetail.choose_tolerance(importances, 6) == 1.0
+  assert LevelOfDetail.choose_tolerance(importances, 5) == 2.0
+  assert LevelOfDetail.choose_tolerance(importances, 1) == TOLERANCES[-1]
+
+def test_importance_matches_douglas_peucker():
+  rng = np.random.default_rng(0)
+  x, y = np.cumsum(rng.normal(0, 3, (2, 300)), axis=1)
+  importance = douglas_peucker_importance(x, y)
+  for tolerance in TOLERANCES:
+    assert np.array_equal(importance > tolerance, douglas_peucker(x, y, tolerance))
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from stages import StagedPipeline
+from tracking.collector import Collector
+from tracking.csv_chunks import read_csv_chunks
+
+def test_frames_leave_in_order():
+  results = []
+  pipeline = StagedPipeline([('double', lambda x: 2 * x), ('add', lambda x: x + 1)],
+                            sink=results.append, queue_size=100)
+  pipeline.start()
+  for i in range(50):
+    assert pipeline.put(i) == 0
+  pipeline.stop()
+  assert results == [2 * i + 1 for i in range(50)]
+  assert pipeline.stats()['double'][2] == 50
+
+def test_full_input_queue_drops_oldest_frame():
+  release = threading.Event()
+  results = []
+  pipeline = StagedPipeline([('wait', lambda x: release.wait() and x)], sink=results.append, queue_size=2)
+  pipeline.start()
+  pipeline.put(0)
+  time.sleep(0.05)  # Frame 0 is being processed.
+  dropped = sum(pipeline.put(i) for i in range(1, 5))
+  release.set()
+  pipeline.stop()
+  assert dropped == 2
+  assert results == [0, 3, 4]
+  assert pipeline.stats()['wait'][3] == 2
+
+def test_stop_collects_frames_in_flight_before_dump(tmp_path):
+  # As at EOS: the frames still queued in the stages are collected before the collector is dumped.
+  collector = Collector()
+  collector.start()
+  collector.enable_spill(str(tmp_path / 'spill.csv'), flush_interval=60)
+  def track(frame):
+    time.sleep(0.002)
+    collector.increment_frame_number()
+    collector.add_point('person', frame, 0, 1, 1, frame, 0.9)
+    return frame
+  pipeline = StagedPipeline([('invoke', lambda frame: frame), ('track', track)], queue_size=100)
+  pipeline.start()
+  for frame in range(40):
+    pipeline.put(frame)
+  pipeline.stop()
+  collector.dump()
+  chunks = [chunk for filename in collector._spill.files for chunk in read_csv_chunks(filename)]
+  assert [track_id for chunk in chunks for track_id in chunk.id.tolist()] == list(range(40))
+
+def test_failing_stage_stops_pipeline_without_hanging():
+  errors = []
+  results = []
+  def track(frame):
+    if frame == 3:
+      raise ValueError('bad frame')
+    return frame
+  pipeline = StagedPipeline([('invoke', lambda frame: frame), ('track', track), ('render', lambda frame: frame)],
+                            sink=results.append, queue_size=1, on_error=lambda stage, e: errors.append(stage.name))
+  pipeline.start()
+  for frame in range(100):
+    pipeline.put(frame)
+    time.sleep(0.001)
+  start = time.monotonic()
+  pipeline.stop(timeout=1)
+  assert time.monotonic() - start < 1
+  assert errors == ['track']
+  assert isinstance(pipeline.error, ValueError)
+  assert all(frame < 3 for frame in results)
+  assert pipeline.put(100) == 1
+  assert not any(stage.thread.is_alive() for stage in pipeline.stages)
+
+def test_stop_gives_up_on_a_hung_stage():
+  release = threading.Event()
+  pipeline = StagedPipeline([('hang', lambda x: release.wait())], queue_size=1)
+  pipeline.start()
+  pipeline.put(0)
+  time.sleep(0.05)
+  pipeline.put(1)
+  start = time.monotonic()
+  pipeline.stop(timeout=0.1)
+  assert time.monotonic() - start < 1
+  release.set()
@@ -0,0 +1,191 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from geometry import iou_matrix
+from tracker import DetectionCadence, VectorizedSort, linear_assignment, match_detections
+
+def brute_force_cost(cost):
+  n, m = cost.shape
+  if n <= m:
+    return min(sum(cost[i, j] for i, j in zip(range(n), columns)) for columns in itertools.permutations(range(m), n))
+  return min(sum(cost[i, j] for i, j in zip(rows, range(m))) for rows in itertools.permutations(range(n), m))
+
+def check_assignment(cost):
+  rows, cols = linear_assignment(cost)
+  assert len(rows) == min(cost.shape)
+  assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+  assert list(rows) == sorted(rows)
+  assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+@pytest.mark.parametrize('shape', [(1, 1), (3, 3), (2, 5), (5, 2), (4, 6), (6, 4), (5, 5)])
+def test_linear_assignment_is_minimal(shape):
+  rng = np.random.default_rng(sum(shape))
+  for _ in range(20):
+    check_assignment(rng.random(shape))
+    # Negated IoUs, as the tracker passes them: mostly zeros.
+    check_assignment(-np.where(rng.random(shape) < 0.3, rng.random(shape), 0))
+
+def test_linear_assignment_degenerate():
+  check_assignment(np.zeros((4, 4)))
+  check_assignment(np.ones((3, 5)))
+  check_assignment(np.array([[1., 1., 0.], [1., 1., 0.], [0., 0., 1.]]))
+  check_assignment(np.array([[5., 5.], [5., 5.], [0., 0.]]))
+  for shape in ((0, 3), (3, 0)):
+    rows, cols = linear_assignment(np.zeros(shape))
+    assert len(rows) == len(cols) == 0
+
+def box(x, y, size=20, score=0.9):
+  return [x, y, x + size, y + size, score]
+
+def walk(start, frames, step=2):
+  """Detections of one box moving right by `step` pixels per frame."""
+  return [box(start[0] + step * frame, start[1]) for frame in range(frames)]
+
+def ids(output):
+  return output[:, 4].astype(int).tolist()
+
+def test_first_frames_are_reported_before_min_hits():
+  tracker = VectorizedSort()
+  # The reference SORT reports every matched track during the first min_hits frames.
+  assert ids(tracker.update(np.array([box(0, 0), box(100, 0)]))) == [2, 1]
+  assert ids(tracker.update(np.array([box(2, 0), box(102, 0)]))) == [2, 1]
+
+def test_ids_follow_boxes_and_output_is_newest_first():
+  tracker = VectorizedSort()
+  a, b, c = walk((0, 0), 10), walk((100, 0), 10), walk((0, 100), 10)
+  for frame in range(10):
+    # The detection order changes; ids stay with the boxes.
+    dets = [b[frame], a[frame]] if frame % 2 else [a[frame], b[frame]]
+    if frame >= 4:
+      dets.append(c[frame])
+    output = tracker.update(np.array(dets))
+    by_x = {int(row[4]): row for row in output}
+    if frame < 4 or frame >= 6:
+      assert by_x[1][0] == pytest.approx(a[frame][0], abs=2)
+      assert by_x[2][0] == pytest.approx(b[frame][0], abs=2)
+  # Track 3 appeared at frame 4 and is reported once confirmed, newest first.
+  assert ids(output) == [3, 2, 1]
+  assert (tracker.detection_indices >= 0).all()
+
+def test_new_track_waits_for_min_hits():
+  tracker = VectorizedSort(min_hits=3)
+  a, c = walk((0, 0), 8), walk((0, 100), 8)
+  reported = []
+  for frame in range(8):
+    dets = [a[frame]] + ([c[frame]] if frame >= 4 else [])
+    reported.append(ids(tracker.update(np.array(dets))))
+  assert reported[:4] == [[1]] * 4
+  # As in the reference SORT, the detection that creates a track is not a hit: the
+  # track is reported on its min_hits-th match after that, at frame 7.
+  assert reported[4:] == [[1], [1], [1], [2, 1]]
+
+def test_max_age_drops_missing_tracks():
+  tracker = VectorizedSort(max_age=1, min_hits=1)
+  a = walk((0, 0), 10)
+  assert ids(tracker.update(np.array([a[0]]))) == [1]
+  assert ids(tracker.update(np.array([a[1]]))) == [1]
+  # Missing for one frame: kept, but not reported.
+  assert ids(tracker.update(np.empty((0, 5)))) == []
+  assert len(tracker) == 1
+  assert ids(tracker.update(np.array([a[3]]))) == [1]
+  # Missing for two frames: dropped, and the box comes back as a new track.
+  tracker.update(np.empty((0, 5)))
+  tracker.update(np.empty((0, 5)))
+  assert len(tracker) == 0
+  assert ids(tracker.update(np.array([a[6]]))) == []
+  assert ids(tracker.update(np.array([a[7]]))) == [2]
+
+def test_predict_keeps_tracks_without_aging_them():
+  tracker = VectorizedSort(max_age=1, min_hits=1)
+  a = walk((0, 0), 10, step=4)
+  for frame in range(3):
+    tracker.update(np.array([a[frame]]))
+  for frame in range(3, 6):
+    predicted = tracker.predict()
+    assert ids(predicted) == [1]
+    assert predicted[0, 0] == pytest.approx(a[frame][0], abs=1)
+    assert (tracker.detection_indices == -1).all()
+  assert ids(tracker.update(np.array([a[6]]))) == [1]
+
+def scalar_iou(a, b):
+  w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+  h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+  union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - w * h
+  return w * h / union if union > 0 else 0.0
+
+def test_iou_matrix_matches_scalar():
+  rng = np.random.default_rng(0)
+  corners = np.sort(rng.integers(0, 10, size=(2, 30, 2, 2)), axis=2).astype(float)
+  # Sorting the two corners of each box makes them x0, y0, x1, y1 boxes, some of them empty.
+  boxes1, boxes2 = corners.reshape(2, 30, 4)
+  expected = [[scalar_iou(a, b) for b in boxes2.tolist()] for a in boxes1.tolist()]
+  assert np.allclose(iou_matrix(boxes1, boxes2), expected)
+
+def test_match_detections_picks_the_most_overlapping_detection():
+  detections = np.array([[0, 0, 10, 10, 0.9], [8, 8, 20, 20, 0.8], [50, 50, 60, 60, 0.7]])
+  trdata = np.array([[9, 9, 19, 19, 1], [1, 1, 9, 9, 2], [30, 30, 40, 40, 3], [55, 55, 65, 65, 4]])
+  assert match_detections(trdata, detections).tolist() == [1, 0, -1, 2]
+
+def test_match_detections_ignores_boxes_beside_each_other():
+  # The loop match_detections replaced found a positive "overlap" for these disjoint boxes.
+  detections = np.array([[0, 0, 10, 10, 0.9]])
+  assert match_detections(np.array([[20, 20, 30, 30, 1]]), detections).tolist() == [-1]
+  assert match_detections(np.array([[10, 0, 20, 10, 1]]), detections).tolist() == [-1]
+
+def test_match_detections_without_tracks_or_detections():
+  assert match_detections(np.empty((0, 5)), np.array([[0, 0, 1, 1, 0.9]])).tolist() == []
+  assert match_detections(np.array([[0, 0, 1, 1, 1]]), np.empty((0, 5))).tolist() == [-1]
+
+def run_cadence(cadence, frames):
+  """Runs `cadence` over frames of detections; returns which frames were detected and the outputs."""
+  tracker = VectorizedSort(min_hits=1)
+  detected, outputs = [], []
+  for dets in frames:
+    detect = cadence.detect_next()
+    detected.append(detect)
+    class_ids = np.arange(len(dets)) + 5
+    outputs.append(cadence.track(tracker, np.array(dets) if detect else None, class_ids if detect else None))
+  return detected, outputs
+
+def test_cadence_detects_every_n_frames():
+  cadence = DetectionCadence(every=4)
+  detected, _ = run_cadence(cadence, [[a] for a in walk((0, 0), 12)])
+  assert detected == [True, False, False, False] * 3
+  assert (cadence.detected_frames, cadence.predicted_frames) == (3, 9)
+
+def test_cadence_carries_score_and_class_to_predicted_frames():
+  a, b = walk((0, 0), 8, step=3), walk((100, 0), 8, step=3)
+  frames = [[a[frame], box(b[frame][0], 0, score=0.6)] for frame in range(8)]
+  _, outputs = run_cadence(DetectionCadence(every=2), frames)
+  trdata, detections, class_ids, matches = outputs[3]
+  assert ids(trdata) == [2, 1]
+  assert matches.tolist() == [0, 1]
+  assert np.allclose(detections[:, :4], trdata[:, :4])
+  assert detections[:, 4].tolist() == pytest.approx([0.6, 0.9])
+  assert class_ids.tolist() == [6, 5]
+  # The predicted boxes follow the motion.
+  assert trdata[1, 0] == pytest.approx(a[3][0], abs=1)
+
+def test_cadence_interval_adapts_to_the_prediction_error():
+  cadence = DetectionCadence(every=8, max_error=0.45)
+  detected, _ = run_cadence(cadence, [[a] for a in walk((0, 0), 30, step=1)])
+  assert detected == [True, False, False, False, False, False, False, False] * 3 + [True] + [False] * 5
+  assert cadence.interval == 8
+  # A box jittering by up to 0.3 box sizes is detected more and more often.
+  cadence = DetectionCadence(every=8, max_error=0.2)
+  jitter = np.random.default_rng(0).uniform(-6, 6, 30)
+  detected, _ = run_cadence(cadence, [[box(50 + dx, 0)] for dx in jitter.tolist()])
+  assert cadence.interval < 8
+  assert all(detected[-3:])
+
+def test_cadence_detects_early_on_fast_motion():
+  slow = DetectionCadence(every=4, max_motion=0.25)
+  detected, _ = run_cadence(slow, [[a] for a in walk((0, 0), 24, step=0.2)])
+  assert detected.count(True) == 6
+  # At 0.1 box sizes per frame the track would move more than 0.25 box sizes in 3 frames.
+  fast = DetectionCadence(every=4, max_motion=0.25)
+  detected, _ = run_cadence(fast, [[a] for a in walk((0, 0), 24, step=2)])
+  assert detected[:8] == [True, False, False, False, True, False, False, True]
+  assert detected.count(True) == 8
@@ -0,0 +1,87 @@
+import numpy as np
+
+from tracking.crossings import count_crosses
+from tracking.detected_object import DetectedObject
+from tracking.point_store import PointStore
+from tracking.trajectories import ObjTrajectories
+from tracking.trajectory import Trajectory
+
+CROSS_SEGMENT = ((50, 0), (50, 100))
+
+def zigzag(track_id=1, count=40, seed=0):
+  """Returns the detections of a box zigzagging across x = 50, with mixed labels."""
+  rng = np.random.default_rng(seed)
+  return [DetectedObject(track_id, 'person' if i % 3 else 'dog', float(x), 40.0, 10.0, 20.0, 0.5 + 0.01 * i, i, 0.1 * i)
+          for i, x in enumerate(rng.uniform(0, 90, count))]
+
+def as_store(objects):
+  points = PointStore()
+  for detected_object in objects:
+    points.add(*detected_object)
+  return points
+
+def test_running_crosses_match_stored_segments():
+  trajectory = Trajectory(1, CROSS_SEGMENT)
+  totals = [0, 0]
+  for detected_object in zigzag():
+    clockwise, counter_clockwise = trajectory.add_object(detected_object)
+    totals[0] += clockwise
+    totals[1] += counter_clockwise
+  expected = count_crosses(trajectory.get_segment_arrays(), CROSS_SEGMENT)
+  assert expected[0] and expected[1]
+  assert (trajectory.clockwise_crosses, trajectory.counter_clockwise_crosses) == expected == tuple(totals)
+
+def test_bulk_and_single_adds_keep_the_same_state():
+  objects = zigzag()
+  single = Trajectory(1, CROSS_SEGMENT)
+  for detected_object in objects:
+    single.add_object(detected_object)
+  bulk = Trajectory(1, CROSS_SEGMENT)
+  points = as_store(objects)
+  # Chunk boundaries must not lose the segment between the chunks.
+  for start, stop in ((0, 7), (7, 8), (8, 40)):
+    bulk.add_objects(points.columns(start, stop))
+  assert (bulk.clockwise_crosses, bulk.counter_clockwise_crosses) == \
+    (single.clockwise_crosses, single.counter_clockwise_crosses)
+  assert bulk.last_segment == single.last_segment
+  assert bulk.last_centroid == single.last_centroid
+  assert bulk._label_scores == single._label_scores
+  assert bulk.average_label == single.average_label == 'person'
+  assert (bulk.first_timestamp, bulk.last_timestamp) == (single.first_timestamp, single.last_timestamp)
+
+def test_state_is_kept_without_points():
+  objects = zigzag()
+  kept = Trajectory(1, CROSS_SEGMENT)
+  kept.add_objects(as_store(objects).columns())
+  dropped = Trajectory(1, CROSS_SEGMENT, keep_points=False)
+  dropped.add_objects(as_store(objects).columns())
+  assert len(dropped.points) == 0
+  assert (dropped.clockwise_crosses, dropped.counter_clockwise_crosses) == \
+    (kept.clockwise_crosses, kept.counter_clockwise_crosses)
+  assert dropped.average_label == kept.average_label
+  assert (dropped.first_timestamp, dropped.last_timestamp) == (0.0, objects[-1].timestamp)
+
+def test_average_label_prefers_person_above_threshold():
+  trajectory = Trajectory(1)
+  trajectory.add_object(DetectedObject(1, 'dog', 0, 0, 1, 1, 0.9, 0, 0.0))
+  trajectory.add_object(DetectedObject(1, 'dog', 0, 0, 1, 1, 0.9, 1, 0.1))
+  assert trajectory.average_label == 'dog'
+  trajectory.add_object(DetectedObject(1, 'person', 0, 0, 1, 1, 0.9, 2, 0.2))
+  assert trajectory.average_label == 'person'
+
+def test_points_out_of_time_order_are_filtered():
+  trajectory = Trajectory(1)
+  for timestamp in (0.0, 0.2, 0.1, 0.3):
+    trajectory.add_object(DetectedObject(1, 'person', 0, 0, 1, 1, 0.9, 0, timestamp))
+  assert trajectory.window_bounds(0.1, 0.2) == (None, None)
+  assert trajectory.points_between(0.1, 0.2).timestamp.tolist() == [0.2, 0.1]
+
+def test_trajectories_count_live_and_loaded_points_alike():
+  objects = zigzag(1) + zigzag(2, seed=1)
+  live = ObjTrajectories(CROSS_SEGMENT)
+  for detected_object in sorted(objects, key=lambda o: o.frame):
+    live.add_object(detected_object)
+  loaded = ObjTrajectories(CROSS_SEGMENT)
+  loaded.add_points(as_store(objects))
+  assert live.count_crosses() == loaded.count_crosses()
+  assert live.count_crosses() == (live._cross_clockwise_counter, live._cross_counter_clockwise_counter)
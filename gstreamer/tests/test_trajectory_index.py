@@ -0,0 +1,44 @@
+import numpy as np
+
+from tracking.detected_object import DetectedObject
+from tracking.trajectories import ObjTrajectories
+
+def add(trajectories, track_id, *timestamps):
+  for timestamp in timestamps:
+    trajectories.add_object(DetectedObject(track_id, 'person', 0.0, 0.0, 10.0, 10.0, 0.9, 0, timestamp))
+
+def brute_force_alive(trajectories, start_time, end_time):
+  return [row for row, traj in enumerate(trajectories.trajectories.values())
+          if traj.last_timestamp >= start_time and (end_time is None or traj.first_timestamp <= end_time)]
+
+def test_rows_alive_in_creation_order():
+  trajectories = ObjTrajectories(None)
+  add(trajectories, 1, 0.0, 0.3)
+  add(trajectories, 2, 0.5, 0.8)
+  add(trajectories, 3, 1.0, 1.2)
+  index = trajectories.index
+  assert index.rows_alive(0, 0.6).tolist() == [0, 1]
+  assert index.rows_alive(0.4, None).tolist() == [1, 2]
+  assert index.rows_alive(0.9, 0.95).tolist() == []
+
+def test_rows_alive_after_start_moves_earlier():
+  trajectories = ObjTrajectories(None)
+  add(trajectories, 1, 0.0)
+  add(trajectories, 2, 0.5)
+  add(trajectories, 3, 1.0)
+  # An out of order point moves the start of the last track before the previous one.
+  add(trajectories, 3, 0.2)
+  assert trajectories.index.rows_alive(0, 0.4).tolist() == [0, 2]
+  assert trajectories.index.rows_alive(0, 0.6).tolist() == [0, 1, 2]
+
+def test_rows_alive_matches_brute_force():
+  rng = np.random.default_rng(0)
+  trajectories = ObjTrajectories(None)
+  for step in range(200):
+    track_id = int(rng.integers(0, 30))
+    # Mostly increasing time with occasional late points.
+    add(trajectories, track_id, step / 10 - rng.exponential(0.5) * (rng.random() < 0.2))
+    start_time = rng.uniform(0, 20)
+    end_time = start_time + rng.uniform(0, 5)
+    assert trajectories.index.rows_alive(start_time, end_time).tolist() == \
+      brute_force_alive(trajectories, start_time, end_time)
@@ -17,8 +17,10 @@ This module provides the support for Tracker Object.
 This creates object for the specific tracker based on the name of the tracker provided 
 in the command line of the demo.
 
-To add more trackers here, simply replicate the SortTracker() code and replace it with 
-the new tracker as required.
+`sort` is VectorizedSort, a NumPy implementation of SORT; `sort_legacy` is the
+reference implementation from third_party/sort-master. To add a tracker, subclass
+ObjectTracker as VectorizedSortTracker does, with a `mot_tracker` that has the
+`update` interface of SORT, and add its name to ObjectTracker.
 
 Developer simply needs to instantiate the object of ObjectTracker(trackerObjectName) with a valid 
 trackerObjectName.
@@ -26,9 +28,15 @@ trackerObjectName.
 """
 import os,sys
 
+import numpy as np
+
+import geometry
+
 class ObjectTracker(object):
     def __init__(self, trackerObjectName):
         if trackerObjectName == 'sort':  # Add more trackers in elif whenever needed
+            self.trackerObject = VectorizedSortTracker()
+        elif trackerObjectName == 'sort_legacy':
             self.trackerObject = SortTracker()
         else:
             print("Invalid Tracker Name")
@@ -36,7 +44,326 @@ class ObjectTracker(object):
 
 
 class SortTracker(ObjectTracker):
+    """The reference SORT implementation from third_party/sort-master."""
     def __init__(self):
         sys.path.append(os.path.join(os.path.dirname(__file__), '../third_party', 'sort-master'))
         from sort import Sort
         self.mot_tracker = Sort()
+
+
+class VectorizedSortTracker(ObjectTracker):
+    def __init__(self):
+        self.mot_tracker = VectorizedSort()
+
+
+def match_detections(trdata, detections):
+    """Returns for each tracked box in `trdata` the index of the detection it overlaps
+    most (by IoU), or -1 if it overlaps none."""
+    if not len(trdata) or not len(detections):
+        return np.full(len(trdata), -1)
+    iou = geometry.iou_matrix(trdata, detections)
+    matches = iou.argmax(axis=1)
+    matches[iou[np.arange(len(matches)), matches] <= 0] = -1
+    return matches
+
+
+def linear_assignment(cost):
+    """Returns (rows, cols) of a minimum cost assignment for the 2D array `cost`.
+
+    Hungarian algorithm with shortest augmenting paths; every row (or column, if
+    there are fewer) is assigned. Pairs are sorted by row.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    # Potentials and the row assigned to each column, 1-based with 0 as "none".
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            free = ~used[1:]
+            reduced = cost[p[j0] - 1] - u[p[j0]] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            columns = np.flatnonzero(used)
+            u[p[columns]] += delta
+            v[columns] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def _bbox_to_z(boxes):
+    """x0, y0, x1, y1 rows to the measured centre, area and aspect ratio."""
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.column_stack((boxes[:, 0] + w / 2., boxes[:, 1] + h / 2., w * h, w / h))
+
+
+def _x_to_bbox(x):
+    w = np.sqrt(x[:, 2] * x[:, 3])
+    h = x[:, 2] / w
+    return np.column_stack((x[:, 0] - w / 2., x[:, 1] - h / 2., x[:, 0] + w / 2., x[:, 1] + h / 2.))
+
+
+class VectorizedSort:
+    """SORT with the Kalman filters of all tracks stacked in arrays.
+
+    Same model, parameters and track life cycle as the reference `sort.Sort`
+    (constant velocity box model, IoU association, tracks reported after
+    `min_hits` consecutive hits and dropped after `max_age` missed frames), but
+    predict and update run as one batched matrix operation for every track and
+    assignment needs neither filterpy nor lap.
+
+    `update` returns the same (N, 5) x0, y0, x1, y1, id array as `sort.Sort`;
+    afterwards `detection_indices` holds the index of the detection that
+    updated each returned track. On frames without detection `predict` moves
+    the tracks ahead and returns their predicted boxes instead. `error` holds
+    how far the last detection of each track was from its prediction, in box
+    sizes.
+    """
+    # State is centre x, y, area, aspect ratio and the velocities of the first three.
+    F = np.eye(7) + np.eye(7, k=4)
+    H = np.eye(4, 7)
+    R = np.diag([1., 1., 10., 10.])
+    Q = np.diag([1., 1., 1., 1., .01, .01, .0001])
+    P0 = np.diag([10., 10., 10., 10., 10000., 10000., 10000.])
+
+    def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.frame_count = 0
+        self.next_id = 1
+        self.x = np.empty((0, 7))
+        self.P = np.empty((0, 7, 7))
+        self.ids = np.empty(0, dtype=int)
+        self.time_since_update = np.empty(0, dtype=int)
+        self.hit_streak = np.empty(0, dtype=int)
+        self.hits = np.empty(0, dtype=int)
+        self.age = np.empty(0, dtype=int)
+        self.detection_index = np.empty(0, dtype=int)
+        self.detection_indices = np.empty(0, dtype=int)
+        self.error = np.empty(0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _keep(self, mask):
+        for name in ('x', 'P', 'ids', 'time_since_update', 'hit_streak', 'hits', 'age', 'detection_index', 'error'):
+            setattr(self, name, getattr(self, name)[mask])
+
+    def _advance(self):
+        """Moves the filters one frame ahead and returns the predicted boxes; tracks whose
+        box is no longer valid are dropped."""
+        # Keep the predicted area from becoming negative.
+        self.x[self.x[:, 6] + self.x[:, 2] <= 0, 6] = 0.
+        self.x = self.x @ self.F.T
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        boxes = _x_to_bbox(self.x)
+        valid = ~np.isnan(boxes).any(axis=1)
+        if not valid.all():
+            self._keep(valid)
+            boxes = boxes[valid]
+        return boxes
+
+    def _predict(self):
+        self.age += 1
+        self.hit_streak[self.time_since_update > 0] = 0
+        self.time_since_update += 1
+        self.detection_index[:] = -1
+        return self._advance()
+
+    def _reported(self):
+        reported = (self.time_since_update < 1) & (
+            (self.hit_streak >= self.min_hits) | (self.frame_count <= self.min_hits))
+        # The reference implementation reports tracks newest first.
+        return np.flatnonzero(reported)[::-1]
+
+    def _associate(self, detections, boxes):
+        """Returns matched detection and track indices and the unmatched detections, in
+        the order `sort.associate_detections_to_trackers` produces them."""
+        if not len(boxes) or not len(detections):
+            return np.empty(0, dtype=int), np.empty(0, dtype=int), np.arange(len(detections))
+        iou = geometry.iou_matrix(detections, boxes)
+        above = iou > self.iou_threshold
+        if above.sum(1).max() == 1 and above.sum(0).max() == 1:
+            matched_detections, matched_tracks = np.nonzero(above)
+        else:
+            matched_detections, matched_tracks = linear_assignment(-iou)
+        good = iou[matched_detections, matched_tracks] >= self.iou_threshold
+        unassigned = np.setdiff1d(np.arange(len(detections)), matched_detections)
+        unmatched = np.concatenate((unassigned, matched_detections[~good]))
+        return matched_detections[good], matched_tracks[good], unmatched
+
+    def _update(self, tracks, boxes):
+        z = _bbox_to_z(boxes)
+        x, P = self.x[tracks], self.P[tracks]
+        self.error[tracks] = np.hypot(z[:, 0] - x[:, 0], z[:, 1] - x[:, 1]) / np.sqrt(np.maximum(x[:, 2], 1e-12))
+        S = P[:, :4, :4] + self.R
+        K = P[:, :, :4] @ np.linalg.inv(S)
+        x += (K @ (z - x[:, :4])[:, :, None])[:, :, 0]
+        I_KH = np.eye(7) - K @ self.H
+        P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+        self.x[tracks], self.P[tracks] = x, P
+        self.time_since_update[tracks] = 0
+        self.hits[tracks] += 1
+        self.hit_streak[tracks] += 1
+
+    def _add_tracks(self, boxes, detection_index):
+        count = len(boxes)
+        x = np.zeros((count, 7))
+        x[:, :4] = _bbox_to_z(boxes)
+        self.x = np.concatenate((self.x, x))
+        self.P = np.concatenate((self.P, np.broadcast_to(self.P0, (count, 7, 7))))
+        self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + count)))
+        self.next_id += count
+        zeros = np.zeros(count, dtype=int)
+        self.time_since_update = np.concatenate((self.time_since_update, zeros))
+        self.hit_streak = np.concatenate((self.hit_streak, zeros))
+        self.hits = np.concatenate((self.hits, zeros))
+        self.age = np.concatenate((self.age, zeros))
+        self.detection_index = np.concatenate((self.detection_index, detection_index))
+        self.error = np.concatenate((self.error, np.zeros(count)))
+
+    def update(self, dets=np.empty((0, 5))):
+        """Takes an (N, 5+) array of x0, y0, x1, y1, score detections of one frame,
+        also when there are none, and returns the boxes and ids of the confirmed tracks."""
+        self.frame_count += 1
+        dets = np.asarray(dets, dtype=np.float64)
+        if dets.ndim != 2:
+            dets = dets.reshape(-1, 5)
+        boxes = self._predict()
+        detections, tracks, unmatched = self._associate(dets[:, :4], boxes)
+        if len(tracks):
+            self._update(tracks, dets[detections, :4])
+            self.detection_index[tracks] = detections
+        if len(unmatched):
+            self._add_tracks(dets[unmatched, :4], unmatched)
+
+        reported = self._reported()
+        result = np.column_stack((_x_to_bbox(self.x[reported]), self.ids[reported]))
+        self.detection_indices = self.detection_index[reported]
+        self._keep(self.time_since_update <= self.max_age)
+        return result
+
+    def predict(self):
+        """Moves every track one frame ahead for a frame the detector skipped and returns
+        the predicted boxes and ids of the tracks the last `update` reported.
+
+        A skipped frame is not a miss: tracks keep their hit streak and are not aged
+        towards `max_age`. `detection_indices` is -1 for every returned track.
+        """
+        self._advance()
+        reported = self._reported()
+        self.detection_indices = np.full(len(reported), -1)
+        return np.column_stack((_x_to_bbox(self.x[reported]), self.ids[reported]))
+
+
+class DetectionCadence:
+    """Runs the detector on some frames only; the tracker predicts the boxes of the others.
+
+    The detector runs at least every `every` frames. With `max_error`, the interval
+    adapts between 1 and `every`: it is halved when a detection lands further than
+    `max_error` box sizes from its track's prediction and grows by one frame
+    otherwise. With `max_motion`, the next frame is also detected as soon as a track
+    would have moved by more than `max_motion` box sizes since its last detection.
+
+    `detect_next` is called for every frame before inference and `track` after it,
+    in frame order but possibly on another thread (see detect.py --pipelined), so
+    `track` only leaves the interval and an urgency flag for later `detect_next`
+    calls. Needs a tracker with `predict`, i.e. `VectorizedSort`.
+    """
+    def __init__(self, every=1, max_error=None, max_motion=None):
+        self.every = every
+        self.max_error = max_error
+        self.max_motion = max_motion
+        self.interval = every
+        self.detected_frames = 0
+        self.predicted_frames = 0
+        self._skipped = every
+        self._urgent = False
+        self._since_detection = 0
+        # Score and class id of the last detection of each reported track.
+        self._last_detections = {}
+
+    def detect_next(self):
+        """Returns whether the detector runs on the next frame."""
+        if self._urgent or self._skipped + 1 >= self.interval:
+            self._urgent = False
+            self._skipped = 0
+            return True
+        self._skipped += 1
+        return False
+
+    def track(self, mot_tracker, detections=None, class_ids=None):
+        """Updates `mot_tracker` with the (N, 5) `detections` of a detected frame, or
+        predicts a skipped one when `detections` is None.
+
+        Returns the tracker output, the detections and class ids its boxes refer to
+        and the index of each box's detection. On skipped frames these detections are
+        the predicted boxes, with the score and class of their track's last detection.
+        """
+        if detections is None:
+            trdata = mot_tracker.predict()
+            self.predicted_frames += 1
+            self._since_detection += 1
+            last = [self._last_detections[track_id] for track_id in trdata[:, 4].astype(int).tolist()]
+            scores = np.array([score for score, _ in last]).reshape(-1, 1)
+            detections = np.hstack((trdata[:, :4], scores))
+            class_ids = np.array([class_id for _, class_id in last], dtype=int)
+            matches = np.arange(len(trdata))
+        else:
+            trdata = mot_tracker.update(detections)
+            self.detected_frames += 1
+            self._since_detection = 0
+            matches = mot_tracker.detection_indices
+            self._last_detections = {
+                track_id: (float(detections[match, 4]), int(class_ids[match]))
+                for track_id, match in zip(trdata[:, 4].astype(int).tolist(), matches.tolist())}
+            if self.max_error is not None:
+                self._adapt(mot_tracker)
+        if self.max_motion is not None:
+            self._urgent = self._urgent or self._motion(mot_tracker) > self.max_motion
+        return trdata, detections, class_ids, matches
+
+    def _adapt(self, mot_tracker):
+        updated = mot_tracker.time_since_update == 0
+        error = mot_tracker.error[updated].max() if updated.any() else 0.0
+        if error > self.max_error:
+            self.interval = max(1, self.interval // 2)
+        else:
+            self.interval = min(self.every, self.interval + 1)
+
+    def _motion(self, mot_tracker):
+        """Largest distance, in box sizes, a track will have been moved by the tracker
+        alone on the next frame."""
+        x = mot_tracker.x[mot_tracker.time_since_update == 0]
+        if not len(x):
+            return 0.0
+        speed = np.hypot(x[:, 4], x[:, 5]) / np.sqrt(np.maximum(x[:, 2], 1e-12))
+        return (self._since_detection + 1) * speed.max()
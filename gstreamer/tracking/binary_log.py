@@ -0,0 +1,142 @@
+"""Compact binary trajectory log.
+
+Layout: an 8 byte magic, a little-endian uint32 header size, a JSON header
+(record fields and the label dictionary) padded with spaces to the header
+size, then fixed-width records of `RECORD_DTYPE`. The record count follows
+from the file size, so a log cut short by a crash is still readable up to the
+last complete record.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from tracking.csv_chunks import read_csv_chunks
+from tracking.point_store import LABELS, LabelTable, PointStore
+
+MAGIC = b'TRKLOG\x00\x01'
+EXTENSION = '.trk'
+HEADER_RESERVE = 4096
+
+# Timestamp first keeps every field naturally aligned in a 40 byte record.
+RECORD_DTYPE = np.dtype([
+  ('timestamp', '<f8'),
+  ('id', '<i4'),
+  ('x', '<f4'),
+  ('y', '<f4'),
+  ('w', '<f4'),
+  ('h', '<f4'),
+  ('score', '<f4'),
+  ('frame', '<i4'),
+  ('label', '<i2'),
+  ('predicted', '|b1'),
+  ('reserved', '|u1'),
+])
+MAX_LABELS = np.iinfo(RECORD_DTYPE['label']).max + 1
+
+_PREFIX = struct.Struct('<8sI')
+
+def _encode_header(labels, header_size):
+  header = json.dumps({ 'fields': RECORD_DTYPE.descr, 'labels': labels }).encode('utf-8')
+  size = max(header_size, _PREFIX.size + len(header))
+  return _PREFIX.pack(MAGIC, size) + header.ljust(size - _PREFIX.size)
+
+class BinaryLogWriter:
+  """Appends `PointStore` rows to a binary log.
+
+  Label codes are written as they are in `LABELS`; the label dictionary in the
+  header is rewritten on every flush, within `header_reserve` bytes.
+  """
+  def __init__(self, filename, labels=LABELS, header_reserve=HEADER_RESERVE):
+    self.filename = filename
+    self.labels = labels
+    self._header_size = len(_encode_header([], header_reserve))
+    self._file = open(filename, 'wb')
+    self._write_header()
+
+  def _write_header(self):
+    if len(self.labels) > MAX_LABELS:
+      raise ValueError('{}: more than {} labels'.format(self.filename, MAX_LABELS))
+    header = _encode_header(self.labels.names(), self._header_size)
+    if len(header) > self._header_size:
+      raise ValueError('{}: label dictionary does not fit in {} header bytes'.format(
+        self.filename, self._header_size))
+    position = self._file.tell()
+    self._file.seek(0)
+    self._file.write(header)
+    self._file.seek(max(position, self._header_size))
+
+  def write(self, points):
+    if points.labels is not self.labels:
+      raise ValueError('points use a different label table than the log')
+    records = np.zeros(len(points), dtype=RECORD_DTYPE)
+    for name in RECORD_DTYPE.names:
+      if name != 'reserved':
+        records[name] = points.column(name)
+    self._file.write(records.tobytes())
+
+  def flush(self):
+    self._write_header()
+    self._file.flush()
+
+  def close(self):
+    if self._file.closed:
+      return
+    self.flush()
+    self._file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+class BinaryLog:
+  """Memory-mapped reader of a binary log.
+
+  `records` is a read-only structured memmap; `points` and `chunks` expose its
+  fields as zero-copy column views with the label dictionary from the header.
+  """
+  def __init__(self, filename):
+    with open(filename, 'rb') as logfile:
+      magic, header_size = _PREFIX.unpack(logfile.read(_PREFIX.size))
+      if magic != MAGIC:
+        raise ValueError('{}: not a binary trajectory log'.format(filename))
+      header = json.loads(logfile.read(header_size - _PREFIX.size))
+    dtype = np.dtype([tuple(field) for field in header['fields']])
+    if dtype != RECORD_DTYPE:
+      raise ValueError('{}: unsupported record layout'.format(filename))
+    self.labels = LabelTable()
+    for label in header['labels']:
+      self.labels.code(label)
+    count = (os.path.getsize(filename) - header_size) // dtype.itemsize
+    if count:
+      self.records = np.memmap(filename, dtype=dtype, mode='r', offset=header_size, shape=(count,))
+    else:
+      self.records = np.empty(0, dtype=dtype)
+
+  def __len__(self):
+    return len(self.records)
+
+  def view(self, start=0, stop=None):
+    """Returns rows [start, stop) as a `PointStore` backed by the mapped file."""
+    records = self.records[start:stop]
+    return PointStore.wrap({ name: records[name] for name in records.dtype.names }, self.labels)
+
+  @property
+  def points(self):
+    return self.view()
+
+  def chunks(self, chunk_rows):
+    for start in range(0, len(self.records), chunk_rows):
+      yield self.view(start, start + chunk_rows)
+
+def convert_csv(csv_filename, log_filename, fieldnames=None):
+  """Converts a collector CSV into a binary log, returning the number of rows written."""
+  rows = 0
+  with BinaryLogWriter(log_filename) as writer:
+    for chunk in read_csv_chunks(csv_filename, fieldnames):
+      writer.write(chunk)
+      rows += len(chunk)
+  return rows
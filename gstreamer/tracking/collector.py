@@ -1,17 +1,165 @@
 import csv
+import os
+import threading
 import time
 
+from tracking.binary_log import EXTENSION as BINARY_LOG_EXTENSION, BinaryLogWriter
 from tracking.detected_object import DetectedObject
+from tracking.point_store import PointRing, PointStore
+
+DEFAULT_BUFFER_ROWS = 100000
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_FLUSH_ROWS = 10000
+DEFAULT_ROTATE_ROWS = 1000000
+
+def write_points_csv(csvfile, points, header=True):
+  writer = csv.writer(csvfile)
+  if header:
+    writer.writerow(DetectedObject._fields)
+  labels = [points.labels.label(code) for code in points.label_codes.tolist()]
+  writer.writerows(zip(points.id.tolist(), labels, points.x.tolist(), points.y.tolist(),
+    points.w.tolist(), points.h.tolist(), points.score.tolist(), points.frame.tolist(),
+    points.timestamp.tolist(), points.predicted.astype(int).tolist()))
+
+class CsvPointWriter:
+  def __init__(self, filename):
+    self._file = open(filename, 'w', newline='')
+    self._header = True
+
+  def write(self, points):
+    write_points_csv(self._file, points, header=self._header)
+    self._header = False
+
+  def flush(self):
+    self._file.flush()
+
+  def close(self):
+    self._file.close()
+
+def open_point_writer(filename):
+  """Returns a CSV writer, or a binary log writer for `.trk` filenames."""
+  if filename.endswith(BINARY_LOG_EXTENSION):
+    return BinaryLogWriter(filename)
+  return CsvPointWriter(filename)
+
+class CollectorSpill:
+  """Background thread that drains a `PointRing` into rotating files.
+
+  Files are named `<root>-0000<ext>`, `<root>-0001<ext>`, ... after `filename`
+  and each holds at most `rotate_rows` rows with its own header. The format
+  follows the extension (see `open_point_writer`). The ring is
+  flushed every `flush_interval` seconds or as soon as `flush_rows` are pending.
+  A write error stops the thread; it is kept in `error` and raised by `stop`.
+  """
+  def __init__(self, ring, filename, flush_interval=DEFAULT_FLUSH_INTERVAL,
+               flush_rows=DEFAULT_FLUSH_ROWS, rotate_rows=DEFAULT_ROTATE_ROWS):
+    self.ring = ring
+    self.flush_interval = flush_interval
+    self.flush_rows = flush_rows
+    self.rotate_rows = rotate_rows
+    self.filename = filename
+    self.files = []
+    self._root, self._ext = os.path.splitext(filename)
+    self._ext = self._ext or '.csv'
+    self._writer = None
+    self._file_rows = 0
+    self.error = None
+    # Flushes may also come from the collector's thread, see `Collector.reset`.
+    self._flush_lock = threading.Lock()
+    self._wakeup = threading.Event()
+    self._running = False
+    self._thread = threading.Thread(target=self._run, name='collector-spill', daemon=True)
+
+  def start(self):
+    self._running = True
+    self._thread.start()
+
+  def notify(self):
+    self._wakeup.set()
+
+  def stop(self):
+    """Stops the thread after a final flush and closes the current file.
+
+    Raises the error that stopped the thread, if any.
+    """
+    if not self._running:
+      return
+    self._running = False
+    self._wakeup.set()
+    self._thread.join()
+    try:
+      if self.error is None:
+        self.flush()
+    finally:
+      if self._writer is not None:
+        self._writer.close()
+        self._writer = None
+    if self.error is not None:
+      raise self.error
+
+  def _run(self):
+    while self._running:
+      self._wakeup.wait(self.flush_interval)
+      self._wakeup.clear()
+      try:
+        self.flush()
+      except Exception as error:
+        self.error = error
+        print('Collector spill stopped: {}'.format(error))
+        return
+
+  def flush(self):
+    with self._flush_lock:
+      points = self.ring.drain()
+      start = 0
+      while start < len(points):
+        if self._writer is None or self._file_rows >= self.rotate_rows:
+          self._rotate()
+        stop = min(len(points), start + self.rotate_rows - self._file_rows)
+        self._writer.write(points.select(slice(start, stop)))
+        self._file_rows += stop - start
+        start = stop
+      if self._writer is not None:
+        self._writer.flush()
+
+  def _rotate(self):
+    if self._writer is not None:
+      self._writer.close()
+    filename = '{}-{:04d}{}'.format(self._root, len(self.files), self._ext)
+    self.files.append(filename)
+    self._writer = open_point_writer(filename)
+    self._file_rows = 0
 
 class Collector:
   def __init__(self):
+    self._spill = None
+    self.heatmap = None
+    self._frame_boxes = []
     self.reset()
 
   def increment_frame_number(self):
+    self._add_frame_to_heatmap()
     self._frame_number += 1
 
+  def enable_heatmap(self, heatmap):
+    """Also accumulates the boxes of every frame into `heatmap`, a `tracking.heatmap.Heatmap`,
+    one batch per frame, also while spilling."""
+    self.heatmap = heatmap
+
+  def _add_frame_to_heatmap(self):
+    if self._frame_boxes:
+      self.heatmap.add_boxes(*zip(*self._frame_boxes))
+      self._frame_boxes = []
+    elif self.heatmap is not None:
+      self.heatmap.add_boxes([], [], [], [], [])
+
   def reset(self):
-    self.points = []
+    """Starts a new collection. With spilling enabled, the points collected so far are
+    flushed and the ring keeps feeding the spill files."""
+    if self._spill is not None:
+      self._spill.flush()
+    else:
+      self.points = PointStore()
     self._frame_number = 0
     self._start_time = None
 
@@ -19,17 +167,40 @@ class Collector:
     if self._start_time is None:
       self._start_time = time.monotonic()
 
-  def add_point(self, label, x, y , w, h, track_id, score):
-    timestamp = timestamp = time.monotonic() - self._start_time
-    self.points.append(
-      DetectedObject(track_id, label, x, y, w, h, score, self._frame_number, timestamp)
-    )
-
-  def dump(self, filename):
-    with open(filename, 'w') as csvfile:
-      writer = csv.DictWriter(csvfile, fieldnames=DetectedObject._fields)
-      writer.writeheader()
-      for point in self.points:
-        writer.writerow(point._asdict())
+  def enable_spill(self, filename, buffer_rows=DEFAULT_BUFFER_ROWS, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                   flush_rows=DEFAULT_FLUSH_ROWS, rotate_rows=DEFAULT_ROTATE_ROWS):
+    """Switches to a bounded ring of `buffer_rows` points spilled to rotating files by a background thread."""
+    self.points = PointRing(buffer_rows)
+    self._spill = CollectorSpill(self.points, filename, flush_interval, min(flush_rows, buffer_rows), rotate_rows)
+    self._spill.start()
+
+  def add_point(self, label, x, y , w, h, track_id, score, predicted=False):
+    """Adds a tracked box of the current frame; `predicted` boxes come from the tracker alone."""
+    timestamp = time.monotonic() - self._start_time
+    pending = self.points.add(track_id, label, x, y, w, h, score, self._frame_number, timestamp, predicted)
+    if self.heatmap is not None:
+      self._frame_boxes.append((track_id, x, y, w, h))
+    if self._spill is not None and pending == self._spill.flush_rows:
+      self._spill.notify()
+
+  def dump(self, filename=None):
+    """Writes collected points to `filename` (CSV or `.trk`).
+
+    With spilling enabled this is the final flush to the spill files instead, which raises
+    the error that stopped the spill thread, if any. `filename` must then be omitted or be
+    the file name spilling was enabled with.
+    """
+    if self._spill is not None and filename is not None and \
+        os.path.abspath(filename) != os.path.abspath(self._spill.filename):
+      raise ValueError('collector spills to rotating {} files, not to {}'.format(self._spill.filename, filename))
+    self._add_frame_to_heatmap()
+    if self._spill is not None:
+      if self.points.dropped:
+        print('Collector dropped {} points on buffer overflow'.format(self.points.dropped))
+      self._spill.stop()
+      return
+    writer = open_point_writer(filename)
+    writer.write(self.points)
+    writer.close()
 
 CollectorSingletone = Collector()
@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+import numpy as np
+
+from geometry import segments_intersection_mask, points_to_segment_orientation
+
+SegmentBatch = namedtuple('SegmentBatch', 'track_ids segments timestamps')
+SegmentBatch.__doc__ = """Segments of many trajectories stacked for vectorized processing.
+
+track_ids: (N,) track id of every segment.
+segments: (N, 4) x0, y0, x1, y1 centroid coordinates.
+timestamps: (N,) timestamp of the segment end point.
+"""
+
+def empty_segment_batch():
+  return SegmentBatch(np.empty(0, dtype=np.int32), np.empty((0, 4)), np.empty(0))
+
+def collect_segments(trajectories, filters=None):
+  """Stacks the segments of an iterable of `Trajectory` into a `SegmentBatch`."""
+  return stack_segments((traj.track_id, traj.points if filters is None else traj.get_points_filtered(filters))
+                        for traj in trajectories)
+
+def stack_segments(track_points):
+  """Stacks the segments of (track_id, `PointStore`) pairs into a `SegmentBatch`."""
+  track_ids, segments, timestamps = [], [], []
+  for track_id, points in track_points:
+    if len(points) < 2:
+      continue
+    cx, cy = points.cx, points.cy
+    segments.append(np.stack((cx[:-1], cy[:-1], cx[1:], cy[1:]), axis=1))
+    track_ids.append(np.full(len(points) - 1, track_id, dtype=np.int32))
+    timestamps.append(points.timestamp[1:])
+  if not segments:
+    return empty_segment_batch()
+  return SegmentBatch(np.concatenate(track_ids), np.concatenate(segments), np.concatenate(timestamps))
+
+def detect_crosses(segments, cross_segment):
+  """Vectorized `Trajectory.detect_cross`: (clockwise, counter_clockwise) masks per segment."""
+  crossed = segments_intersection_mask(segments, cross_segment)
+  is_clockwise = points_to_segment_orientation(cross_segment, segments[:, 2], segments[:, 3])
+  return crossed & is_clockwise, crossed & ~is_clockwise
+
+def count_crosses(segments, cross_segment):
+  """Returns total (clockwise, counter_clockwise) crossings of an (N, 4) segment array."""
+  clockwise, counter_clockwise = detect_crosses(segments, cross_segment)
+  return int(np.count_nonzero(clockwise)), int(np.count_nonzero(counter_clockwise))
+
+def count_crosses_by_track(batch, cross_segment):
+  """Returns {track_id: (clockwise, counter_clockwise)} for tracks that crossed at least once."""
+  clockwise, counter_clockwise = detect_crosses(batch.segments, cross_segment)
+  crossed = clockwise | counter_clockwise
+  track_ids, inverse = np.unique(batch.track_ids[crossed], return_inverse=True)
+  clockwise_counts = np.bincount(inverse, weights=clockwise[crossed], minlength=len(track_ids))
+  counter_clockwise_counts = np.bincount(inverse, weights=counter_clockwise[crossed], minlength=len(track_ids))
+  return { int(track_id): (int(cw), int(ccw)) for track_id, cw, ccw in
+    zip(track_ids, clockwise_counts, counter_clockwise_counts) }
+
+def count_crosses_by_time(batch, cross_segment, bucket_size, start_time=0):
+  """Buckets crossings by the timestamp of the segment end point.
+
+  Returns (bucket_start_times, clockwise_counts, counter_clockwise_counts) arrays.
+  """
+  clockwise, counter_clockwise = detect_crosses(batch.segments, cross_segment)
+  buckets = np.floor((batch.timestamps - start_time) / bucket_size).astype(np.int64)
+  valid = buckets >= 0
+  size = int(buckets[valid].max()) + 1 if np.any(valid) else 0
+  clockwise_counts = np.bincount(buckets[valid & clockwise], minlength=size)
+  counter_clockwise_counts = np.bincount(buckets[valid & counter_clockwise], minlength=size)
+  return start_time + bucket_size * np.arange(size), clockwise_counts, counter_clockwise_counts
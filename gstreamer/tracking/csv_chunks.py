@@ -0,0 +1,63 @@
+import csv
+
+import numpy as np
+
+from tracking.detected_object import DetectedObject
+from tracking.point_store import COLUMN_DTYPES, LABELS, OPTIONAL_COLUMNS, PointStore
+
+# Roughly 50k collector rows per chunk.
+CHUNK_BYTES = 4 << 20
+
+def read_csv_chunks(filename, fieldnames=None, chunk_bytes=CHUNK_BYTES, labels=LABELS):
+  """Yields the rows of a collector CSV as `PointStore` chunks.
+
+  The column layout comes from the header line, so both the current header and
+  older ones, with extra `cx`, `cy` columns or without `predicted`, are accepted. When `fieldnames`
+  is given the header line is skipped and `fieldnames` is used instead.
+  Only one chunk of roughly `chunk_bytes` of text is held in memory at a time.
+  """
+  with open(filename, 'r', newline='') as csvfile:
+    header = next(csv.reader([csvfile.readline()]), [])
+    if fieldnames is None:
+      fieldnames = header
+    fieldnames = [name.strip() for name in fieldnames]
+    missing = [name for name in DetectedObject._fields if name not in fieldnames and name not in OPTIONAL_COLUMNS]
+    if missing:
+      raise ValueError('{}: missing columns {}'.format(filename, ', '.join(missing)))
+    positions = { name: fieldnames.index(name) for name in DetectedObject._fields if name in fieldnames }
+    while True:
+      lines = csvfile.readlines(chunk_bytes)
+      if not lines:
+        break
+      yield _parse_lines(lines, len(fieldnames), positions, labels)
+
+def _split_fields(lines, width):
+  """Returns the fields of the rows in `lines`, skipping blank lines as `csv.reader` does."""
+  text = ''.join(lines)
+  if '"' in text:
+    rows = [row for row in csv.reader(lines) if row]
+    for row in rows:
+      if len(row) != width:
+        raise ValueError('malformed CSV row: {} fields for {} columns'.format(len(row), width))
+    return [field for row in rows for field in row]
+  rows = [row for row in text.replace('\r', '').split('\n') if row]
+  for row in rows:
+    if row.count(',') != width - 1:
+      raise ValueError('malformed CSV row: {} fields for {} columns'.format(row.count(',') + 1, width))
+  return ','.join(rows).split(',') if rows else []
+
+def _parse_lines(lines, width, positions, labels):
+  fields = _split_fields(lines, width)
+  columns = {}
+  for name, position in positions.items():
+    values = fields[position::width]
+    if name == 'label':
+      unique_labels, inverse = np.unique(np.array(values), return_inverse=True)
+      columns[name] = labels.codes(unique_labels.tolist())[inverse]
+    elif name in ('id', 'frame', 'predicted'):
+      columns[name] = np.array(values, dtype=np.int64).astype(COLUMN_DTYPES[name])
+    else:
+      columns[name] = np.array(values, dtype=COLUMN_DTYPES[name])
+  for name in OPTIONAL_COLUMNS:
+    columns.setdefault(name, np.zeros(len(columns['x']), dtype=COLUMN_DTYPES[name]))
+  return PointStore.from_columns(columns, labels)
@@ -1,6 +1,8 @@
 from collections import namedtuple
 
-DetectedObjectTuple = namedtuple('DetectedObject', 'id label x y w h score frame timestamp')
+# `predicted` boxes were carried forward by the tracker on a frame the detector skipped.
+DetectedObjectTuple = namedtuple('DetectedObject', 'id label x y w h score frame timestamp predicted',
+                                 defaults=(False,))
 
 class DetectedObject(DetectedObjectTuple):
   @property
@@ -21,6 +23,7 @@ class DetectedObject(DetectedObjectTuple):
     d['h'] = float(d['h'])
     d['score'] = float(d['score'])
     d['timestamp'] = float(d['timestamp'])
+    d['predicted'] = bool(int(d.get('predicted', 0)))
     # todo: remove
     if 'cx' in d:
       del d['cx']
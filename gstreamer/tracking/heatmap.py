@@ -0,0 +1,193 @@
+import struct
+import zlib
+
+import numpy as np
+
+from tracking.point_store import PointStore
+
+DEFAULT_CELL_SIZE = 8
+DEFAULT_MAX_MISSED_BATCHES = 30
+LAYERS = ('occupancy', 'footprint', 'paths')
+
+def hot_colormap(values):
+  """Maps values in [0, 1] to black-red-yellow-white RGB bytes."""
+  values = np.clip(values, 0, 1)[..., None]
+  rgb = np.clip(3 * values - np.array([0, 1, 2]), 0, 1)
+  return (255 * rgb).astype(np.uint8)
+
+def write_png(filename, rgb):
+  """Writes an (H, W, 3) uint8 array as an 8-bit RGB PNG."""
+  height, width, _ = rgb.shape
+  # Every scanline starts with filter type 0 (none).
+  raw = np.concatenate((np.zeros((height, 1), dtype=np.uint8), rgb.reshape(height, -1)), axis=1).tobytes()
+  def chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+  with open(filename, 'wb') as f:
+    f.write(b'\x89PNG\r\n\x1a\n')
+    f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+    f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+    f.write(chunk(b'IEND', b''))
+
+class Heatmap:
+  """Raster occupancy and path density of tracked objects over a `size` scene.
+
+  The scene is divided in `cell_size` pixel cells. Three layers are
+  accumulated as points come in, one batch or one point at a time:
+
+  occupancy: centroids per cell.
+  footprint: boxes covering each cell, added in O(1) per box to a 2D
+    difference grid that is integrated when the layer is read.
+  paths: segments between consecutive centroids of a track passing through
+    each cell.
+
+  Reading a layer or writing a PNG costs the same however many points went
+  in. Heatmaps of the same geometry add up with `merge`, e.g. the hours of a
+  day or the cameras of a store (a path is not joined across the heatmaps it
+  was split in), and are saved and loaded as raw arrays. To continue paths
+  from one batch to the next, the last centroid of every track is kept until
+  the track is missing from more than `max_missed_batches` batches.
+  """
+  def __init__(self, size, cell_size=DEFAULT_CELL_SIZE, max_missed_batches=DEFAULT_MAX_MISSED_BATCHES):
+    self.size = tuple(int(s) for s in size)
+    self.cell_size = cell_size
+    self.max_missed_batches = max_missed_batches
+    self.batch = 0
+    self.shape = (-(-self.size[1] // cell_size), -(-self.size[0] // cell_size))
+    self.points = 0
+    self._occupancy = np.zeros(self.shape, dtype=np.int64)
+    self._footprint = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int64)
+    self._paths = np.zeros(self.shape, dtype=np.int64)
+    # Track id -> (cx, cy, batch last seen), to continue paths from one batch to the next.
+    self._last_centroids = {}
+
+  def _cells(self, x, y):
+    """Returns (row, column) cell indices of pixel coordinates and whether they are in the scene."""
+    column = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+    row = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+    inside = (row >= 0) & (row < self.shape[0]) & (column >= 0) & (column < self.shape[1])
+    return row, column, inside
+
+  def add_points(self, points, continue_paths=True):
+    """Adds a `PointStore` batch in time order, e.g. the points of one frame.
+
+    With `continue_paths`, the path of a track continues from its last point
+    of a previous batch.
+    """
+    self.add_boxes(points.id, points.x, points.y, points.w, points.h, continue_paths)
+
+  def add_boxes(self, track_ids, x, y, w, h, continue_paths=True):
+    """Adds a batch of boxes given as columns, as `add_points` does."""
+    track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+    x, y, w, h = (np.asarray(column, dtype=np.float64).reshape(-1) for column in (x, y, w, h))
+    if continue_paths:
+      self.batch += 1
+      self._evict()
+    if len(track_ids) == 0:
+      return
+    cx, cy = x + w / 2, y + h / 2
+    self.points += len(track_ids)
+
+    row, column, inside = self._cells(cx, cy)
+    np.add.at(self._occupancy, (row[inside], column[inside]), 1)
+
+    # Cells [row0, row1) x [column0, column1) overlapped by each box, clipped to the scene.
+    row0, column0, _ = self._cells(x, y)
+    row1, column1, _ = self._cells(x + w, y + h)
+    row0, column0 = np.clip(row0, 0, self.shape[0]), np.clip(column0, 0, self.shape[1])
+    row1, column1 = np.clip(row1 + 1, 0, self.shape[0]), np.clip(column1 + 1, 0, self.shape[1])
+    covers = (row1 > row0) & (column1 > column0)
+    row0, column0, row1, column1 = row0[covers], column0[covers], row1[covers], column1[covers]
+    np.add.at(self._footprint, (row0, column0), 1)
+    np.add.at(self._footprint, (row0, column1), -1)
+    np.add.at(self._footprint, (row1, column0), -1)
+    np.add.at(self._footprint, (row1, column1), 1)
+
+    order = np.argsort(track_ids, kind='stable')
+    track_ids, cx, cy = track_ids[order], cx[order], cy[order]
+    first = np.r_[True, track_ids[1:] != track_ids[:-1]]
+    x0, y0 = np.r_[np.nan, cx[:-1]], np.r_[np.nan, cy[:-1]]
+    if continue_paths:
+      for i in np.flatnonzero(first).tolist():
+        x0[i], y0[i], _ = self._last_centroids.get(int(track_ids[i]), (np.nan, np.nan, None))
+      last = np.r_[first[1:], True]
+      self._last_centroids.update((track_id, (x1, y1, self.batch)) for track_id, x1, y1 in zip(
+        track_ids[last].tolist(), cx[last].tolist(), cy[last].tolist()))
+    else:
+      x0[first] = np.nan
+    has_start = ~np.isnan(x0)
+    self._add_segments(x0[has_start], y0[has_start], cx[has_start], cy[has_start])
+
+  def _add_segments(self, x0, y0, x1, y1):
+    # Sampled every half cell; every cell a segment passes through counts once.
+    samples = np.ceil(2 * np.hypot(x1 - x0, y1 - y0) / self.cell_size).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(samples)), samples)
+    t = (np.arange(len(segment)) - np.repeat(np.cumsum(samples) - samples, samples)) / np.repeat(
+      np.maximum(samples - 1, 1), samples)
+    row, column, inside = self._cells(x0[segment] + t * (x1 - x0)[segment], y0[segment] + t * (y1 - y0)[segment])
+    cells = np.unique(segment[inside] * self._paths.size + row[inside] * self.shape[1] + column[inside])
+    np.add.at(self._paths.reshape(-1), cells % self._paths.size, 1)
+
+  def _evict(self):
+    oldest = self.batch - self.max_missed_batches
+    ended = [track_id for track_id, (_, _, batch) in self._last_centroids.items() if batch < oldest]
+    for track_id in ended:
+      del self._last_centroids[track_id]
+
+  def add_point(self, track_id, x, y, w, h):
+    """Adds a single box as a batch of its own."""
+    self.add_boxes([track_id], [x], [y], [w], [h])
+
+  def add_trajectories(self, obj_trajectories, start_time=0, end_time=None, track_ids=None, label=None):
+    """Adds the points of the trajectories of an `ObjTrajectories` selected as in its `select`."""
+    # One batch for all windows; tracks have distinct ids, so their paths stay apart.
+    batch = PointStore()
+    for traj, points in obj_trajectories.select(start_time, end_time, track_ids, label):
+      batch.extend(points.columns())
+    self.add_points(batch, continue_paths=False)
+
+  def merge(self, other):
+    """Adds the layers of `other`, a heatmap of the same size and cell size, and returns self."""
+    if (other.size, other.cell_size) != (self.size, self.cell_size):
+      raise ValueError('Cannot merge a {} heatmap with {} px cells into a {} heatmap with {} px cells'.format(
+        other.size, other.cell_size, self.size, self.cell_size))
+    self.points += other.points
+    self._occupancy += other._occupancy
+    self._footprint += other._footprint
+    self._paths += other._paths
+    return self
+
+  def layer(self, name):
+    """Returns the (rows, columns) counts of layer `name`, one of `LAYERS`."""
+    if name == 'occupancy':
+      return self._occupancy.copy()
+    if name == 'footprint':
+      return self._footprint.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+    if name == 'paths':
+      return self._paths.copy()
+    raise ValueError('Unknown heatmap layer {}, expected one of {}'.format(name, LAYERS))
+
+  def to_rgb(self, name='occupancy'):
+    """Returns layer `name` colored on a log scale, scaled up to the scene size."""
+    counts = self.layer(name)
+    peak = counts.max()
+    values = np.log1p(counts) / np.log1p(peak) if peak > 0 else np.zeros(counts.shape)
+    rgb = hot_colormap(values).repeat(self.cell_size, axis=0).repeat(self.cell_size, axis=1)
+    return rgb[:self.size[1], :self.size[0]]
+
+  def save_png(self, filename, name='occupancy'):
+    write_png(filename, self.to_rgb(name))
+
+  def save(self, filename):
+    """Saves the raw layers to a `.npz` file that `load` reads back for merging."""
+    np.savez_compressed(filename, size=self.size, cell_size=self.cell_size, points=self.points,
+                        occupancy=self._occupancy, footprint=self._footprint, paths=self._paths)
+
+  @classmethod
+  def load(cls, filename):
+    with np.load(filename) as data:
+      heatmap = cls(data['size'], int(data['cell_size']))
+      heatmap.points = int(data['points'])
+      heatmap._occupancy[:] = data['occupancy']
+      heatmap._footprint[:] = data['footprint']
+      heatmap._paths[:] = data['paths']
+    return heatmap
@@ -0,0 +1,84 @@
+from collections import namedtuple
+
+import numpy as np
+
+from tracking.regions import CountingLines
+
+DEFAULT_MAX_MISSED_FRAMES = 30
+
+CrossingEvent = namedtuple('CrossingEvent', 'frame track_id line clockwise')
+CrossingEvent.__doc__ = """One crossing of counting line number `line` by `track_id`.
+
+`clockwise` has the meaning of `Trajectory.detect_cross`: True counts as in,
+False as out.
+"""
+
+class LiveCrossingCounter:
+  """Counts crossings of `cross_segments` from tracker output, frame by frame.
+
+  Only the last centroid of every active track is kept. Each `update` builds
+  the segments from those centroids to the new ones and tests them against
+  the lines near them (see `CountingLines`) with `Trajectory.detect_cross`
+  semantics, so the cost per frame is proportional to the tracks in it. Tracks not seen for more than
+  `max_missed_frames` frames are forgotten.
+
+  Crossings are reported to `callback(events, counter)` if given, and put on
+  `events`, e.g. a `queue.Queue`, if given. `counts` holds the running
+  (clockwise, counter_clockwise) totals per line.
+  """
+  def __init__(self, cross_segments, max_missed_frames=DEFAULT_MAX_MISSED_FRAMES, callback=None, events=None):
+    self.lines = CountingLines(cross_segments)
+    self.cross_segments = self.lines.cross_segments
+    self.max_missed_frames = max_missed_frames
+    self.callback = callback
+    self.events = events
+    self.counts = np.zeros((len(self.cross_segments), 2), dtype=np.int64)
+    self.frame = 0
+    # Track id -> (cx, cy, frame last seen).
+    self._tracks = {}
+
+  def __len__(self):
+    """Number of active tracks."""
+    return len(self._tracks)
+
+  def update(self, track_ids, cx, cy):
+    """Advances one frame with the centroids of the tracks in it; returns its `CrossingEvent`s."""
+    self.frame += 1
+    track_ids = [int(track_id) for track_id in track_ids]
+    cx = np.asarray(cx, dtype=np.float64)
+    cy = np.asarray(cy, dtype=np.float64)
+    moved, segments = [], []
+    for i, track_id in enumerate(track_ids):
+      last = self._tracks.get(track_id)
+      if last is not None:
+        moved.append(i)
+        segments.append((last[0], last[1], cx[i], cy[i]))
+    events = []
+    if segments:
+      rows, lines, clockwise = self.lines.detect(segments)
+      np.add.at(self.counts, (lines, np.where(clockwise, 0, 1)), 1)
+      events = [CrossingEvent(self.frame, track_ids[moved[row]], line, is_clockwise)
+                for row, line, is_clockwise in zip(rows.tolist(), lines.tolist(), clockwise.tolist())]
+    for track_id, x, y in zip(track_ids, cx.tolist(), cy.tolist()):
+      self._tracks[track_id] = (x, y, self.frame)
+    self._evict()
+    if events:
+      if self.callback is not None:
+        self.callback(events, self)
+      if self.events is not None:
+        for event in events:
+          self.events.put(event)
+    return events
+
+  def _evict(self):
+    oldest = self.frame - self.max_missed_frames
+    ended = [track_id for track_id, (_, _, frame) in self._tracks.items() if frame < oldest]
+    for track_id in ended:
+      del self._tracks[track_id]
+
+  def text_lines(self):
+    """Running counts as overlay text, in the format of `ObjTrajectories`."""
+    if len(self.cross_segments) == 1:
+      return ['In: {}. Out: {}'.format(*self.counts[0].tolist())]
+    return ['Line {}: In: {}. Out: {}'.format(line, *counts)
+            for line, counts in enumerate(self.counts.tolist())]
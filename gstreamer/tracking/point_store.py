@@ -0,0 +1,229 @@
+import threading
+
+import numpy as np
+
+from tracking.detected_object import DetectedObject
+
+INITIAL_CAPACITY = 16
+
+COLUMN_DTYPES = {
+  'id': np.int32,
+  'label': np.int32,
+  'x': np.float64,
+  'y': np.float64,
+  'w': np.float64,
+  'h': np.float64,
+  'score': np.float64,
+  'frame': np.int32,
+  'timestamp': np.float64,
+  'predicted': np.bool_,
+}
+# Columns that older logs lack, filled with zeros (False) when they are read.
+OPTIONAL_COLUMNS = ('predicted',)
+
+class LabelTable:
+  """Interns label strings to small integer codes shared by all stores."""
+  def __init__(self):
+    self._codes = {}
+    self._labels = []
+
+  def code(self, label):
+    code = self._codes.get(label)
+    if code is None:
+      code = len(self._labels)
+      self._codes[label] = code
+      self._labels.append(label)
+    return code
+
+  def codes(self, labels):
+    return np.fromiter((self.code(label) for label in labels), dtype=COLUMN_DTYPES['label'])
+
+  def label(self, code):
+    return self._labels[code]
+
+  def names(self):
+    return list(self._labels)
+
+  def __len__(self):
+    return len(self._labels)
+
+LABELS = LabelTable()
+
+class PointStore:
+  """Columnar, growable storage of `DetectedObject` rows.
+
+  Every field lives in its own NumPy array and labels are kept as codes of
+  the shared `LABELS` table. Column properties return views of the filled part.
+  """
+  def __init__(self, capacity=INITIAL_CAPACITY, labels=LABELS):
+    self.labels = labels
+    self._size = 0
+    self._capacity = capacity
+    self._columns = { name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMN_DTYPES.items() }
+
+  @staticmethod
+  def from_columns(columns, labels=LABELS):
+    """Builds a store from a dict of equally sized column arrays (label as codes)."""
+    size = len(columns['x'])
+    store = PointStore(capacity=max(size, 1), labels=labels)
+    store.extend(columns)
+    return store
+
+  @staticmethod
+  def wrap(columns, labels=LABELS):
+    """Builds a store over existing column arrays without copying them.
+
+    The arrays may be read-only views (e.g. of a memory-mapped file); the
+    first append reallocates the columns.
+    """
+    store = PointStore(capacity=0, labels=labels)
+    size = len(columns['x'])
+    store._columns = { name: columns[name] if name in columns else np.zeros(size, dtype=dtype)
+                       for name, dtype in COLUMN_DTYPES.items() }
+    store._size = store._capacity = size
+    return store
+
+  def __len__(self):
+    return self._size
+
+  def __iter__(self):
+    for i in range(self._size):
+      yield self[i]
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += self._size
+    if not 0 <= i < self._size:
+      raise IndexError('point index out of range')
+    c = self._columns
+    return DetectedObject(int(c['id'][i]), self.labels.label(c['label'][i]),
+      float(c['x'][i]), float(c['y'][i]), float(c['w'][i]), float(c['h'][i]),
+      float(c['score'][i]), int(c['frame'][i]), float(c['timestamp'][i]), bool(c['predicted'][i]))
+
+  def _reserve(self, size):
+    if size <= self._capacity:
+      return
+    self._capacity = max(size, 2 * self._capacity)
+    for name, column in self._columns.items():
+      grown = np.empty(self._capacity, dtype=column.dtype)
+      grown[:self._size] = column[:self._size]
+      self._columns[name] = grown
+
+  def append(self, detected_object):
+    self.add(*detected_object)
+
+  def add(self, track_id, label, x, y, w, h, score, frame, timestamp, predicted=False):
+    i = self._size
+    if i == self._capacity:
+      self._reserve(i + 1)
+    c = self._columns
+    c['id'][i] = track_id
+    c['label'][i] = self.labels.code(label)
+    c['x'][i] = x
+    c['y'][i] = y
+    c['w'][i] = w
+    c['h'][i] = h
+    c['score'][i] = score
+    c['frame'][i] = frame
+    c['timestamp'][i] = timestamp
+    c['predicted'][i] = predicted
+    self._size += 1
+
+  def extend(self, columns):
+    """Appends a batch given as a dict of column arrays (label as codes)."""
+    count = len(columns['x'])
+    self._reserve(self._size + count)
+    for name, column in self._columns.items():
+      column[self._size:self._size + count] = columns[name]
+    self._size += count
+
+  def select(self, mask):
+    """Returns a new store holding the rows selected by a mask or index array."""
+    return PointStore.from_columns({ name: self.column(name)[mask] for name in COLUMN_DTYPES }, self.labels)
+
+  def view(self, start=0, stop=None):
+    """Returns rows [start, stop) as a store sharing this store's memory."""
+    return PointStore.wrap(self.columns(start, stop), self.labels)
+
+  def column(self, name):
+    return self._columns[name][:self._size]
+
+  def columns(self, start=0, stop=None):
+    """Returns a dict of column views for rows [start, stop)."""
+    stop = self._size if stop is None else stop
+    return { name: column[start:stop] for name, column in self._columns.items() }
+
+  def clear(self):
+    self._size = 0
+
+  @property
+  def nbytes(self):
+    return sum(column.nbytes for column in self._columns.values())
+
+  id = property(lambda self: self.column('id'))
+  label_codes = property(lambda self: self.column('label'))
+  x = property(lambda self: self.column('x'))
+  y = property(lambda self: self.column('y'))
+  w = property(lambda self: self.column('w'))
+  h = property(lambda self: self.column('h'))
+  score = property(lambda self: self.column('score'))
+  frame = property(lambda self: self.column('frame'))
+  timestamp = property(lambda self: self.column('timestamp'))
+  predicted = property(lambda self: self.column('predicted'))
+
+  @property
+  def cx(self):
+    return self.x + self.w / 2
+
+  @property
+  def cy(self):
+    return self.y + self.h / 2
+
+class PointRing:
+  """Fixed-capacity, thread-safe ring of points for producer/consumer hand-off.
+
+  `add` never blocks on I/O: when the ring is full the oldest row is overwritten
+  and counted in `dropped`. `drain` moves everything buffered into a `PointStore`.
+  """
+  def __init__(self, capacity, labels=LABELS):
+    self.labels = labels
+    self.capacity = capacity
+    self.dropped = 0
+    self._head = 0
+    self._size = 0
+    self._lock = threading.Lock()
+    self._columns = { name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMN_DTYPES.items() }
+
+  def __len__(self):
+    return self._size
+
+  def add(self, track_id, label, x, y, w, h, score, frame, timestamp, predicted=False):
+    """Buffers one row and returns the number of rows now buffered."""
+    code = self.labels.code(label)
+    c = self._columns
+    with self._lock:
+      i = (self._head + self._size) % self.capacity
+      if self._size == self.capacity:
+        self._head = (self._head + 1) % self.capacity
+        self.dropped += 1
+      else:
+        self._size += 1
+      c['id'][i] = track_id
+      c['label'][i] = code
+      c['x'][i] = x
+      c['y'][i] = y
+      c['w'][i] = w
+      c['h'][i] = h
+      c['score'][i] = score
+      c['frame'][i] = frame
+      c['timestamp'][i] = timestamp
+      c['predicted'][i] = predicted
+      return self._size
+
+  def drain(self):
+    with self._lock:
+      index = (self._head + np.arange(self._size)) % self.capacity
+      columns = { name: column[index] for name, column in self._columns.items() }
+      self._head = (self._head + self._size) % self.capacity
+      self._size = 0
+    return PointStore.from_columns(columns, self.labels)
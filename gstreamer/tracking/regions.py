@@ -0,0 +1,166 @@
+from collections import namedtuple
+
+import numpy as np
+
+from geometry import EPS, points_in_polygons, points_to_segments_orientation, segment_pairs_intersection_mask
+
+MAX_CELLS_PER_AXIS = 64
+
+ZoneDwell = namedtuple('ZoneDwell', 'visitors seconds')
+ZoneDwell.__doc__ = """Dwell statistics per zone.
+
+visitors: (Z,) number of tracks with at least one point inside each zone.
+seconds: (Z,) total time tracks spent inside each zone, summed over tracks.
+"""
+
+def _expand(starts, counts):
+  """Returns the row of every expanded element and its offset within the row's range."""
+  rows = np.repeat(np.arange(len(counts)), counts)
+  offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+  return rows, np.repeat(starts, counts) + offsets
+
+class SpatialGrid:
+  """Uniform grid over the bounding boxes of a fixed set of items (lines, zones).
+
+  Every item is registered in the cells its bounding box overlaps, so a query
+  only looks at the items registered in the few cells it overlaps, however
+  many items there are. The grid spans the items' bounding boxes; queries
+  outside of it have no candidates.
+  """
+  def __init__(self, bboxes, cells_per_axis=None):
+    self.bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    if cells_per_axis is None:
+      cells_per_axis = int(np.clip(np.ceil(2 * np.sqrt(len(self.bboxes))), 1, MAX_CELLS_PER_AXIS))
+    self.cells_per_axis = cells_per_axis
+    if len(self.bboxes):
+      self.origin = self.bboxes[:, :2].min(axis=0) - EPS
+      extent = self.bboxes[:, 2:].max(axis=0) + EPS - self.origin
+    else:
+      self.origin, extent = np.zeros(2), np.ones(2)
+    self.cell_size = extent / cells_per_axis
+    cells, items = self._cells(self.bboxes)
+    order = np.argsort(cells, kind='stable')
+    self._cell_items = items[order]
+    self._cell_starts = np.searchsorted(cells[order], np.arange(cells_per_axis ** 2 + 1))
+
+  def _cells(self, bboxes):
+    """Returns (cells, rows) pairs of the cells each of `bboxes` overlaps, clipped to the grid."""
+    low = np.floor((bboxes[:, :2] - EPS - self.origin) / self.cell_size).astype(np.int64)
+    high = np.floor((bboxes[:, 2:] + EPS - self.origin) / self.cell_size).astype(np.int64)
+    np.clip(low, 0, self.cells_per_axis - 1, out=low)
+    np.clip(high, 0, self.cells_per_axis - 1, out=high)
+    width = high[:, 0] - low[:, 0] + 1
+    rows, offsets = _expand(np.zeros(len(bboxes), dtype=np.int64), width * (high[:, 1] - low[:, 1] + 1))
+    x = low[rows, 0] + offsets % width[rows]
+    y = low[rows, 1] + offsets // width[rows]
+    return y * self.cells_per_axis + x, rows
+
+  def candidates(self, bboxes):
+    """Returns (rows, items) arrays pairing each of the x0, y0, x1, y1 `bboxes` (x0 <= x1,
+    y0 <= y1) with every item whose bounding box it overlaps, each pair once."""
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    empty = np.empty(0, dtype=np.int64)
+    if not len(self.bboxes):
+      return empty, empty
+    grid_end = self.origin + self.cell_size * self.cells_per_axis
+    inside = np.flatnonzero(np.all(bboxes[:, 2:] + EPS >= self.origin, axis=1) &
+                            np.all(bboxes[:, :2] - EPS <= grid_end, axis=1))
+    cells, rows = self._cells(bboxes[inside])
+    rows = inside[rows]
+    starts = self._cell_starts[cells]
+    pair_rows, item_positions = _expand(starts, self._cell_starts[cells + 1] - starts)
+    rows, items = rows[pair_rows], self._cell_items[item_positions]
+    item_bboxes = self.bboxes[items]
+    overlap = np.all(bboxes[rows, 2:] + EPS >= item_bboxes[:, :2], axis=1)
+    overlap &= np.all(bboxes[rows, :2] - EPS <= item_bboxes[:, 2:], axis=1)
+    rows, items = rows[overlap], items[overlap]
+    # A pair is found once per cell both overlap.
+    keys = np.unique(rows * len(self.bboxes) + items)
+    return keys // len(self.bboxes), keys % len(self.bboxes)
+
+def segments_bboxes(segments):
+  return np.column_stack((np.minimum(segments[:, 0], segments[:, 2]), np.minimum(segments[:, 1], segments[:, 3]),
+                          np.maximum(segments[:, 0], segments[:, 2]), np.maximum(segments[:, 1], segments[:, 3])))
+
+class CountingLines:
+  """Many counting lines, with the crossing semantics of `Trajectory.detect_cross`.
+
+  Segments are paired with the lines near them through a `SpatialGrid`, so
+  the work per segment depends on the lines around it, not on all of them.
+  """
+  def __init__(self, cross_segments, cells_per_axis=None):
+    self.cross_segments = [tuple(tuple(point) for point in segment) for segment in cross_segments]
+    self.lines = np.array([p0 + p1 for p0, p1 in self.cross_segments], dtype=np.float64).reshape(-1, 4)
+    self.grid = SpatialGrid(segments_bboxes(self.lines), cells_per_axis)
+
+  def __len__(self):
+    return len(self.cross_segments)
+
+  def detect(self, segments):
+    """Returns (rows, lines, clockwise) arrays, one entry per crossing of line `lines[i]`
+    by segment `rows[i]` of an (N, 4) segment array, ordered by segment then line."""
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    rows, lines = self.grid.candidates(segments_bboxes(segments))
+    crossed = segment_pairs_intersection_mask(segments[rows], self.lines[lines])
+    rows, lines = rows[crossed], lines[crossed]
+    clockwise = points_to_segments_orientation(self.lines[lines], segments[rows, 2], segments[rows, 3])
+    return rows, lines, clockwise
+
+  def count(self, segments):
+    """Returns an (L, 2) array of (clockwise, counter_clockwise) crossings per line."""
+    _, lines, clockwise = self.detect(segments)
+    return np.column_stack((np.bincount(lines[clockwise], minlength=len(self)),
+                            np.bincount(lines[~clockwise], minlength=len(self))))
+
+class Zones:
+  """Polygon zones, e.g. to measure how long tracks dwell in them.
+
+  Points are paired with the zones whose bounding box contains them through a
+  `SpatialGrid` and only those pairs get the point in polygon test.
+  """
+  def __init__(self, polygons, cells_per_axis=None):
+    self.polygons = [tuple(tuple(point) for point in polygon) for polygon in polygons]
+    size = max((len(polygon) for polygon in self.polygons), default=0)
+    # Padding repeats the first vertex, adding empty edges only.
+    self.vertices = np.array([polygon + polygon[:1] * (size - len(polygon)) for polygon in self.polygons],
+                             dtype=np.float64).reshape(len(self.polygons), size, 2)
+    bboxes = np.column_stack((self.vertices.min(axis=1), self.vertices.max(axis=1))) if size else np.empty((0, 4))
+    self.grid = SpatialGrid(bboxes, cells_per_axis)
+
+  def __len__(self):
+    return len(self.polygons)
+
+  def locate(self, x, y):
+    """Returns (rows, zones) arrays pairing the points of `x`, `y` with the zones they are in."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    rows, zones = self.grid.candidates(np.column_stack((x, y, x, y)))
+    inside = points_in_polygons(x[rows], y[rows], self.vertices[zones])
+    return rows[inside], zones[inside]
+
+  def dwell(self, track_points):
+    """Returns the `ZoneDwell` of (track_id, `PointStore`) pairs with points in time order.
+
+    The time between two consecutive points of a track counts as dwell time in
+    the zones both centroids are in.
+    """
+    track_ids, cx, cy, timestamps = [], [], [], []
+    for track_id, points in track_points:
+      track_ids.append(np.full(len(points), track_id, dtype=np.int64))
+      cx.append(points.cx)
+      cy.append(points.cy)
+      timestamps.append(points.timestamp)
+    if not track_ids:
+      return ZoneDwell(np.zeros(len(self), dtype=np.int64), np.zeros(len(self)))
+    track_ids, timestamps = np.concatenate(track_ids), np.concatenate(timestamps)
+    rows, zones = self.locate(np.concatenate(cx), np.concatenate(cy))
+    visits = np.unique(zones * (track_ids.max() + 1) + track_ids[rows]) // (track_ids.max() + 1)
+    # (row, zone) pairs come sorted; a point stays if the next point of its track is in the same zone.
+    keys = rows * len(self) + zones
+    next_keys = keys + len(self)
+    found = np.searchsorted(keys, next_keys)
+    stays = np.flatnonzero(next_keys == keys[np.minimum(found, len(keys) - 1)]) if len(keys) else keys
+    stays = stays[track_ids[rows[stays]] == track_ids[rows[stays] + 1]]
+    seconds = timestamps[rows[stays] + 1] - timestamps[rows[stays]]
+    return ZoneDwell(np.bincount(visits, minlength=len(self)),
+                     np.bincount(zones[stays], weights=seconds, minlength=len(self)))
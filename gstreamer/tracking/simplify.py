@@ -0,0 +1,87 @@
+import numpy as np
+
+# Tolerances, in pixels, of the levels of detail `LevelOfDetail.choose_tolerance` picks from.
+TOLERANCES = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+# Deviations below this are not refined further, which is exact for every tolerance above it.
+MIN_TOLERANCE = 0.25
+# Default point budget of a drawing: one point per this many square pixels.
+PIXELS_PER_POINT = 100
+
+def segment_distances(x, y, x0, y0, x1, y1):
+  """Distances of the points `x`, `y` to the segment (x0, y0), (x1, y1)."""
+  dx, dy = x1 - x0, y1 - y0
+  length = dx * dx + dy * dy
+  if length == 0:
+    return np.hypot(x - x0, y - y0)
+  t = np.clip(((x - x0) * dx + (y - y0) * dy) / length, 0, 1)
+  return np.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+def douglas_peucker_importance(x, y, min_tolerance=MIN_TOLERANCE):
+  """Returns the largest tolerance at which Douglas-Peucker keeps each point.
+
+  A point is kept by Douglas-Peucker with tolerance `t` exactly when its
+  importance is above `t` (for `t` >= `min_tolerance`), so one pass gives
+  every level of detail. End points have an infinite importance.
+  """
+  x = np.asarray(x, dtype=np.float64)
+  y = np.asarray(y, dtype=np.float64)
+  importance = np.zeros(len(x))
+  if len(x) == 0:
+    return importance
+  importance[[0, -1]] = np.inf
+  ranges = [(0, len(x) - 1, np.inf)]
+  while ranges:
+    start, stop, bound = ranges.pop()
+    if stop - start < 2:
+      continue
+    distances = segment_distances(x[start + 1:stop], y[start + 1:stop], x[start], y[start], x[stop], y[stop])
+    split = int(np.argmax(distances))
+    deviation = distances[split]
+    if deviation < min_tolerance:
+      continue
+    # A point is only reached if the splits above it were made.
+    split += start + 1
+    importance[split] = min(deviation, bound)
+    ranges.append((start, split, importance[split]))
+    ranges.append((split, stop, importance[split]))
+  return importance
+
+class LevelOfDetail:
+  """Douglas-Peucker importance of the points of every trajectory, computed once per track.
+
+  The importance of a track is recomputed only when it got new points. A
+  time window of a track is simplified with the importance of the whole
+  track, keeping the first and last point of the window.
+  """
+  def __init__(self):
+    self._importance = {}
+
+  def importance(self, trajectory, start_time=0, end_time=None):
+    """Returns the importance of `trajectory.points_between(start_time, end_time)`."""
+    points = trajectory.points
+    cached = self._importance.get(trajectory.track_id)
+    if cached is None or cached[0] is not trajectory or len(cached[1]) != len(points):
+      cached = (trajectory, douglas_peucker_importance(points.cx, points.cy))
+      self._importance[trajectory.track_id] = cached
+    start, stop = trajectory.window_bounds(start_time, end_time)
+    if start is None:
+      # Points out of time order are filtered, not a range; simplify the window itself.
+      window = trajectory.points_between(start_time, end_time)
+      return douglas_peucker_importance(window.cx, window.cy)
+    importance = cached[1][start:stop].copy()
+    if len(importance):
+      importance[[0, -1]] = np.inf
+    return importance
+
+  @staticmethod
+  def choose_tolerance(importances, max_points, tolerances=TOLERANCES):
+    """Returns 0 (no simplification) if all `importances` fit in `max_points`, else the
+    smallest of `tolerances` keeping at most `max_points` of them, or the largest one
+    if none does."""
+    importance = np.sort(np.concatenate(importances)) if importances else np.empty(0)
+    if len(importance) <= max_points:
+      return 0
+    # Points kept at each tolerance: those with a larger importance.
+    kept = len(importance) - np.searchsorted(importance, tolerances, side='right')
+    fitting = np.flatnonzero(kept <= max_points)
+    return tolerances[fitting[0]] if len(fitting) else tolerances[-1]
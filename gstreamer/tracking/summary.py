@@ -0,0 +1,75 @@
+from collections import Counter, OrderedDict
+
+class TrajectorySummary:
+  """Compact totals of the trajectories of one or more collector files.
+
+  Summaries of different files are combined with `merge`, in any order, so
+  files can be analyzed in separate processes and only their summaries sent
+  back. `files` maps each file name to its (clockwise, counter_clockwise)
+  crossings, `tracks_by_label` counts tracks by `average_label`, and
+  `heatmap`, if any, is the `tracking.heatmap.Heatmap` of the selected points.
+  """
+  def __init__(self):
+    self.heatmap = None
+    self.files = OrderedDict()
+    self.tracks_by_label = Counter()
+    self.clockwise = 0
+    self.counter_clockwise = 0
+
+  @classmethod
+  def from_trajectories(cls, name, obj_trajectories, start_time=0, end_time=None, label=None):
+    """Summarizes the trajectories of `obj_trajectories` selected as in `ObjTrajectories.select`.
+
+    Without a time window the running crossing counters of the trajectories
+    are used, so they may have been loaded with `keep_points=False`.
+    """
+    summary = cls()
+    if start_time == 0 and end_time is None:
+      trajectories = list(obj_trajectories.trajectories.values())
+      if label:
+        trajectories = [traj for traj in trajectories if traj.average_label == label]
+      counts = (sum(traj.clockwise_crosses for traj in trajectories),
+                sum(traj.counter_clockwise_crosses for traj in trajectories))
+    else:
+      trajectories = [traj for traj, _ in obj_trajectories.select(start_time, end_time, label=label)]
+      counts = obj_trajectories.count_crosses(start_time, end_time, label=label)
+    summary.tracks_by_label.update(traj.average_label for traj in trajectories)
+    summary.files[name] = tuple(int(count) for count in counts)
+    summary.clockwise, summary.counter_clockwise = summary.files[name]
+    return summary
+
+  @property
+  def people(self):
+    return self.tracks_by_label['person']
+
+  @property
+  def tracks(self):
+    return sum(self.tracks_by_label.values())
+
+  def merge(self, other):
+    """Adds the totals of `other` to this summary and returns it."""
+    if other.heatmap is not None:
+      self.heatmap = other.heatmap if self.heatmap is None else self.heatmap.merge(other.heatmap)
+    self.files.update(other.files)
+    self.tracks_by_label.update(other.tracks_by_label)
+    self.clockwise += other.clockwise
+    self.counter_clockwise += other.counter_clockwise
+    return self
+
+  def to_dict(self):
+    return OrderedDict([
+      ('files', OrderedDict((name, {'in': clockwise, 'out': counter_clockwise})
+                            for name, (clockwise, counter_clockwise) in sorted(self.files.items()))),
+      ('tracks_by_label', OrderedDict(sorted(self.tracks_by_label.items()))),
+      ('people', self.people),
+      ('in', self.clockwise),
+      ('out', self.counter_clockwise)])
+
+  def format_report(self):
+    lines = ['{}: In: {}. Out: {}'.format(name, clockwise, counter_clockwise)
+             for name, (clockwise, counter_clockwise) in sorted(self.files.items())]
+    lines.append('Total object detected {}'.format(self.tracks))
+    lines.extend('  {}: {}'.format(label, count) for label, count in sorted(self.tracks_by_label.items()))
+    lines.append('Total in: {}. Out: {}'.format(self.clockwise, self.counter_clockwise))
+    lines.append('{} people detected'.format(self.people))
+    return '\n'.join(lines)
@@ -1,77 +1,169 @@
-import csv
-import copy
-import time
-from tracking.trajectory import Trajectory, filter_by_timestamp, filter_by_frame_step, filter_by_frame_recall
-from tracking.detected_object import DetectedObject
+import numpy as np
+from tracking.trajectory import Trajectory
+from tracking.crossings import stack_segments, count_crosses, count_crosses_by_track, count_crosses_by_time
+from tracking.binary_log import BinaryLog
+from tracking.csv_chunks import CHUNK_BYTES, read_csv_chunks
+from tracking.point_store import LABELS
+from tracking.simplify import PIXELS_PER_POINT, LevelOfDetail
+from tracking.trajectory_index import TrajectoryIndex
 
 class ObjTrajectories:
   def __init__(self, cross_segment) -> None:
     self.trajectories = {}
+    self.index = TrajectoryIndex()
+    self.level_of_detail = LevelOfDetail()
     self._cross_clockwise_counter = 0
     self._cross_counter_clockwise_counter = 0
     self.cross_segment = cross_segment
 
-  def load_csv(self, filename, debug=False, fieldnames=None):
+  def load_csv(self, filename, debug=False, fieldnames=None, keep_points=True, chunk_bytes=CHUNK_BYTES):
+    """Streams a collector CSV in chunks, counting crossings as it goes.
+
+    With `keep_points=False` trajectories keep only their running state (last
+    centroid, crossing counters, label totals), so files larger than memory
+    can be summarized.
+    """
+    self.trajectories = {}
+    self.index = TrajectoryIndex()
+    self.level_of_detail = LevelOfDetail()
+    for chunk in read_csv_chunks(filename, fieldnames, chunk_bytes):
+      self.add_points(chunk, keep_points)
+    if debug:
+      self.print_debug_info()
+
+  def load_binary(self, filename, debug=False, keep_points=True, chunk_rows=65536):
+    """Loads a binary log (see `tracking.binary_log`) straight from its memory map."""
     self.trajectories = {}
-    with open(filename, 'r') as csvfile:
-      if fieldnames is None:
-        fieldnames = DetectedObject._fields
-      reader = csv.DictReader(csvfile, fieldnames=fieldnames)
-      next(reader, None)
-      for row in reader:
-        detected_object = DetectedObject.from_dict(row)
-        if detected_object.id not in self.trajectories:
-          self.trajectories[detected_object.id] = Trajectory(detected_object.id)
-        self.trajectories[detected_object.id].add_object(detected_object)
-        if self.cross_segment:
-          clockwise, counter_clockwise =\
-            self.trajectories[detected_object.id].detect_if_last_segment_crossed(self.cross_segment)
-          self._cross_clockwise_counter += clockwise
-          self._cross_counter_clockwise_counter += counter_clockwise
+    self.index = TrajectoryIndex()
+    self.level_of_detail = LevelOfDetail()
+    for chunk in BinaryLog(filename).chunks(chunk_rows):
+      self.add_points(chunk, keep_points)
     if debug:
       self.print_debug_info()
 
-  def get_trajectories_svg(self, drawing, start_time=0, end_time=None, track_ids=None, label=None, draw_last_rectangle=True, count_cross=True):
-    FRAME_STEP = 5
-
-    trajectories = copy.deepcopy(self.trajectories)
-    if track_ids:
-      trajectories = { key: value for key, value in trajectories.items() if key in track_ids }
-    if label:
-      trajectories = { key: value for key, value in trajectories.items() if value.average_label == label }
-    clockwise_total, counter_clockwise_total = 0, 0
-    for track_id, traj in trajectories.items():
-      segments = traj.get_segments([
-        filter_by_timestamp(start_time, end_time),
-        # filter_by_frame_step(FRAME_STEP)
-      ])
+  def add_points(self, points, keep_points=True):
+    """Appends a `PointStore` chunk in time order, updating crossing counters incrementally."""
+    if len(points) == 0:
+      return
+    order = np.argsort(points.id, kind='stable')
+    points = points.select(order)
+    if points.labels is not LABELS:
+      # Translate codes of a foreign label table (e.g. a binary log header).
+      points.label_codes[:] = LABELS.codes(points.labels.names())[points.label_codes]
+      points.labels = LABELS
+    track_ids = points.id
+    starts = np.flatnonzero(np.r_[True, track_ids[1:] != track_ids[:-1]])
+    stops = np.r_[starts[1:], len(points)]
+    # Visit tracks in order of first appearance so new trajectories keep file order.
+    first_seen = np.argsort(order[starts])
+    for start, stop in zip(starts[first_seen].tolist(), stops[first_seen].tolist()):
+      track_id = int(track_ids[start])
+      if track_id not in self.trajectories:
+        self.trajectories[track_id] = Trajectory(track_id, self.cross_segment or None, keep_points)
+      clockwise, counter_clockwise = self.trajectories[track_id].add_objects(points.columns(start, stop))
+      self.index.update(self.trajectories[track_id])
+      self._cross_clockwise_counter += clockwise
+      self._cross_counter_clockwise_counter += counter_clockwise
+
+  def add_object(self, detected_object):
+    """Appends a single point, e.g. from the live pipeline."""
+    if detected_object.id not in self.trajectories:
+      self.trajectories[detected_object.id] = Trajectory(detected_object.id, self.cross_segment or None)
+    clockwise, counter_clockwise = self.trajectories[detected_object.id].add_object(detected_object)
+    self.index.update(self.trajectories[detected_object.id])
+    self._cross_clockwise_counter += clockwise
+    self._cross_counter_clockwise_counter += counter_clockwise
+
+  def get_trajectories_svg(self, drawing, start_time=0, end_time=None, track_ids=None, label=None, draw_last_rectangle=True, count_cross=True,
+                           tolerance=None, max_points=None):
+    """Draws the selected trajectories, simplified with Douglas-Peucker (see `tracking.simplify`).
+
+    With `tolerance=None` every point is drawn if they fit in `max_points` (by default
+    one per `PIXELS_PER_POINT` square pixels of the drawing), otherwise the finest
+    level of detail that fits; `tolerance=0` always draws every point. Crossings are
+    always counted on every point.
+    """
+    selected = self.select(start_time, end_time, track_ids, label)
+    importances = [None] * len(selected)
+    if tolerance is None:
+      if max_points is None:
+        max_points = self._drawing_point_budget(drawing)
+      if sum(len(points) for _, points in selected) <= max_points:
+        tolerance = 0
+      else:
+        importances = [self.level_of_detail.importance(traj, start_time, end_time) for traj, _ in selected]
+        tolerance = self.level_of_detail.choose_tolerance(importances, max_points)
+    for (traj, points), importance in zip(selected, importances):
+      simplified = points
+      if tolerance > 0:
+        if importance is None:
+          importance = self.level_of_detail.importance(traj, start_time, end_time)
+        simplified = points.select(importance > tolerance)
+      segments = traj.build_segments(simplified)
       if len(segments) == 0:
         continue
       color = traj.color
       self._update_swg_drawing_from_segments(drawing, segments, color)
       if draw_last_rectangle:
-        _, (x, y) = segments[-1]
-        point = traj.get_point_from_coords(x, y)
+        point = points[-1]
         drawing.add(drawing.rect(insert=(point.x, point.y), size=(point.w, point.h),
           fill='none', stroke=color, stroke_width='2'))
-      if count_cross:
-        (clockwise, counter_clockwise) = self._count_crosses_from_segments(segments)
-        clockwise_total += clockwise
-        counter_clockwise_total += counter_clockwise
     if count_cross:
+      counter = self._count_crosses_from_segments(
+        stack_segments((traj.track_id, points) for traj, points in selected))
       self._update_swg_drawimg_cross_segment(drawing)
-      self._update_svg_drawing_cross_info(drawing, (clockwise_total, counter_clockwise_total))
+      self._update_svg_drawing_cross_info(drawing, counter)
 
-  def _count_crosses_from_segments(self, segments):
-    if self.cross_segment is None or len(segments) < 1:
+  def count_crosses(self, start_time=0, end_time=None, track_ids=None, label=None, by_track=False, bucket_size=None):
+    """Counts crossings of `cross_segment` for the selected trajectories in one vectorized pass.
+
+    Returns (clockwise, counter_clockwise) totals, or {track_id: (clockwise, counter_clockwise)}
+    when `by_track` is set, or (bucket_start_times, clockwise, counter_clockwise) arrays
+    when `bucket_size` (seconds) is given.
+    """
+    batch = stack_segments((traj.track_id, points)
+                           for traj, points in self.select(start_time, end_time, track_ids, label))
+    if by_track:
+      return count_crosses_by_track(batch, self.cross_segment)
+    if bucket_size is not None:
+      return count_crosses_by_time(batch, self.cross_segment, bucket_size, start_time)
+    return self._count_crosses_from_segments(batch)
+
+  def count_lines(self, lines, start_time=0, end_time=None, track_ids=None, label=None):
+    """Counts crossings of every line of a `tracking.regions.CountingLines` for the selected
+    trajectories; returns an (L, 2) array of (clockwise, counter_clockwise) per line."""
+    batch = stack_segments((traj.track_id, points)
+                           for traj, points in self.select(start_time, end_time, track_ids, label))
+    return lines.count(batch.segments)
+
+  def zone_dwell(self, zones, start_time=0, end_time=None, track_ids=None, label=None):
+    """Returns the `tracking.regions.ZoneDwell` (visitors and seconds per zone) of the
+    selected trajectories in every zone of a `tracking.regions.Zones`."""
+    return zones.dwell((traj.track_id, points)
+                       for traj, points in self.select(start_time, end_time, track_ids, label))
+
+  def select(self, start_time=0, end_time=None, track_ids=None, label=None):
+    """Returns (trajectory, points) pairs of the trajectories with points between `start_time`
+    and `end_time`, optionally only `track_ids` and those whose `average_label` is `label`.
+
+    Uses `index`, so only matching trajectories are visited, and their points in
+    the window are views (see `Trajectory.points_between`), nothing is copied.
+    """
+    return [(traj, traj.points_between(start_time, end_time))
+            for traj in self.index.select(start_time, end_time, track_ids, label)]
+
+  def _count_crosses_from_segments(self, batch):
+    if self.cross_segment is None or len(batch.segments) < 1:
       return (0, 0)
-    clockwise_total = 0
-    counter_clockwise_total = 0
-    for segment in segments:
-      (clockwise, counter_clockwise) = Trajectory.detect_cross(segment, self.cross_segment)
-      clockwise_total += clockwise
-      counter_clockwise_total += counter_clockwise
-    return (clockwise_total, counter_clockwise_total)
+    return count_crosses(batch.segments, self.cross_segment)
+
+  @staticmethod
+  def _drawing_point_budget(drawing):
+    try:
+      return int(drawing.attribs['width']) * int(drawing.attribs['height']) // PIXELS_PER_POINT
+    except (KeyError, ValueError):
+      # Relative sizes such as '100%' give no budget: every point is drawn.
+      return np.inf
 
   def _update_swg_drawimg_cross_segment(self, dwg):
     marker = dwg.marker(insert=(3, 3), size=(6,6))
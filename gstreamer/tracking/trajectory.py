@@ -1,31 +1,23 @@
 import hashlib
-from functools import reduce
-from collections import defaultdict
+import numpy as np
 
 from geometry import segments_intersection, point_to_segment_orientation
+from tracking.crossings import count_crosses
+from tracking.point_store import PointStore
 
 PERSON_DETECTION_THRESHOLD = 0.3
 
-def filter_by_frame_recall(frame_recall):
-  def recall_filter(point):
-    return self._frame_number - frame_recall <= point.frame
-  return recall_filter
-
-def filter_by_frame_step(frame_step):
-  prev_frame_number = None
-  def fn(point):
-    nonlocal prev_frame_number
-    if prev_frame_number is None or prev_frame_number + frame_step < point.frame:
-      prev_frame_number = point.frame
-      return True
-    return False
+def filter_by_frame_recall(frame_number, frame_recall):
+  def fn(points):
+    return frame_number - frame_recall <= points.frame
   return fn
 
 def filter_by_timestamp(start_time, end_time):
-  def fn(point):
-    after_start_time = point.timestamp >= start_time
-    before_end_time = point.timestamp <= end_time if end_time is not None else True
-    return after_start_time and before_end_time
+  def fn(points):
+    mask = points.timestamp >= start_time
+    if end_time is not None:
+      mask &= points.timestamp <= end_time
+    return mask
   return fn
 
 def id_to_random_color(number):
@@ -35,20 +27,101 @@ def id_to_random_color(number):
   return int(r), int(g), int(b)
 
 class Trajectory:
-  def __init__(self, track_id):
+  """Points of one track plus running state that is updated in O(1) per point.
+
+  The last centroid and segment, the crossing counters for `cross_segment` and the
+  per-label score totals are maintained as points arrive, so live and streaming
+  callers never rescan the stored points. With `keep_points=False` only that
+  state is kept.
+  """
+  def __init__(self, track_id, cross_segment=None, keep_points=True):
     self.track_id = track_id
-    self.points = []
+    self.cross_segment = cross_segment
+    self.keep_points = keep_points
+    self.points = PointStore()
     self.color = 'rgb({},{},{})'.format(*id_to_random_color(track_id))
+    self.last_centroid = None
+    self.last_segment = None
+    self.clockwise_crosses = 0
+    self.counter_clockwise_crosses = 0
+    # Lifetime of the track, also kept without points.
+    self.first_timestamp = float('nan')
+    self.last_timestamp = float('nan')
+    self._time_sorted = True
+    # Label code -> summed score, in order of first appearance.
+    self._label_scores = {}
 
   def add_object(self, detected_object):
-    self.points.append(detected_object)
+    """Adds one point and returns the (clockwise, counter_clockwise) crossings it made."""
+    _, label, x, y, w, h, score, _, timestamp, _ = detected_object
+    centroid = (x + w / 2, y + h / 2)
+    if self.last_centroid is not None:
+      self.last_segment = (self.last_centroid, centroid)
+    self.last_centroid = centroid
+    self._add_timestamps(timestamp, timestamp, timestamp, True)
+    code = self.points.labels.code(label)
+    self._label_scores[code] = self._label_scores.get(code, 0) + score
+    if self.keep_points:
+      self.points.add(*detected_object)
+    if self.cross_segment is None:
+      return (0, 0)
+    clockwise, counter_clockwise = self.detect_if_last_segment_crossed(self.cross_segment)
+    self.clockwise_crosses += clockwise
+    self.counter_clockwise_crosses += counter_clockwise
+    return (clockwise, counter_clockwise)
+
+  def add_objects(self, columns):
+    """Bulk `add_object` for a dict of column arrays (label as codes) in time order."""
+    if len(columns['x']) == 0:
+      return (0, 0)
+    cx = columns['x'] + columns['w'] / 2
+    cy = columns['y'] + columns['h'] / 2
+    if self.last_centroid is not None:
+      cx = np.r_[self.last_centroid[0], cx]
+      cy = np.r_[self.last_centroid[1], cy]
+    segments = np.stack((cx[:-1], cy[:-1], cx[1:], cy[1:]), axis=1)
+    if len(segments):
+      x0, y0, x1, y1 = segments[-1].tolist()
+      self.last_segment = ((x0, y0), (x1, y1))
+    self.last_centroid = (float(cx[-1]), float(cy[-1]))
+    timestamps = columns['timestamp']
+    self._add_timestamps(float(timestamps[0]), float(timestamps.min()), float(timestamps.max()),
+                         bool(np.all(timestamps[1:] >= timestamps[:-1])))
+    self._add_label_scores(columns['label'], columns['score'])
+    if self.keep_points:
+      self.points.extend(columns)
+    if self.cross_segment is None or len(segments) == 0:
+      return (0, 0)
+    clockwise, counter_clockwise = count_crosses(segments, self.cross_segment)
+    self.clockwise_crosses += clockwise
+    self.counter_clockwise_crosses += counter_clockwise
+    return (clockwise, counter_clockwise)
+
+  def _add_timestamps(self, first, lowest, highest, in_order):
+    # Points are in time order if every batch is and starts no earlier than the last point.
+    if not in_order or first < self.last_timestamp:
+      self._time_sorted = False
+    if not lowest >= self.first_timestamp:
+      self.first_timestamp = lowest
+    if not highest <= self.last_timestamp:
+      self.last_timestamp = highest
+
+  def _add_label_scores(self, codes, scores):
+    _, first_seen = np.unique(codes, return_index=True)
+    for code in codes[np.sort(first_seen)].tolist():
+      self._label_scores.setdefault(code, 0)
+    totals = np.zeros(len(self.points.labels))
+    for code, total in self._label_scores.items():
+      totals[code] = total
+    # Unbuffered, in-order accumulation keeps the sums identical to adding point by point.
+    np.add.at(totals, codes, scores)
+    for code in self._label_scores:
+      self._label_scores[code] = float(totals[code])
 
   @property
   def average_label(self):
-    labels_dict = defaultdict(lambda: 0)
-    for point in self.points:
-      labels_dict[point.label] += point.score
-    peson_fraction = labels_dict['person'] / sum(labels_dict.values())
+    labels_dict = { self.points.labels.label(code): total for code, total in self._label_scores.items() }
+    peson_fraction = labels_dict.get('person', 0) / sum(labels_dict.values())
     if peson_fraction >= PERSON_DETECTION_THRESHOLD:
       return 'person'
     dominant_label = max(labels_dict, key=labels_dict.get)
@@ -57,27 +130,50 @@ class Trajectory:
   def get_points_filtered(self, filters=[]):
     points = self.points
     for filter_fn in filters:
-      points = list(filter(filter_fn, points))
+      points = points.select(filter_fn(points))
     return points
 
+  def points_between(self, start_time=0, end_time=None):
+    """Returns the points with start_time <= timestamp <= end_time (no end if None).
+
+    Points in time order, the usual case, are located by binary search and
+    returned as a view without copying; otherwise they are filtered.
+    """
+    start, stop = self.window_bounds(start_time, end_time)
+    if start is None:
+      return self.get_points_filtered([filter_by_timestamp(start_time, end_time)])
+    return self.points.view(start, stop)
+
+  def window_bounds(self, start_time=0, end_time=None):
+    """Returns the (start, stop) range of the points of `points_between`, or (None, None)
+    if points are out of time order and the window is not a range."""
+    if not self._time_sorted:
+      return None, None
+    timestamps = self.points.timestamp
+    start = int(np.searchsorted(timestamps, start_time, side='left'))
+    stop = len(timestamps) if end_time is None else int(np.searchsorted(timestamps, end_time, side='right'))
+    return start, max(start, stop)
+
   def get_segments(self, filters=None):
     points = self.points if filters is None else self.get_points_filtered(filters)
-    return self._build_segments_from_points(points)
+    return self.build_segments(points)
+
+  def get_segment_arrays(self, filters=None):
+    """Returns segments as an (N, 4) array of x0, y0, x1, y1 centroid coordinates."""
+    points = self.points if filters is None else self.get_points_filtered(filters)
+    cx, cy = points.cx, points.cy
+    return np.stack((cx[:-1], cy[:-1], cx[1:], cy[1:]), axis=1)
 
   def detect_if_last_segment_crossed(self, cross_segment):
-    segments = self.get_segments()
-    if len(segments) > 0:
-      return Trajectory.detect_cross(segments[-1], cross_segment)
+    if self.last_segment is not None:
+      return Trajectory.detect_cross(self.last_segment, cross_segment)
     return (0, 0)
 
-  def _build_segments_from_points(self, points):
-    prev_point_coords = None
-    segments = []
-    for p in points:
-      if prev_point_coords is not None:
-        segments.append((prev_point_coords, (p.cx, p.cy)))
-      prev_point_coords = (p.cx, p.cy)
-    return segments
+  @staticmethod
+  def build_segments(points):
+    """Returns the centroid segments of `points` as a list of ((x0, y0), (x1, y1))."""
+    coords = list(zip(points.cx.tolist(), points.cy.tolist()))
+    return list(zip(coords[:-1], coords[1:]))
 
   def detect_cross(segment, cross_segment):
     if segments_intersection(segment, cross_segment):
@@ -87,7 +183,7 @@ class Trajectory:
     return (0, 0)
 
   def get_point_from_coords(self, x, y):
-    for p in self.points:
-      if p.cx == x and p.cy == y:
-        return p
-    return None
+    matches = np.flatnonzero((self.points.cx == x) & (self.points.cy == y))
+    if len(matches) == 0:
+      return None
+    return self.points[matches[0]]
@@ -0,0 +1,93 @@
+import numpy as np
+
+INITIAL_CAPACITY = 64
+
+class TrajectoryIndex:
+  """Query index over the trajectories of an `ObjTrajectories`.
+
+  Keeps the lifetime (first and last timestamp) of every track in arrays, in
+  order of track creation, and a label -> rows index of `average_label`.
+  Lifetimes are refreshed by `update` whenever a trajectory gets points; labels
+  of updated trajectories are recomputed lazily on the next label query.
+  While tracks are created in time order, which is how points arrive, a time
+  window is located with a binary search over track start times.
+  """
+  def __init__(self):
+    self._trajectories = []
+    self._rows = {}
+    self._track_ids = np.empty(INITIAL_CAPACITY, dtype=np.int64)
+    self._first = np.empty(INITIAL_CAPACITY)
+    self._last = np.empty(INITIAL_CAPACITY)
+    self._first_sorted = True
+    self._row_labels = []
+    self._label_rows = {}
+    self._dirty_labels = set()
+
+  def __len__(self):
+    return len(self._trajectories)
+
+  def _reserve(self, size):
+    capacity = len(self._first)
+    if size <= capacity:
+      return
+    capacity = max(size, 2 * capacity)
+    for name in ('_track_ids', '_first', '_last'):
+      column = getattr(self, name)
+      grown = np.empty(capacity, dtype=column.dtype)
+      grown[:len(self)] = column[:len(self)]
+      setattr(self, name, grown)
+
+  def update(self, trajectory):
+    """Records new points of `trajectory`, adding it if it is new."""
+    row = self._rows.get(trajectory.track_id)
+    if row is None:
+      row = len(self)
+      self._reserve(row + 1)
+      self._rows[trajectory.track_id] = row
+      self._trajectories.append(trajectory)
+      self._row_labels.append(None)
+      self._track_ids[row] = trajectory.track_id
+    self._first[row] = trajectory.first_timestamp
+    self._last[row] = trajectory.last_timestamp
+    # A start time moves earlier on out of order points, so recheck both neighbours.
+    if self._first_sorted and (row and not self._first[row] >= self._first[row - 1] or
+                               row + 1 < len(self) and not self._first[row + 1] >= self._first[row]):
+      self._first_sorted = False
+    self._dirty_labels.add(row)
+
+  def _refresh_labels(self):
+    for row in self._dirty_labels:
+      label = self._trajectories[row].average_label
+      previous = self._row_labels[row]
+      if label == previous:
+        continue
+      if previous is not None:
+        self._label_rows[previous].discard(row)
+      self._label_rows.setdefault(label, set()).add(row)
+      self._row_labels[row] = label
+    self._dirty_labels.clear()
+
+  def rows_with_label(self, label):
+    self._refresh_labels()
+    return np.array(sorted(self._label_rows.get(label, ())), dtype=np.int64)
+
+  def rows_alive(self, start_time=0, end_time=None):
+    """Returns rows of the tracks with points in [start_time, end_time]; without
+    timestamps (no points) a track is never alive."""
+    stop = len(self)
+    if end_time is not None and self._first_sorted:
+      stop = int(np.searchsorted(self._first[:stop], end_time, side='right'))
+    alive = self._last[:stop] >= start_time
+    if end_time is not None and not self._first_sorted:
+      alive &= self._first[:stop] <= end_time
+    return np.flatnonzero(alive)
+
+  def select(self, start_time=0, end_time=None, track_ids=None, label=None):
+    """Returns the trajectories alive in the time window with the given ids and
+    label, in order of creation."""
+    rows = self.rows_alive(start_time, end_time)
+    if track_ids:
+      rows = rows[np.isin(self._track_ids[rows], list(track_ids))]
+    if label:
+      rows = np.intersect1d(rows, self.rows_with_label(label), assume_unique=True)
+    return [self._trajectories[row] for row in rows.tolist()]